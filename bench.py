@@ -0,0 +1,276 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+# Scratch directory for synthetic transcripts and stage outputs
+BENCH_DIR = '.bench'
+BASELINE_FILE = 'bench_baseline.json'
+RESULTS_FILE = os.path.join(BENCH_DIR, 'results.json')
+
+STAGES = [
+    'load_transcript',
+    'parse_transcript',
+    'read_speakers',
+    'calculate_readability',
+    'plot_readability',
+    'generate_wordcloud',
+    'summary_charts',
+    'create_gif',
+]
+
+# Stages that only make sense once for the whole real corpus
+CORPUS_STAGES = {'summary_charts', 'create_gif'}
+
+# A 1x synthetic transcript has about as many candidate turns, and as many bytes,
+# as an average real debate; speakers, turns and size all grow linearly with scale
+BASE_SPEAKERS = 2
+BASE_TURNS = 100
+MODERATOR_EVERY = 3  # a moderator line after every few candidate turns
+
+# Relative increase over the baseline that counts as a regression, and the absolute
+# change below which differences are treated as noise
+THRESHOLDS = {'wall': 0.25, 'cpu': 0.25, 'rss_mb': 0.20}
+NOISE_FLOOR = {'wall': 0.1, 'cpu': 0.1, 'rss_mb': 10}
+
+
+def corpus_inputs():
+    """(transcript path, candidate names) for every debate in the manifest."""
+    from manifest import load_debates, transcript_path
+
+    return [(transcript_path(debate), debate['candidates']) for debate in load_debates()]
+
+
+def synthetic_path(scale):
+    return os.path.join(BENCH_DIR, f'synthetic_{scale}x.txt')
+
+
+def synthetic_speakers(scale):
+    return [f'SPEAKER{i}' for i in range(BASE_SPEAKERS * scale)]
+
+
+def generate_transcript(path, scale, seed=0):
+    """
+    Write a synthetic transcript `scale` times the size of an average debate, with
+    `scale` times the speakers and turns. Turns are built from real candidates'
+    sentences, so word lengths and syllable counts stay realistic.
+    """
+    import readstats
+    import transcripts
+
+    sentences = []
+    for transcript, candidates in corpus_inputs():
+        for turn in transcripts.read_turns(transcript, candidates):
+            sentences.extend(sentence.strip() for sentence in readstats.SENTENCE_RE.findall(turn.text))
+
+    rng = random.Random(seed)
+    speakers = synthetic_speakers(scale)
+    with open(path, 'w') as file:
+        for turn in range(BASE_TURNS * scale):
+            if turn % MODERATOR_EVERY == 0:
+                file.write(f"MODERATOR: {' '.join(rng.choices(sentences, k=2))}\n\n")
+            # Speakers take turns in random order, each turn a few lines of sentences
+            file.write(f"{rng.choice(speakers)}: ")
+            for _ in range(rng.randint(1, 4)):
+                file.write(' '.join(rng.choices(sentences, k=rng.randint(2, 6))) + '\n')
+            file.write('\n')
+
+
+def input_files(input_name):
+    if input_name == 'corpus':
+        return corpus_inputs()
+    scale = int(input_name.rstrip('x'))
+    path = synthetic_path(scale)
+    if not os.path.exists(path):
+        generate_transcript(path, scale)
+    return [(path, synthetic_speakers(scale))]
+
+
+def prepare_stage(stage, input_name, workdir):
+    """
+    Do a stage's untimed setup and return the callable to time. Text stages cover
+    every transcript of the input; chart and word cloud stages draw at most the
+    first three speakers so charts stay comparable across scales.
+    """
+    import readlvl
+    import transcripts
+
+    files = input_files(input_name)
+
+    if stage == 'load_transcript':
+        return lambda: [readlvl.load_transcript(path) for path, _ in files]
+    if stage == 'parse_transcript':
+        texts = [(readlvl.load_transcript(path), candidates) for path, candidates in files]
+        return lambda: [transcripts.parse_transcript(text, candidates) for text, candidates in texts]
+    if stage == 'read_speakers':
+        return lambda: [transcripts.read_speakers(path, candidates) for path, candidates in files]
+
+    speakers_texts = [(transcripts.read_speakers(path, candidates), candidates) for path, candidates in files]
+    if stage == 'calculate_readability':
+        return lambda: [readlvl.calculate_readability(speakers_text) for speakers_text, _ in speakers_texts]
+
+    if stage == 'plot_readability':
+        jobs = []
+        for i, (speakers_text, candidates) in enumerate(speakers_texts):
+            scores = readlvl.calculate_readability(speakers_text)
+            shown = [name for name in candidates if name.upper() in speakers_text][:3]
+            jobs.append((scores, shown, ['blue', 'red', 'green'][:len(shown)], os.path.join(workdir, f'readability_{i}.png')))
+        return lambda: [readlvl.plot_readability(scores, shown, colors, output_file, 2000) for scores, shown, colors, output_file in jobs]
+
+    if stage == 'generate_wordcloud':
+        import debatecloud
+
+        texts = [text for speakers_text, _ in speakers_texts for text in list(speakers_text.values())[:3]]
+        return lambda: [debatecloud.generate_wordcloud(text, os.path.join(workdir, f'wordcloud_{i}.png'), random_state=0) for i, text in enumerate(texts)]
+
+    raise ValueError(f"Unknown stage {stage!r}")
+
+
+def prepare_corpus_stage(stage, workdir):
+    if stage == 'summary_charts':
+        import charts
+        import collect_and_plot_readability as collect
+        import results_store
+
+        table = results_store.ResultsStore().load(['debate', 'year', 'color', 'metric', 'score'], metrics=collect.metrics)
+        intervals_over_time = None
+        if os.path.exists(collect.intervals_filename):
+            with open(collect.intervals_filename, 'r') as f:
+                intervals_over_time = json.load(f)
+        jobs = collect.over_time_chart_jobs(table, intervals_over_time) + collect.delta_chart_jobs(table, intervals_over_time)
+        for job in jobs:
+            job.output_file = os.path.join(workdir, job.output_file)
+        return lambda: [charts.render_chart(job) for job in jobs]
+
+    if stage == 'create_gif':
+        import create_readability_gif
+
+        chart_files = glob.glob('readability_scores_*.png')
+        return lambda: create_readability_gif.create_gif(os.path.join(workdir, 'animation.gif'), image_files=chart_files)
+
+    raise ValueError(f"Unknown stage {stage!r}")
+
+
+def run_stage(stage, input_name):
+    """Set up and time one stage in this process; returns wall/CPU seconds and peak RSS."""
+    workdir = os.path.abspath(os.path.join(BENCH_DIR, 'out', input_name, stage))
+    os.makedirs(workdir, exist_ok=True)
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        if stage in CORPUS_STAGES:
+            run = prepare_corpus_stage(stage, workdir)
+        else:
+            run = prepare_stage(stage, input_name, workdir)
+        wall, cpu = time.perf_counter(), time.process_time()
+        run()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    # ru_maxrss is in kilobytes on Linux
+    return {'wall': wall, 'cpu': cpu, 'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def measure(stage, input_name, repeat=3):
+    """
+    Run a stage `repeat` times, each in a fresh interpreter so peak RSS belongs to
+    that stage alone (plus its setup), and keep the fastest run.
+    """
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-stage', stage, '--input', input_name],
+            capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{input_name}/{stage} failed:\n{completed.stderr}")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run['wall'])
+
+
+def compare(results, baseline, thresholds=THRESHOLDS):
+    """Lines describing each measurement against the baseline, and the regressions among them."""
+    lines = []
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        cells = []
+        for metric, threshold in thresholds.items():
+            value = result[metric]
+            if not base or metric not in base:
+                cells.append(f"{metric} {value:.3f}")
+                continue
+            change = value - base[metric]
+            ratio = value / base[metric] if base[metric] else float('inf')
+            regressed = change > NOISE_FLOOR[metric] and ratio > 1 + threshold
+            cells.append(f"{metric} {value:.3f} ({ratio:.2f}x){' REGRESSION' if regressed else ''}")
+            if regressed:
+                regressions.append(f"{key} {metric}: {base[metric]:.3f} -> {value:.3f}")
+        lines.append(f"{key:45} " + '  '.join(cells))
+    return lines, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on the real corpus and on synthetic transcripts.")
+    parser.add_argument('--scales', nargs='*', type=int, default=[1, 10, 100], help='Synthetic transcript scales (default: 1 10 100)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='Stages to run (default: all)')
+    parser.add_argument('--no-corpus', action='store_true', help='Skip the real transcripts')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the fastest is kept (default: 3)')
+    parser.add_argument('--baseline', help=f'Baseline file to compare against (default: {BASELINE_FILE})')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline instead of comparing')
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    parser.add_argument('--input', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.baseline and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"baseline file {args.baseline} does not exist")
+    baseline_file = args.baseline or BASELINE_FILE
+
+    if args.run_stage:
+        # Child process: measure a single stage and report it as JSON
+        print(json.dumps(run_stage(args.run_stage, args.input)))
+        sys.exit(0)
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    inputs = ([] if args.no_corpus else ['corpus']) + [f'{scale}x' for scale in args.scales]
+
+    results = {}
+    for input_name in inputs:
+        for stage in args.stages:
+            if stage in CORPUS_STAGES and input_name != 'corpus':
+                continue
+            key = f'{input_name}/{stage}'
+            results[key] = measure(stage, input_name, args.repeat)
+            print(f"{key:45} wall {results[key]['wall']:.3f}s  cpu {results[key]['cpu']:.3f}s  rss {results[key]['rss_mb']:.0f} MB", flush=True)
+
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(baseline_file):
+            with open(baseline_file, 'r') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(baseline_file, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {baseline_file}")
+        sys.exit(0)
+
+    if not os.path.exists(baseline_file):
+        print(f"No baseline at {baseline_file}; run with --save-baseline to create one")
+        sys.exit(0)
+
+    with open(baseline_file, 'r') as f:
+        baseline = json.load(f)
+    lines, regressions = compare(results, baseline)
+    print(f"\nAgainst {baseline_file}:")
+    print('\n'.join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        print('\n'.join(regressions))
+        sys.exit(1)
+    print("\nNo regressions")
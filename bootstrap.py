@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+import readstats
+from timeline import COUNT_FIELDS, SpeakerCounts
+
+# Resamples per speaker, interval coverage and the fixed seed that keeps reruns
+# (and therefore cached intervals) reproducible
+RESAMPLES = 2000
+CONFIDENCE = 0.95
+SEED = 0
+
+# Columns of a sentence count matrix
+SENTENCE_FIELDS = COUNT_FIELDS + ('words',)
+
+
+@dataclass
+class SpeakerBootstrap:
+    """Unrounded metric values for a speaker's full text and for each resample."""
+    full: dict        # metric -> float
+    replicates: dict  # metric -> array of shape (resamples,)
+
+
+def sentence_matrix(counts):
+    """(sentences, len(SENTENCE_FIELDS)) matrix of per-sentence counts from a SpeakerCounts."""
+    starts = counts.sentence_starts
+    columns = [counts.prefix[field][starts[1:]] - counts.prefix[field][starts[:-1]] for field in COUNT_FIELDS]
+    columns.append(np.diff(starts))
+    return np.stack(columns, axis=1).astype(float)
+
+
+def _scores_from_totals(totals):
+    stats = {field: totals[..., i] for i, field in enumerate(SENTENCE_FIELDS)}
+    # As in readstats, a text has at least one sentence
+    stats['sentences'] = np.maximum(stats['sentences'], 1)
+    return readstats.scores_from_arrays(**stats, rounded=False)
+
+
+def bootstrap_speaker(matrix, resamples=RESAMPLES, rng=None):
+    """
+    Resample a speaker's sentences with replacement `resamples` times. Each resample
+    is a row of multinomial sentence weights, so all of them are scored with one
+    (resamples x sentences) @ (sentences x fields) product and one vectorized call.
+    """
+    rng = rng or np.random.default_rng(SEED)
+    num_sentences = len(matrix)
+    weights = rng.multinomial(num_sentences, np.full(num_sentences, 1 / num_sentences), size=resamples)
+    return SpeakerBootstrap(
+        full={metric: float(score) for metric, score in _scores_from_totals(matrix.sum(axis=0)).items()},
+        replicates=_scores_from_totals(weights @ matrix),
+    )
+
+
+def bootstrap_debate(turns, resamples=RESAMPLES, seed=SEED):
+    """speaker -> SpeakerBootstrap for every speaker in `turns`."""
+    by_speaker = {}
+    for turn in turns:
+        by_speaker.setdefault(turn.speaker, []).append(turn)
+
+    rng = np.random.default_rng(seed)
+    boots = {}
+    for speaker, speaker_turns in by_speaker.items():
+        matrix = sentence_matrix(SpeakerCounts(speaker_turns))
+        if len(matrix):
+            boots[speaker] = bootstrap_speaker(matrix, resamples, rng)
+    return boots
+
+
+def _interval(point, full, replicates, confidence):
+    """
+    `point` plus the central `confidence` range of the replicates' deviations from
+    the full-text value. Working with deviations keeps the interval around the
+    reported score even where the resampled statistic differs from it (complex
+    words are counted per occurrence, and reported scores are rounded).
+    """
+    deviations = replicates - full
+    if point is None or np.isnan(full) or np.all(np.isnan(deviations)):
+        return None
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.nanpercentile(deviations, [tail, 100 - tail])
+    return [round(float(point + low), 2), round(float(point + high), 2)]
+
+
+def score_intervals(scores, boots, confidence=CONFIDENCE):
+    """metric -> speaker -> [low, high] around the metric -> speaker -> score table."""
+    return {
+        metric: {
+            speaker: _interval(score, boots[speaker].full[metric], boots[speaker].replicates[metric], confidence)
+            for speaker, score in speaker_scores.items() if speaker in boots
+        }
+        for metric, speaker_scores in scores.items()
+    }
+
+
+def delta_intervals(scores, boots, minuend, subtrahend, confidence=CONFIDENCE):
+    """
+    metric -> [low, high] for scores[minuend] - scores[subtrahend]. The speakers are
+    resampled independently, so the delta's replicates are the pairwise differences.
+    """
+    if minuend not in boots or subtrahend not in boots:
+        return {}
+    intervals = {}
+    for metric, speaker_scores in scores.items():
+        if minuend not in speaker_scores or subtrahend not in speaker_scores:
+            continue
+        a, b = boots[minuend], boots[subtrahend]
+        intervals[metric] = _interval(
+            speaker_scores[minuend] - speaker_scores[subtrahend],
+            a.full[metric] - b.full[metric],
+            a.replicates[metric] - b.replicates[metric],
+            confidence,
+        )
+    return intervals
@@ -0,0 +1,343 @@
+from startup import report_startup
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
+import os
+import traceback
+
+import manifest
+import tracing
+import transcripts
+from score_cache import write_json_atomic
+
+# Intermediate artifacts (parsed turns, per-debate scores) and the build state
+BUILD_DIR = '.build'
+STATE_FILE = os.path.join(BUILD_DIR, 'state.json')
+
+# Word clouds built for debates with a `wordclouds` count in the manifest
+WORDCLOUD_DIR = 'wordclouds'
+
+
+@dataclass
+class Target:
+    """
+    One node of the build graph: `action(*args)` turns the `inputs` files into the
+    `outputs` files. A target depends on the targets that produce its inputs, and
+    is rebuilt when the contents of an input or its `params` change.
+    """
+    name: str
+    action: object   # module-level function, so it can run in a worker process
+    args: tuple
+    inputs: list
+    outputs: list
+    params: object = None  # anything else the outputs depend on, as JSON
+    deps: set = field(default_factory=set)
+
+
+def turns_path(debate):
+    return os.path.join(BUILD_DIR, 'turns', f'{manifest.debate_id(debate)}.json')
+
+
+def scores_path(debate):
+    return os.path.join(BUILD_DIR, 'scores', f'{manifest.debate_id(debate)}.json')
+
+
+def wordcloud_paths(debate):
+    directory = os.path.join(WORDCLOUD_DIR, manifest.debate_id(debate))
+    return [
+        (candidate.strip().upper(), seed, os.path.join(directory, f'{candidate.strip().lower()}_wordcloud_{seed}.png'))
+        for candidate in debate['candidates'] for seed in range(debate.get('wordclouds', 0))
+    ]
+
+
+def load_turns(path):
+    with open(path, 'r') as f:
+        return [transcripts.Turn(**turn) for turn in json.load(f)]
+
+
+# Actions, run in worker processes
+
+def parse_action(debate, output):
+    turns = transcripts.read_turns(manifest.transcript_path(debate), debate['candidates'], manifest.moderator_tags(debate))
+    write_json_atomic(output, [asdict(turn) for turn in turns])
+
+
+def score_action(debate, turns_file, output):
+    import collect_and_plot_readability as collect
+
+    result = collect.DebateResult(debate['year'], debate['suffix'], debate['candidates'], debate['colors'])
+    collect.score_turns(result, load_turns(turns_file))
+    write_json_atomic(output, {'scores': result.scores, 'intervals': result.intervals, 'delta_intervals': result.delta_intervals, 'counts': result.counts})
+
+
+def chart_action(debate, scores_file, output):
+    import charts
+    import readlvl
+
+    with open(scores_file, 'r') as f:
+        scores = json.load(f)['scores']
+    charts.render_chart(readlvl.readability_chart_job(scores, debate['candidates'], debate['colors'], output, debate['year'], debate['suffix']))
+
+
+def summary_action(debates, score_files):
+    import charts
+    import collect_and_plot_readability as collect
+    import results_store
+
+    results = []
+    for debate, scores_file in zip(debates, score_files):
+        with open(scores_file, 'r') as f:
+            entry = json.load(f)
+        results.append(collect.DebateResult(debate['year'], debate['suffix'], debate['candidates'], debate['colors'],
+                                            scores=entry['scores'], intervals=entry['intervals'], delta_intervals=entry['delta_intervals'],
+                                            counts=entry.get('counts')))
+
+    table = results_store.results_table(results, collect.metrics)
+    intervals_over_time = collect.build_intervals_over_time(results)
+    collect.save_results(table, intervals_over_time, debates=len(debates), scored=len(results), errors=[])
+    for job in collect.over_time_chart_jobs(table, intervals_over_time) + collect.delta_chart_jobs(table, intervals_over_time):
+        charts.render_chart(job)
+
+
+def gif_action(chart_files, output):
+    import create_readability_gif
+
+    create_readability_gif.create_gif(output, image_files=chart_files)
+
+
+def wordcloud_action(debate, turns_file):
+    import debatecloud
+
+    speakers_text = transcripts.join_speakers(load_turns(turns_file))
+    settings = debatecloud.load_wordcloud_settings()
+    frequencies = {}
+    for speaker, seed, output in wordcloud_paths(debate):
+        if speaker not in frequencies:
+            frequencies[speaker] = debatecloud.word_frequencies(speakers_text.get(speaker, ''))
+        debatecloud.render_speaker_cloud(frequencies[speaker], output, speaker, settings, seed)
+
+
+def summary_outputs():
+    import collect_and_plot_readability as collect
+    import results_store
+
+    metric_names = [metric.replace('\n', '_').replace(' ', '_') for metric in collect.metrics]
+    return ([os.path.join(results_store.RESULTS_DIR, 'meta.json'), collect.results_filename, collect.intervals_filename]
+            + [f'{name}_over_time.png' for name in metric_names]
+            + [f'delta_{name}_over_time.png' for name in metric_names])
+
+
+def build_targets(debates):
+    """
+    The build graph for `debates`: transcript -> parsed turns -> scores -> per-debate
+    chart -> animation, every debate's scores -> summary JSON and charts, and parsed
+    turns -> word clouds for debates that ask for them.
+    """
+    import readlvl
+
+    targets = []
+    for debate in debates:
+        debate_id = manifest.debate_id(debate)
+        identity = [debate['year'], debate['suffix'], debate['candidates'], debate['colors']]
+        targets.append(Target(f'turns:{debate_id}', parse_action, (debate, turns_path(debate)),
+                              inputs=[manifest.transcript_path(debate)], outputs=[turns_path(debate)],
+                              params=[debate['candidates'], list(manifest.moderator_tags(debate))]))
+        targets.append(Target(f'scores:{debate_id}', score_action, (debate, turns_path(debate), scores_path(debate)),
+                              inputs=[turns_path(debate)], outputs=[scores_path(debate)],
+                              params=identity + [readlvl.SCORER_VERSION]))
+        targets.append(Target(f'chart:{debate_id}', chart_action, (debate, scores_path(debate), manifest.debate_chart_path(debate)),
+                              inputs=[scores_path(debate)], outputs=[manifest.debate_chart_path(debate)], params=identity))
+        if debate.get('wordclouds'):
+            targets.append(Target(f'wordclouds:{debate_id}', wordcloud_action, (debate, turns_path(debate)),
+                                  inputs=[turns_path(debate)], outputs=[path for _, _, path in wordcloud_paths(debate)], params=identity))
+
+    targets.append(Target('summary', summary_action, (debates, [scores_path(debate) for debate in debates]),
+                          inputs=[scores_path(debate) for debate in debates], outputs=summary_outputs(),
+                          params=[[debate['year'], debate['suffix'], debate['candidates'], debate['colors']] for debate in debates]))
+    chart_files = [manifest.debate_chart_path(debate) for debate in debates]
+    targets.append(Target('gif', gif_action, (chart_files, 'readability_scores_animation.gif'),
+                          inputs=chart_files, outputs=['readability_scores_animation.gif']))
+
+    # Link every target to the producers of its inputs
+    producers = {output: target.name for target in targets for output in target.outputs}
+    for target in targets:
+        target.deps = {producers[path] for path in target.inputs if path in producers}
+    return targets
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def signature(target):
+    """Hash of the target's action, parameters and input contents."""
+    return hashlib.sha256(json.dumps({
+        'action': target.action.__name__,
+        'params': target.params,
+        'inputs': {path: file_hash(path) for path in target.inputs},
+    }, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def up_to_date(target, entry, target_signature):
+    """True if the target was last built from the same signature and its outputs are untouched since."""
+    if not entry or entry['signature'] != target_signature:
+        return False
+    return all(os.path.exists(path) and file_hash(path) == entry['outputs'].get(path) for path in target.outputs)
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def select_targets(targets, goals):
+    """Names of the targets needed for `goals`: target names, or prefixes like `chart` for every chart:*."""
+    by_name = {target.name: target for target in targets}
+    selected = set()
+    for goal in goals or ['all']:
+        if goal == 'all':
+            matches = list(by_name)
+        else:
+            matches = [name for name in by_name if name == goal or name.startswith(f'{goal}:')]
+        if not matches:
+            raise ValueError(f"Unknown target {goal!r}; run with --list to see the targets")
+        selected.update(matches)
+
+    # Everything the goals depend on
+    needed = set()
+    stack = list(selected)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(by_name[name].deps)
+    return needed
+
+
+def _run_action(name, action, args):
+    with tracing.span(name, category='target'):
+        action(*args)
+
+
+def build(targets, goals=None, jobs=None, force=False, dry_run=False, state_file=STATE_FILE):
+    """
+    Bring the targets needed for `goals` up to date, running targets whose
+    dependencies are finished in parallel across `jobs` processes. A target is
+    skipped when its signature and outputs match the last build, so a rebuilt
+    target whose outputs come out identical does not trigger its dependents.
+    Returns (built, skipped, failed) lists of target names.
+    """
+    by_name = {target.name: target for target in targets}
+    pending = select_targets(targets, goals)
+    state = load_state(state_file)
+    os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+
+    built, skipped, failed = [], [], []
+    finished = set()
+    stale = set()  # dry run: targets that would be rebuilt
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=tracing.attach, initargs=tracing.context()) as executor:
+        while pending or running:
+            # Start every target whose dependencies are done. Skipping one can make
+            # its dependents ready, so scan again until nothing changes
+            scan = True
+            while scan:
+                scan = False
+                for name in sorted(pending):
+                    target = by_name[name]
+                    if target.deps & set(failed):
+                        pending.discard(name)
+                        scan = True
+                        failed.append(name)
+                        print(f"Skipping {name}: a dependency failed")
+                        continue
+                    if not target.deps <= finished:
+                        continue
+                    pending.discard(name)
+                    scan = True
+
+                    if dry_run and target.deps & stale:
+                        stale.add(name)
+                        finished.add(name)
+                        print(f"Would build {name} (dependency changed)")
+                        continue
+                    try:
+                        target_signature = signature(target)
+                    except OSError as error:
+                        failed.append(name)
+                        print(f"Cannot build {name}: {error}")
+                        continue
+                    if not force and up_to_date(target, state.get(name), target_signature):
+                        skipped.append(name)
+                        finished.add(name)
+                        continue
+                    if dry_run:
+                        stale.add(name)
+                        finished.add(name)
+                        print(f"Would build {name}")
+                        continue
+
+                    for path in target.outputs:
+                        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                    running[executor.submit(_run_action, name, target.action, target.args)] = (target, target_signature)
+
+            if not running:
+                if pending:
+                    raise RuntimeError(f"Dependency cycle among {sorted(pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                target, target_signature = running.pop(future)
+                try:
+                    future.result()
+                    state[target.name] = {'signature': target_signature, 'outputs': {path: file_hash(path) for path in target.outputs}}
+                    built.append(target.name)
+                    finished.add(target.name)
+                    print(f"Built {target.name}")
+                except Exception:
+                    failed.append(target.name)
+                    print(f"Error building {target.name}:")
+                    print(traceback.format_exc())
+                # Save after every target so an interrupted build keeps its progress
+                write_json_atomic(state_file, {name: entry for name, entry in state.items() if name in by_name})
+
+    return built, skipped, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the readability scores, charts, animation and word clouds whose inputs changed.")
+    parser.add_argument('targets', nargs='*', help='Targets to build, e.g. summary, gif, chart:2024b or chart for every chart (default: all)')
+    parser.add_argument('--manifest', default=manifest.MANIFEST_FILE, help=f'Debates manifest (default: {manifest.MANIFEST_FILE})')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='Print what would be built without building it')
+    parser.add_argument('--force', action='store_true', help='Rebuild the selected targets even if they are up to date')
+    parser.add_argument('--list', action='store_true', help='List every target with its dependencies')
+    parser.add_argument('--trace', metavar='FILE', help='Record timing and memory spans of every target and save them as a Chrome trace JSON file')
+    args = parser.parse_args()
+    report_startup('build')
+
+    targets = build_targets(manifest.load_debates(args.manifest))
+    if args.list:
+        for target in targets:
+            print(f"{target.name:20} <- {', '.join(sorted(target.deps)) or ', '.join(target.inputs)}")
+        raise SystemExit(0)
+
+    if args.trace:
+        tracing.enable()
+    built, skipped, failed = build(targets, args.targets, args.jobs, args.force, args.dry_run)
+    if not args.dry_run:
+        print(f"{len(built)} built, {len(skipped)} up to date, {len(failed)} failed")
+    if args.trace:
+        tracing.finish(args.trace)
+    if failed:
+        raise SystemExit(1)
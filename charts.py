@@ -0,0 +1,301 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import tracing
+
+SOURCE_TEXT = 'Source: Transcripts used with permission from the American Presidency Project https://presidency.ucsb.edu'
+REPO_URL = 'https://github.com/faradayberry/debatecloud'
+
+# Metric labels with newlines for the per-debate bar chart
+METRIC_LABELS = {
+    'Flesch-Kincaid Grade Level': 'Flesch-Kincaid\nGrade Level',
+    'Gunning Fog Index': 'Gunning Fog\nIndex',
+    'Simple Measure of Gobbledygook': 'Simple Measure\nof Gobbledygook',
+    'Coleman-Liau Index': 'Coleman-Liau\nIndex'
+}
+
+
+@dataclass
+class ChartJob:
+    """One chart to render. Jobs of the same kind and layout share a template."""
+    kind: str          # key into TEMPLATES
+    layout: tuple      # template constructor arguments
+    data: dict         # keyword arguments for the template's render()
+    output_file: str
+
+
+def _new_figure(figsize, rows=None):
+    # Figures are created without pyplot so templates never touch global state and
+    # always draw with Agg, whatever backend is configured. With `rows`, returns a
+    # column of that many axes sharing the x axis instead of a single one
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    if rows is not None:
+        return figure, figure.subplots(rows, 1, sharex=True, squeeze=False)[:, 0]
+    return figure, figure.add_subplot()
+
+
+def _layout_once(template):
+    # Lay the figure out on its first render, when the real title and labels are in
+    # place; later renders reuse the same subplot geometry
+    if not template.laid_out:
+        with tracing.span('layout'):
+            template.figure.tight_layout()
+        template.laid_out = True
+
+
+def _save(figure, output_file, **kwargs):
+    # Drawing and PNG encoding both happen inside savefig
+    with tracing.span('savefig', output_file=output_file):
+        figure.savefig(output_file, **kwargs)
+
+
+def _error_bars(ax, color, linewidth):
+    # An empty collection of whisker segments, filled in by _set_error_bars
+    from matplotlib.collections import LineCollection
+
+    bars = LineCollection([], colors=color, linewidths=linewidth, capstyle='butt')
+    ax.add_collection(bars, autolim=False)
+    return bars
+
+
+def _set_error_bars(ax, bars, segments):
+    """Replace the whiskers and extend the data limits to cover them (relim skips collections)."""
+    bars.set_segments(segments)
+    for segment in segments:
+        ax.update_datalim(segment)
+
+
+def _add_credits(ax, x, y, fontsize):
+    ax.text(x, y, SOURCE_TEXT, ha='left', va='top', fontsize=fontsize, color='gray', transform=ax.transAxes)
+    ax.text(1, y, REPO_URL, ha='right', va='top', fontsize=fontsize, color='gray', transform=ax.transAxes)
+
+
+class DebateChart:
+    """
+    Grouped bar chart of every metric for one debate. The axes, bars and value labels
+    are built once per candidate count; render() only moves them and swaps text.
+    """
+    # y-axis upper limit; taller bars keep their label just below it
+    y_max = 12
+
+    def __init__(self, num_candidates, metrics):
+        import numpy as np
+
+        self.metrics = list(metrics)
+        self.figure, ax = _new_figure((10, 6))
+
+        bar_width = 0.9 / num_candidates
+        total_group_width = bar_width * num_candidates
+        index = np.arange(len(self.metrics))
+
+        self.bars = []
+        self.labels = []
+        for i in range(num_candidates):
+            # Calculate positions for each bar
+            positions = index - (total_group_width / 2) + (i * bar_width) + bar_width
+            bars = ax.bar(positions, np.zeros(len(self.metrics)), bar_width, label=f'candidate {i}')
+            self.bars.append(bars)
+            self.labels.append([
+                ax.text(bar.get_x() + bar.get_width() / 2, 0, '', ha='center', va='bottom', fontsize=11, fontweight='bold', color='white')
+                for bar in bars
+            ])
+
+        ax.set_ylabel('Reading Level', fontweight='bold', fontsize=14)
+        self.title = ax.set_title('', fontweight='bold', fontsize=16)
+        ax.set_ylim(0, self.y_max)
+        ax.set_xticks([x + (bar_width / 2) for x in index], [METRIC_LABELS.get(metric, metric) for metric in self.metrics], fontweight='bold', fontsize=12)
+        self.legend = ax.legend(loc='upper left')
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+        _add_credits(ax, -0.05, -0.1, 6)
+        self.laid_out = False
+
+    def render(self, output_file, scores, speakers, colors, title):
+        for bars, labels, handle, legend_text, speaker, color in zip(self.bars, self.labels, self.legend.legend_handles, self.legend.get_texts(), speakers, colors):
+            handle.set_facecolor(color)
+            legend_text.set_text(speaker)
+            for bar, label, metric in zip(bars, labels, self.metrics):
+                height = scores[metric][speaker]
+                bar.set_height(height)
+                bar.set_facecolor(color)
+                label.set_y(min(height, self.y_max) - 0.5)
+                label.set_text(f'{height:.2f}')
+        self.title.set_text(title)
+        _layout_once(self)
+        _save(self.figure, output_file, format='png', dpi=300)
+
+
+class OverTimeChart:
+    """Blue and red score lines across all debates, one output per metric."""
+
+    def __init__(self, years, score_levels=range(3, 13, 1)):
+        self.figure, ax = _new_figure((12, 6))
+        self.ax = ax
+
+        self.lines = {
+            'blue': ax.plot([], [], color='blue', marker='o', markersize=4, linestyle='-', linewidth=3, label='Democratic Candidate')[0],
+            'red': ax.plot([], [], color='red', marker='o', markersize=4, linestyle='-', linewidth=3, label='Republican Candidate')[0],
+        }
+        self.error_bars = {color: _error_bars(ax, color, 1.5) for color in self.lines}
+        self.title = ax.set_title('', fontsize=20, fontweight='bold')
+        ax.set_xlabel('Year', fontsize=18, fontweight='bold')
+        ax.set_ylabel('Score', fontsize=18, fontweight='bold')
+        ax.legend()
+
+        # Create x-ticks at integer years
+        self.years = years
+        ax.set_xticks(years, labels=years, rotation=45, fontsize=16)
+
+        self.score_levels = score_levels
+        ax.set_yticks(self.score_levels, labels=self.score_levels, fontsize=16)
+
+        ax.grid(axis='y', which='major', linestyle='--', alpha=0.7)
+        ax.grid(axis='x', which='major', linestyle='--', alpha=0.7)
+        _add_credits(ax, -0.05, -0.175, 6)
+        self.laid_out = False
+
+    def render(self, output_file, series, title, intervals=None):
+        for color, (x, y) in series.items():
+            self.lines[color].set_data(x, y)
+        # Autoscale to the data, then widen to keep every tick visible, as pyplot
+        # does when ticks are set after plotting
+        self.ax.set_autoscale_on(True)
+        self.ax.relim()
+        for color, (x, _) in series.items():
+            color_intervals = (intervals or {}).get(color) or [None] * len(x)
+            _set_error_bars(self.ax, self.error_bars[color], [[(xi, interval[0]), (xi, interval[1])] for xi, interval in zip(x, color_intervals) if interval])
+        self.ax.autoscale_view()
+        x_min, x_max = self.ax.get_xlim()
+        self.ax.set_xlim(min(x_min, self.years[0]), max(x_max, self.years[-1]))
+        y_min, y_max = self.ax.get_ylim()
+        self.ax.set_ylim(min(y_min, self.score_levels[0]), max(y_max, self.score_levels[-1]))
+        self.title.set_text(title)
+        _layout_once(self)
+        _save(self.figure, output_file)
+
+
+class DeltaChart:
+    """Horizontal red-minus-blue bars, one bar per debate position, one output per metric."""
+
+    def __init__(self, positions, delta_levels=range(-4, 5, 1)):
+        self.figure, ax = _new_figure((10, 8))
+        self.delta_levels = delta_levels
+        self.ax = ax
+        ax.axvline(x=0, color='black', linewidth=0.5)  # Line at delta = 0
+
+        self.positions = positions
+        self.bars = ax.barh(y=positions, width=[0] * len(positions), edgecolor='black', height=1.1)
+        self.error_bars = _error_bars(ax, 'black', 1.5)
+
+        ax.set_xticks(self.delta_levels, labels=self.delta_levels, fontsize=16)
+
+        # Add labels for the years on the y-axis
+        years = range(1960, 2025, 4)
+        ax.set_yticks(years, labels=years, fontsize=16)
+        ax.grid(axis='y', which='major', linestyle='--', alpha=0.7)
+
+        self.title = ax.set_title('', fontsize=20, fontweight='bold')
+        ax.set_xlabel('Delta', fontsize=18, fontweight='bold')
+        ax.set_ylabel('Year', fontsize=18, fontweight='bold')
+
+        # Invert the y-axis so earlier years appear at the top
+        ax.invert_yaxis()
+        _add_credits(ax, -0.1, -0.1, 7)
+        self.laid_out = False
+
+    def render(self, output_file, deltas, title, intervals=None):
+        for bar, delta in zip(self.bars, deltas):
+            # Debates missing either score get no bar
+            bar.set_visible(delta is not None)
+            bar.set_width(delta or 0)
+            # Set the color: blue for negative delta, red for positive delta
+            bar.set_facecolor('red' if delta and delta > 0 else 'blue')
+        # Autoscale the deltas, widened to keep every tick visible
+        self.ax.set_autoscalex_on(True)
+        self.ax.relim()
+        intervals = intervals or [None] * len(deltas)
+        _set_error_bars(self.ax, self.error_bars, [[(interval[0], y), (interval[1], y)] for y, interval in zip(self.positions, intervals) if interval])
+        self.ax.autoscale_view(scaley=False)
+        x_min, x_max = self.ax.get_xlim()
+        self.ax.set_xlim(min(x_min, self.delta_levels[0]), max(x_max, self.delta_levels[-1]))
+        self.title.set_text(title)
+        _layout_once(self)
+        _save(self.figure, output_file)
+
+
+class TimelineChart:
+    """One debate's readability over its course: a row per metric, a line per speaker."""
+
+    def __init__(self, num_speakers, metrics):
+        self.metrics = list(metrics)
+        self.figure, self.axes = _new_figure((12, 3 * len(self.metrics)), rows=len(self.metrics))
+
+        self.lines = []
+        for ax, metric in zip(self.axes, self.metrics):
+            self.lines.append([ax.plot([], [], linestyle='-', linewidth=2)[0] for _ in range(num_speakers)])
+            ax.set_ylabel(metric.replace(' ', '\n', 1), fontweight='bold', fontsize=11)
+            ax.grid(axis='y', linestyle='--', alpha=0.7)
+        self.axes[-1].set_xlim(0, 100)
+        self.axes[-1].set_xlabel('Debate progress (%)', fontweight='bold', fontsize=14)
+        self.title = self.axes[0].set_title('', fontweight='bold', fontsize=16)
+        self.legend = self.axes[0].legend(self.lines[0], [f'speaker {i}' for i in range(num_speakers)], loc='upper right')
+        _add_credits(self.axes[-1], -0.05, -0.3, 6)
+        self.laid_out = False
+
+    def render(self, output_file, series, speakers, colors, title):
+        for ax, metric_lines, metric in zip(self.axes, self.lines, self.metrics):
+            for line, speaker, color in zip(metric_lines, speakers, colors):
+                x, scores = series.get(speaker, ([], {}))
+                line.set_data(x, scores.get(metric, []))
+                line.set_color(color)
+            ax.set_autoscaley_on(True)
+            ax.relim()
+            ax.autoscale_view(scalex=False)
+        for handle, legend_text, speaker, color in zip(self.legend.legend_handles, self.legend.get_texts(), speakers, colors):
+            handle.set_color(color)
+            legend_text.set_text(speaker)
+        self.title.set_text(title)
+        _layout_once(self)
+        _save(self.figure, output_file, format='png', dpi=150)
+
+
+TEMPLATES = {
+    'debate': DebateChart,
+    'over_time': OverTimeChart,
+    'delta': DeltaChart,
+    'timeline': TimelineChart,
+}
+
+# Templates built in this process, by (kind, layout)
+_templates = {}
+
+
+def render_chart(job):
+    """Render `job` in this process, building its template on first use."""
+    with tracing.span('chart', category='output', kind=job.kind, output_file=job.output_file):
+        key = (job.kind, job.layout)
+        template = _templates.get(key)
+        if template is None:
+            with tracing.span('build template', kind=job.kind):
+                template = _templates[key] = TEMPLATES[job.kind](*job.layout)
+        template.render(job.output_file, **job.data)
+    return job.output_file
+
+
+def render_charts(jobs, max_workers=None):
+    """
+    Render independent charts across a process pool and yield each output file as
+    it is saved. Jobs are grouped by template so each worker builds a template at
+    most once; `max_workers` defaults to the number of CPUs.
+    """
+    jobs = sorted(jobs, key=lambda job: (job.kind, repr(job.layout)))
+    if not jobs:
+        return
+    # Contiguous chunks of similar jobs let a worker reuse its templates
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=tracing.attach, initargs=tracing.context()) as executor:
+        yield from executor.map(render_chart, jobs, chunksize=max(1, len(jobs) // (4 * workers)))
@@ -0,0 +1,288 @@
+import argparse
+import math
+import time
+import zlib
+from itertools import chain
+
+import manifest
+import transcripts
+from debatecloud import word_frequencies
+
+# Cloud style per party; other parties get DEFAULT_STYLE on a plain canvas
+PARTY_STYLES = {
+    'Republican': {'colormap': 'Reds', 'mask': 'elephant.png'},
+    'Democratic': {'colormap': 'Blues', 'mask': 'donkey.png'},
+}
+DEFAULT_STYLE = {'colormap': 'copper', 'mask': None}
+
+BACKGROUND_COLOR = '#949494'
+LABEL_COLOR = 'white'
+FONT_PATH = 'Roboto/Roboto-Black.ttf'
+
+# Words are only drawn from the darker part of the colormap, so they stand out
+# from the background
+COLORMAP_RANGE = (0.35, 1.0)
+
+
+def word_color(word, colormap):
+    """A colormap color picked by the word itself, so a word keeps its color in every frame."""
+    low, high = COLORMAP_RANGE
+    t = low + (high - low) * (zlib.crc32(word.encode('utf-8')) % 1000) / 999
+    return tuple(round(channel * 255) for channel in colormap(t)[:3])
+
+
+def cloud_palette(colormap, background_color=BACKGROUND_COLOR, label_color=LABEL_COLOR):
+    """
+    One GIF palette for the whole animation, known before the first frame: the
+    background, the label and the colormap's word colors at full strength and
+    blended into the background, as anti-aliased edges are.
+    """
+    from PIL import Image, ImageColor
+
+    from create_readability_gif import TRANSPARENT_INDEX
+
+    background = ImageColor.getrgb(background_color)
+    colors = [background, ImageColor.getrgb(label_color)]
+    samples = (TRANSPARENT_INDEX - len(colors)) // 3
+    low, high = COLORMAP_RANGE
+    for alpha in (1.0, 0.66, 0.33):
+        for i in range(samples):
+            color = colormap(low + (high - low) * i / (samples - 1))[:3]
+            colors.append(tuple(round(255 * (alpha * c) + (1 - alpha) * b) for c, b in zip(color, background)))
+    flat = [channel for color in colors for channel in color]
+    flat += [0] * (TRANSPARENT_INDEX * 3 - len(flat))
+    palette = Image.new('P', (1, 1))
+    # Repeat the background in the transparent slot so no pixel prefers it
+    palette.putpalette(flat + flat[:3])
+    return palette
+
+
+class CloudLayout:
+    """
+    Word cloud layout that is updated frame by frame instead of redone. Font
+    sizes come in levels `size_step` apart, and a word that is still among the
+    top words within one level of its size keeps its place, size and
+    orientation. Only new and resized words are placed, into the space left by
+    the kept ones, the same way WordCloud places them (a random free spot from
+    the integral occupancy image, rotating and then shrinking the word when it
+    does not fit). Glyph bitmaps are rendered once per word, size and
+    orientation.
+    """
+
+    def __init__(self, blocked, font_path=FONT_PATH, max_words=100, max_font_size=None, min_font_size=12,
+                 size_step=1.25, font_step=4, relative_scaling=0.5, prefer_horizontal=0.9, margin=2, random_state=None):
+        import random
+
+        self.blocked = blocked  # bool array, True where nothing may be drawn
+        self.height, self.width = blocked.shape
+        self.font_path = font_path
+        self.max_words = max_words
+        self.max_font_size = max_font_size or self.height // 5
+        self.min_font_size = min_font_size
+        self.size_step = size_step
+        self.font_step = font_step
+        self.relative_scaling = relative_scaling
+        self.prefer_horizontal = prefer_horizontal
+        self.margin = margin
+        self.random_state = random_state if isinstance(random_state, random.Random) else random.Random(random_state)
+        self.placed = {}   # word -> (level, font_size, orientation, (row, col))
+        self._fonts = {}
+        self._glyphs = {}
+
+    def font(self, font_size, orientation=None):
+        from PIL import ImageFont
+
+        if font_size not in self._fonts:
+            self._fonts[font_size] = ImageFont.truetype(self.font_path, font_size)
+        return ImageFont.TransposedFont(self._fonts[font_size], orientation=orientation)
+
+    def glyph(self, word, font_size, orientation):
+        """The word's pixels (with a margin) as a bool array, as it is drawn at the top left."""
+        import numpy as np
+        from PIL import Image, ImageDraw
+
+        key = (word, font_size, orientation)
+        if key not in self._glyphs:
+            font = self.font(font_size, orientation)
+            box = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), word, font=font)
+            image = Image.new('L', (box[2] + self.margin, box[3] + self.margin))
+            ImageDraw.Draw(image).text((self.margin // 2, self.margin // 2), word, fill=255, font=font)
+            self._glyphs[key] = np.asarray(image) > 0
+        return self._glyphs[key]
+
+    def target_levels(self, frequencies):
+        """word -> size level of the top words (0 is the largest), from their frequency relative to the most frequent one."""
+        top = sorted(frequencies.items(), key=lambda item: item[1], reverse=True)[:self.max_words]
+        if not top:
+            return {}
+        max_frequency = top[0][1]
+        return {
+            word: round(-self.relative_scaling * math.log(frequency / max_frequency) / math.log(self.size_step))
+            for word, frequency in top
+        }
+
+    def level_size(self, level):
+        return max(self.min_font_size, int(self.max_font_size / self.size_step ** level))
+
+    def update(self, frequencies, reserved=None):
+        """
+        Lay out the next frame's `frequencies`, keeping what can be kept. `reserved`
+        is an extra (row, col, height, width) box to leave empty, such as a label.
+        Returns the number of words kept, placed and dropped.
+        """
+        import numpy as np
+        from PIL import Image
+        from wordcloud.wordcloud import IntegralOccupancyMap
+
+        levels = self.target_levels(frequencies)
+        kept = {word: entry for word, entry in self.placed.items() if word in levels and abs(levels[word] - entry[0]) <= 1}
+
+        occupied = self.blocked.astype(np.uint8)
+        if reserved:
+            row, col, height, width = reserved
+            occupied[row:row + height, col:col + width] = 1
+        for word, (_, font_size, orientation, (row, col)) in kept.items():
+            glyph = self.glyph(word, font_size, orientation)
+            occupied[row:row + glyph.shape[0], col:col + glyph.shape[1]] |= glyph
+        occupancy = IntegralOccupancyMap(self.height, self.width, occupied)
+
+        placed = dict(kept)
+        dropped = 0
+        # Biggest first, as WordCloud does, so large words find room
+        for word in sorted(levels, key=levels.get):
+            if word in kept:
+                continue
+            font_size = self.level_size(levels[word])
+            orientation = None if self.random_state.random() < self.prefer_horizontal else Image.ROTATE_90
+            tried_other_orientation = False
+            position = None
+            while font_size >= self.min_font_size:
+                glyph = self.glyph(word, font_size, orientation)
+                position = occupancy.sample_position(glyph.shape[0], glyph.shape[1], self.random_state)
+                if position is not None:
+                    break
+                if not tried_other_orientation and self.prefer_horizontal < 1:
+                    orientation = None if orientation is not None else Image.ROTATE_90
+                    tried_other_orientation = True
+                else:
+                    font_size -= self.font_step
+                    orientation = None
+            if position is None:
+                dropped += 1
+                continue
+            row, col = position
+            occupied[row:row + glyph.shape[0], col:col + glyph.shape[1]] |= glyph
+            occupancy.update(occupied, row, col)
+            placed[word] = (levels[word], font_size, orientation, (row, col))
+
+        self.placed = placed
+        return len(kept), len(placed) - len(kept), dropped
+
+    def draw(self, image, colormap):
+        """Draw the current layout onto `image`."""
+        from PIL import ImageDraw
+
+        draw = ImageDraw.Draw(image)
+        for word, (_, font_size, orientation, (row, col)) in self.placed.items():
+            draw.text((col + self.margin // 2, row + self.margin // 2), word, fill=word_color(word, colormap), font=self.font(font_size, orientation))
+
+
+def load_canvas(style, width):
+    """The blocked-pixel array of a style's mask scaled to `width`, or of a plain 4:3 canvas."""
+    import numpy as np
+    from PIL import Image
+
+    if not style['mask']:
+        return np.zeros((round(width * 0.75), width), dtype=bool)
+    with Image.open(style['mask']) as mask:
+        mask = mask.convert('L')
+        mask = mask.resize((width, round(mask.height * width / mask.width)), Image.NEAREST)
+    # White is outside the mask, as in WordCloud
+    return np.asarray(mask) == 255
+
+
+def debate_frequencies(debates, speaker=None, party=None):
+    """
+    Yield (debate, word frequencies) for every debate in which `speaker`, or any
+    candidate of `party`, speaks, in chronological order. Each transcript is
+    streamed and only the selected candidates' text is kept.
+    """
+    for debate in sorted(debates, key=lambda debate: (debate['year'], debate['suffix'])):
+        parties = manifest.candidate_parties(debate)
+        if speaker:
+            selected = {speaker.upper()} & set(parties)
+        else:
+            selected = {name for name, name_party in parties.items() if name_party == party}
+        if not selected:
+            continue
+        text = ' '.join(turn.text for turn in transcripts.read_turns(manifest.transcript_path(debate), debate['candidates'], manifest.moderator_tags(debate))
+                        if turn.speaker in selected)
+        frequencies = word_frequencies(text) if text.strip() else {}
+        if frequencies:
+            yield debate, frequencies
+
+
+def animate_clouds(debates, output, speaker=None, party=None, width=1000, fps=1.0, max_words=100, random_state=0, font_path=FONT_PATH):
+    """
+    Write an animated GIF with one word cloud per debate for `speaker` or `party`,
+    laying each frame out incrementally from the previous one. Frames go straight
+    into the GIF as they are drawn. Returns the number of frames.
+    """
+    from matplotlib import colormaps
+    from PIL import Image, ImageDraw, ImageFont
+
+    from create_readability_gif import GifStreamWriter, quantize_image
+
+    frames = debate_frequencies(debates, speaker, party)
+    first = next(frames, None)
+    if first is None:
+        print(f"{speaker or party} does not speak in any debate in the manifest")
+        return 0
+    if party is None:
+        party = manifest.candidate_parties(first[0]).get(speaker.upper(), '')
+    style = PARTY_STYLES.get(party, DEFAULT_STYLE)
+    colormap = colormaps[style['colormap']]
+
+    blocked = load_canvas(style, width)
+    layout = CloudLayout(blocked, font_path, max_words, random_state=random_state)
+    label_font = ImageFont.truetype(font_path, max(16, blocked.shape[0] // 24))
+    label_box = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), '0000x', font=label_font)
+    reserved = (8, 8, label_box[3] + 8, label_box[2] + 8)
+    palette = cloud_palette(colormap)
+
+    count = 0
+    with open(output, 'wb') as file:
+        writer = GifStreamWriter(file, (blocked.shape[1], blocked.shape[0]), palette, round(1000 / fps))
+        for debate, frequencies in chain([first], frames):
+            start = time.perf_counter()
+            kept, placed, dropped = layout.update(frequencies, reserved)
+            layout_ms = (time.perf_counter() - start) * 1000
+
+            image = Image.new('RGB', (blocked.shape[1], blocked.shape[0]), BACKGROUND_COLOR)
+            layout.draw(image, colormap)
+            ImageDraw.Draw(image).text((reserved[1] + 4, reserved[0] + 4), manifest.debate_id(debate), fill=LABEL_COLOR, font=label_font)
+            writer.add_frame(quantize_image(image, palette))
+            count += 1
+            print(f"{manifest.debate_id(debate)}: kept {kept}, placed {placed}, dropped {dropped} words (layout {layout_ms:.0f}ms)")
+        writer.close()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Animate how a candidate's or party's word cloud changes from debate to debate.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--speaker', help='Candidate to follow (e.g. Trump)')
+    group.add_argument('--party', choices=sorted(set(manifest.PARTY_COLORS.values())), help='Party to follow, all its candidates together')
+    parser.add_argument('--output', help='Output GIF (default: {speaker or party}_wordcloud_animation.gif)')
+    parser.add_argument('--width', type=int, default=1000, help='Width of the frames in pixels (default: 1000)')
+    parser.add_argument('--fps', type=float, default=1.0, help='Frames per second (default: 1.0)')
+    parser.add_argument('--max-words', type=int, default=100, help='Words per frame (default: 100)')
+    parser.add_argument('--seed', type=int, default=0, help='Random state of the layout (default: 0)')
+    parser.add_argument('--manifest', default=manifest.MANIFEST_FILE, help=f'Debates manifest (default: {manifest.MANIFEST_FILE})')
+    args = parser.parse_args()
+
+    output = args.output or f"{(args.speaker or args.party).lower()}_wordcloud_animation.gif"
+    start = time.perf_counter()
+    frames = animate_clouds(manifest.load_debates(args.manifest), output, args.speaker, args.party, args.width, args.fps, args.max_words, args.seed)
+    if frames:
+        print(f"Animated word cloud of {frames} debates saved as {output} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,402 @@
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from functools import lru_cache
+from operator import itemgetter
+from random import Random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from wordcloud import WordCloud
+from wordcloud.query_integral_image import query_integral_image
+from wordcloud.wordcloud import IntegralOccupancyMap
+
+from score_cache import write_json_atomic
+
+# One directory per (mask, canvas size, font): the boolean mask, the integral
+# occupancy image of the empty canvas and the measured glyph boxes
+CLOUD_CACHE_DIR = '.cloud_cache'
+
+# Bump whenever the layout of an entry or the meaning of a glyph box changes
+CLOUD_CACHE_VERSION = 1
+
+# Least recently used entries are evicted past this many bytes on disk
+CLOUD_CACHE_MAX_BYTES = 512 << 20
+
+# Entries and configured WordCloud objects each worker keeps in memory
+LOADED_ENTRIES = 4
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# id(mask) -> (mask, digest); the mask is held so its id is not reused
+_mask_digests = {}
+
+
+def mask_digest(mask):
+    """Hash of a mask array, computed once per array per process."""
+    if mask is None:
+        return None
+    if id(mask) not in _mask_digests:
+        _mask_digests[id(mask)] = (mask, hashlib.sha256(str((mask.dtype.str, mask.shape)).encode('utf-8') + np.ascontiguousarray(mask).tobytes()).hexdigest())
+    return _mask_digests[id(mask)][1]
+
+
+def entry_key(mask, width, height, font_path):
+    """Cache key of a (mask, canvas size, font) combination. The font is keyed by its path and contents."""
+    if mask is not None:
+        height, width = mask.shape[:2]
+    return hashlib.sha256(json.dumps([CLOUD_CACHE_VERSION, mask_digest(mask), width, height, font_path, file_digest(font_path)]).encode('utf-8')).hexdigest()[:32]
+
+
+@lru_cache(maxsize=256)
+def truetype(font_path, font_size):
+    return ImageFont.truetype(font_path, font_size)
+
+
+def glyph_key(word, font_size, orientation):
+    return f'{orientation or 0}|{font_size}|{word}'
+
+
+class LayoutEntry:
+    """
+    The preprocessed inputs of every layout on one mask, canvas and font: the
+    mask as WordCloud reads it, the integral occupancy image of the empty canvas
+    (memory-mapped; each layout works on a copy) and a table of glyph boxes by
+    word, font size and orientation that grows as new words are measured.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        mask_path = os.path.join(path, 'mask.npy')
+        self.boolean_mask = np.load(mask_path, mmap_mode='r') if os.path.exists(mask_path) else None
+        self.integral = np.load(os.path.join(path, 'integral.npy'), mmap_mode='r')
+        self.height, self.width = self.integral.shape
+        with open(os.path.join(path, 'glyphs.json'), 'r') as f:
+            self.glyphs = json.load(f)
+        self.new_glyphs = 0
+
+    def glyph_box(self, draw, word, font_size, orientation, font):
+        """`draw.textbbox` of the word at the origin, as WordCloud measures it, from the table when known."""
+        key = glyph_key(word, font_size, orientation)
+        box = self.glyphs.get(key)
+        if box is None:
+            box = list(draw.textbbox((0, 0), word, font=font, anchor='lt'))
+            self.glyphs[key] = box
+            self.new_glyphs += 1
+        return box
+
+    def save_glyphs(self):
+        """Merge newly measured glyphs into the entry on disk, with any other worker's."""
+        if not self.new_glyphs:
+            return
+        glyphs_path = os.path.join(self.path, 'glyphs.json')
+        try:
+            with open(glyphs_path, 'r') as f:
+                self.glyphs = {**json.load(f), **self.glyphs}
+            write_json_atomic(glyphs_path, self.glyphs)
+            os.utime(self.path)
+        except (OSError, ValueError):
+            # Evicted by another process meanwhile; the glyphs are measured again next time
+            pass
+        self.new_glyphs = 0
+
+
+def entry_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class CloudCache:
+    """
+    Disk cache of LayoutEntry directories with an in-memory LRU of loaded ones.
+    Entries are built once, shared by every seed, speaker, worker and run, and
+    the least recently used are evicted when the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=CLOUD_CACHE_DIR, max_bytes=CLOUD_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.loaded = OrderedDict()
+
+    def entry(self, mask, width, height, font_path):
+        key = entry_key(mask, width, height, font_path)
+        if key in self.loaded:
+            self.loaded.move_to_end(key)
+            return self.loaded[key]
+
+        path = os.path.join(self.cache_dir, key)
+        try:
+            entry = LayoutEntry(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            entry = self._build(path, mask, width, height)
+        self.loaded[key] = entry
+        if len(self.loaded) > LOADED_ENTRIES:
+            self.loaded.popitem(last=False)
+        return entry
+
+    def _build(self, path, mask, width, height):
+        """Write an entry into a temporary directory and rename it into place."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        # The same preprocessing as WordCloud.generate_from_frequencies
+        if mask is not None:
+            boolean_mask = WordCloud()._get_bolean_mask(mask)
+            np.save(os.path.join(tmp_path, 'mask.npy'), boolean_mask)
+            height, width = boolean_mask.shape
+        else:
+            boolean_mask = None
+        np.save(os.path.join(tmp_path, 'integral.npy'), IntegralOccupancyMap(height, width, boolean_mask).integral)
+        with open(os.path.join(tmp_path, 'glyphs.json'), 'w') as f:
+            json.dump({}, f)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another worker built it first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict(keep=path)
+        return LayoutEntry(path)
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries until the cache fits in max_bytes. Returns the number removed."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), entry_bytes(path), path))
+            except OSError:
+                pass
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = CloudCache()
+    return _cache
+
+
+def _update_integral(integral, img_grey, boolean_mask, pos_x, pos_y):
+    """
+    IntegralOccupancyMap.update with the occupancy below and right of the new
+    word read straight from the drawing, instead of converting the whole canvas,
+    and summed in place in the integral's own uint32. WordCloud sums in uint64
+    and then truncates to uint32, so the result is the same modulo 2**32.
+    """
+    width, height = img_grey.size
+    img_array = np.asarray(img_grey.crop((pos_y, pos_x, width, height)))
+    if boolean_mask is not None:
+        img_array = img_array + boolean_mask[pos_x:, pos_y:]
+    partial_integral = integral[pos_x:, pos_y:]
+    np.cumsum(img_array, axis=1, dtype=np.uint32, out=partial_integral)
+    np.cumsum(partial_integral, axis=0, out=partial_integral)
+    if pos_x > 0:
+        if pos_y > 0:
+            partial_integral += (integral[pos_x - 1, pos_y:] - integral[pos_x - 1, pos_y - 1])
+        else:
+            partial_integral += integral[pos_x - 1, pos_y:]
+    if pos_y > 0:
+        partial_integral += integral[pos_x:, pos_y - 1][:, np.newaxis]
+
+
+class _Fits(Exception):
+    pass
+
+
+class _FitProbe:
+    """A random_state for query_integral_image that stops at the first free spot without drawing from the real one."""
+
+    def randint(self, low, high):
+        raise _Fits
+
+
+def _fits(integral, size_x, size_y):
+    try:
+        query_integral_image(integral, size_x, size_y, _FitProbe())
+    except _Fits:
+        return True
+    return False
+
+
+class CachedWordCloud(WordCloud):
+    """
+    WordCloud whose layout starts from the cached mask, empty-canvas occupancy
+    and glyph boxes of its (mask, canvas size, font) instead of recomputing them,
+    and updates the occupancy only below and right of each placed word. Layouts
+    are identical to WordCloud's for the same random state.
+    """
+
+    def _largest_fitting_size(self, entry, draw, word, font_size, integral):
+        """
+        The size WordCloud's shrinking loop would stop at for a horizontal `word`,
+        starting at `font_size`: the largest size in `font_step` steps whose box
+        fits, or one step below min_font_size if none does. Boxes come from the
+        glyph table, and when they shrink with the font size so does the set of
+        sizes that fit, so a binary search finds the same size as trying each
+        in turn. A failed try draws nothing from the random state, so skipping
+        them leaves the layout unchanged. Otherwise `font_size` is returned for
+        the loop to try one size at a time.
+        """
+        sizes = list(range(font_size, self.min_font_size - 1, -self.font_step))
+        if len(sizes) < 3:
+            return font_size
+        windows = []
+        for size in sizes:
+            box = entry.glyph_box(draw, word, size, None, ImageFont.TransposedFont(truetype(self.font_path, size), orientation=None))
+            windows.append((box[3] + self.margin, box[2] + self.margin))
+        if any(smaller[0] > larger[0] or smaller[1] > larger[1] for larger, smaller in zip(windows, windows[1:])):
+            return font_size
+
+        low, high = 0, len(sizes)
+        while low < high:
+            middle = (low + high) // 2
+            if _fits(integral, *windows[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        return sizes[low] if low < len(sizes) else sizes[-1] - self.font_step
+
+    def generate_from_frequencies(self, frequencies, max_font_size=None):
+        # Follows WordCloud.generate_from_frequencies (wordcloud 1.9) step for step
+        frequencies = sorted(frequencies.items(), key=itemgetter(1), reverse=True)
+        if len(frequencies) <= 0:
+            raise ValueError("We need at least 1 word to plot a word cloud, got %d." % len(frequencies))
+        frequencies = frequencies[:self.max_words]
+
+        # largest entry will be 1
+        max_frequency = float(frequencies[0][1])
+        frequencies = [(word, freq / max_frequency) for word, freq in frequencies]
+
+        random_state = self.random_state if self.random_state is not None else Random()
+
+        entry = get_cache().entry(self.mask, self.width, self.height, self.font_path)
+        boolean_mask = entry.boolean_mask
+        height, width = entry.height, entry.width
+        occupancy = IntegralOccupancyMap(height, width, None)
+        occupancy.integral = np.array(entry.integral)
+
+        img_grey = Image.new("L", (width, height))
+        draw = ImageDraw.Draw(img_grey)
+        font_sizes, positions, orientations, colors = [], [], [], []
+
+        last_freq = 1.
+
+        if max_font_size is None:
+            max_font_size = self.max_font_size
+
+        if max_font_size is None:
+            # figure out a good font size by trying to draw with just the first two words
+            if len(frequencies) == 1:
+                font_size = self.height
+            else:
+                self.generate_from_frequencies(dict(frequencies[:2]), max_font_size=self.height)
+                sizes = [x[1] for x in self.layout_]
+                try:
+                    font_size = int(2 * sizes[0] * sizes[1] / (sizes[0] + sizes[1]))
+                except IndexError:
+                    try:
+                        font_size = sizes[0]
+                    except IndexError:
+                        raise ValueError("Couldn't find space to draw. Either the Canvas size"
+                                         " is too small or too much of the image is masked out.")
+        else:
+            font_size = max_font_size
+
+        self.words_ = dict(frequencies)
+
+        if self.repeat and len(frequencies) < self.max_words:
+            times_extend = int(np.ceil(self.max_words / len(frequencies))) - 1
+            frequencies_org = list(frequencies)
+            downweight = frequencies[-1][1]
+            for i in range(times_extend):
+                frequencies.extend([(word, freq * downweight ** (i + 1)) for word, freq in frequencies_org])
+
+        for word, freq in frequencies:
+            if freq == 0:
+                continue
+            rs = self.relative_scaling
+            if rs != 0:
+                font_size = int(round((rs * (freq / float(last_freq)) + (1 - rs)) * font_size))
+            if random_state.random() < self.prefer_horizontal:
+                orientation = None
+            else:
+                orientation = Image.ROTATE_90
+            tried_other_orientation = False
+            while True:
+                if font_size < self.min_font_size:
+                    break
+                transposed_font = ImageFont.TransposedFont(truetype(self.font_path, font_size), orientation=orientation)
+                box_size = entry.glyph_box(draw, word, font_size, orientation, transposed_font)
+                result = occupancy.sample_position(box_size[3] + self.margin, box_size[2] + self.margin, random_state)
+                if result is not None:
+                    break
+                # if we didn't find a place, make font smaller, but first try to rotate
+                if not tried_other_orientation and self.prefer_horizontal < 1:
+                    orientation = Image.ROTATE_90
+                    tried_other_orientation = True
+                else:
+                    # Only smaller horizontal sizes are tried from here on
+                    font_size = self._largest_fitting_size(entry, draw, word, font_size - self.font_step, occupancy.integral)
+                    orientation = None
+
+            if font_size < self.min_font_size:
+                break
+
+            x, y = np.array(result) + self.margin // 2
+            draw.text((y, x), word, fill="white", font=transposed_font)
+            positions.append((x, y))
+            orientations.append(orientation)
+            font_sizes.append(font_size)
+            colors.append(self.color_func(word, font_size=font_size, position=(x, y), orientation=orientation,
+                                          random_state=random_state, font_path=self.font_path))
+            _update_integral(occupancy.integral, img_grey, boolean_mask, x, y)
+            last_freq = freq
+
+        entry.save_glyphs()
+        self.layout_ = list(zip(frequencies, font_sizes, positions, orientations, colors))
+        return self
+
+
+# Configured CachedWordCloud objects by their settings, reused across seeds
+_wordclouds = OrderedDict()
+
+
+def wordcloud(random_state=None, mask=None, **options):
+    """
+    A CachedWordCloud with `options` and `mask`, reused across calls with the same
+    settings, set to `random_state` (an int seed, a Random or None).
+    """
+    key = (id(mask), tuple(sorted(options.items())))
+    if key in _wordclouds:
+        _wordclouds.move_to_end(key)
+        cloud = _wordclouds[key]
+    else:
+        cloud = _wordclouds[key] = CachedWordCloud(mask=mask, **options)
+        if len(_wordclouds) > LOADED_ENTRIES:
+            _wordclouds.popitem(last=False)
+    cloud.random_state = Random(random_state) if isinstance(random_state, int) else random_state
+    cloud.scale = 1
+    return cloud
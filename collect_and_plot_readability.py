@@ -1,50 +1,17 @@
-import subprocess
-import matplotlib.pyplot as plt
-import numpy as np
-from collections import defaultdict
-import re
-import json
+from startup import report_startup
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 import os
+import traceback
 
-# Define the list of debates with their parameters
-debates = [
-    {'year': 1960, 'suffix': 'a', 'candidates': ['Kennedy', 'Nixon'], 'colors': ['blue', 'red']},
-    {'year': 1960, 'suffix': 'b', 'candidates': ['Kennedy', 'Nixon'], 'colors': ['blue', 'red']},
-    {'year': 1960, 'suffix': 'c', 'candidates': ['Kennedy', 'Nixon'], 'colors': ['blue', 'red']},
-    {'year': 1976, 'suffix': 'a', 'candidates': ['Carter', 'Ford'], 'colors': ['blue', 'red']},
-    {'year': 1976, 'suffix': 'b', 'candidates': ['Carter', 'Ford'], 'colors': ['blue', 'red']},
-    {'year': 1976, 'suffix': 'c', 'candidates': ['Carter', 'Ford'], 'colors': ['blue', 'red']},
-    {'year': 1980, 'suffix': 'a', 'candidates': ['Carter', 'Reagan'], 'colors': ['blue', 'red']},
-    {'year': 1984, 'suffix': 'a', 'candidates': ['Mondale', 'Reagan'], 'colors': ['blue', 'red']},
-    {'year': 1984, 'suffix': 'b', 'candidates': ['Mondale', 'Reagan'], 'colors': ['blue', 'red']},
-    {'year': 1988, 'suffix': 'a', 'candidates': ['Dukakis', 'Bush'], 'colors': ['blue', 'red']},
-    {'year': 1988, 'suffix': 'b', 'candidates': ['Dukakis', 'Bush'], 'colors': ['blue', 'red']},
-    {'year': 1992, 'suffix': 'a', 'candidates': ['Clinton', 'Bush', 'Perot'], 'colors': ['blue', 'red', 'green']},
-    {'year': 1992, 'suffix': 'b', 'candidates': ['Clinton', 'Bush', 'Perot'], 'colors': ['blue', 'red', 'green']},
-    {'year': 1992, 'suffix': 'c', 'candidates': ['Clinton', 'Bush', 'Perot'], 'colors': ['blue', 'red', 'green']},
-    {'year': 1996, 'suffix': 'a', 'candidates': ['Clinton', 'Dole'], 'colors': ['blue', 'red']},
-    {'year': 1996, 'suffix': 'b', 'candidates': ['Clinton', 'Dole'], 'colors': ['blue', 'red']},
-    {'year': 2000, 'suffix': 'a', 'candidates': ['Gore', 'Bush'], 'colors': ['blue', 'red']},
-    {'year': 2000, 'suffix': 'b', 'candidates': ['Gore', 'Bush'], 'colors': ['blue', 'red']},
-    {'year': 2000, 'suffix': 'c', 'candidates': ['Gore', 'Bush'], 'colors': ['blue', 'red']},
-    {'year': 2004, 'suffix': 'a', 'candidates': ['Kerry', 'Bush'], 'colors': ['blue', 'red']},
-    {'year': 2004, 'suffix': 'b', 'candidates': ['Kerry', 'Bush'], 'colors': ['blue', 'red']},
-    {'year': 2004, 'suffix': 'c', 'candidates': ['Kerry', 'Bush'], 'colors': ['blue', 'red']},
-    {'year': 2008, 'suffix': 'a', 'candidates': ['Obama', 'McCain'], 'colors': ['blue', 'red']},
-    {'year': 2008, 'suffix': 'b', 'candidates': ['Obama', 'McCain'], 'colors': ['blue', 'red']},
-    {'year': 2008, 'suffix': 'c', 'candidates': ['Obama', 'McCain'], 'colors': ['blue', 'red']},
-    {'year': 2012, 'suffix': 'a', 'candidates': ['Obama', 'Romney'], 'colors': ['blue', 'red']},
-    {'year': 2012, 'suffix': 'b', 'candidates': ['Obama', 'Romney'], 'colors': ['blue', 'red']},
-    {'year': 2012, 'suffix': 'c', 'candidates': ['Obama', 'Romney'], 'colors': ['blue', 'red']},
-    {'year': 2016, 'suffix': 'a', 'candidates': ['Clinton', 'Trump'], 'colors': ['blue', 'red']},
-    {'year': 2016, 'suffix': 'b', 'candidates': ['Clinton', 'Trump'], 'colors': ['blue', 'red']},
-    {'year': 2016, 'suffix': 'c', 'candidates': ['Clinton', 'Trump'], 'colors': ['blue', 'red']},
-    {'year': 2020, 'suffix': 'a', 'candidates': ['Biden', 'Trump'], 'colors': ['blue', 'red']},
-    {'year': 2020, 'suffix': 'b', 'candidates': ['Biden', 'Trump'], 'colors': ['blue', 'red']},
-    {'year': 2024, 'suffix': 'a', 'candidates': ['Biden', 'Trump'], 'colors': ['blue', 'red']},
-    {'year': 2024, 'suffix': 'b', 'candidates': ['Harris', 'Trump'], 'colors': ['blue', 'red']},
-]
-
+import charts
+import readlvl
+import results_store
+import tracing
+import transcripts
+from manifest import debate_chart_path, debate_id, load_debates, moderator_tags, transcript_path
+from score_cache import ScoreCache, debate_cache_key, write_json_atomic
 
 # Metrics to analyze
 metrics = [
@@ -57,292 +24,336 @@ metrics = [
 # Filename to save and load the collected scores
 results_filename = 'readability_scores_over_time.json'
 
-# Check if the results file exists
-if os.path.exists(results_filename):
-    print(f"Loading results from {results_filename}...")
-    with open(results_filename, 'r') as f:
-        scores_over_time = json.load(f)
-else:
-    print("Results file not found. Running analysis...")
-    # Dictionary to store scores
-    scores_over_time = {metric: {'blue': {}, 'red': {}} for metric in metrics}
-
-    # Collect readability scores from each debate
-    debate_ids = []
-    debates_by_year = defaultdict(list)
-    debate_x_values = {}
-
-    for debate in debates:
-        # Construct the command
-        cmd = ['python3', 'readlvl.py', '--year', str(debate['year']), '--candidates'] + debate['candidates'] + ['--colors'] + debate['colors']
-        if debate.get('suffix'):
-            cmd.extend(['--suffix', debate['suffix']])
-
-        # Run the command and capture the output
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-        # Check if the command executed successfully
-        if result.returncode != 0:
-            print(f"Error running command: {' '.join(cmd)}")
-            print(result.stderr)
-            continue
-
-        # Extract the output
-        output = result.stdout
-
-        # Parse the output to extract the scores
-        lines = output.strip().split('\n')
-        scores_json = ''
-        for i, line in enumerate(lines):
-            if line.startswith('Scores for'):
-                # The next line should contain the JSON scores
-                if i + 1 < len(lines):
-                    scores_json = lines[i + 1]
-                break
-
-        if not scores_json:
-            print(f"Scores not found in output for debate {debate['year']}{debate.get('suffix', '')}")
-            continue
-
-        # Parse the JSON string
+# Filename for the bootstrap confidence intervals of those scores
+intervals_filename = 'readability_intervals_over_time.json'
+
+
+@dataclass
+class DebateResult:
+    """Readability scores for a single debate, as returned by a collection worker."""
+    year: int
+    suffix: str
+    candidates: list
+    colors: list
+    scores: dict = None  # metric -> speaker -> score
+    intervals: dict = None  # metric -> speaker -> [low, high]
+    counts: dict = None  # speaker -> readstats.ReadabilityStats fields
+    delta_intervals: dict = None  # metric -> [low, high] of red minus blue
+    output_file: str = None
+    error: str = None
+    cached: bool = False  # scores came from the cache rather than a fresh scoring run
+
+    @property
+    def debate_id(self):
+        return f"{self.year}{self.suffix}"
+
+    def chart_job(self):
+        """The ChartJob for this debate's bar chart."""
+        return readlvl.readability_chart_job(self.scores, self.candidates, self.colors, self.output_file, self.year, self.suffix)
+
+
+def color_candidates(colors, candidates):
+    """color -> upper-cased candidate name."""
+    return {color.strip(): candidate.strip().upper() for color, candidate in zip(colors, candidates)}
+
+
+def score_turns(result, turns):
+    """
+    Fill in `result`'s scores from the debate's candidate turns, with bootstrap
+    confidence intervals for every score and for the red minus blue delta.
+    """
+    import bootstrap
+
+    with tracing.span('score'):
+        stats = readlvl.speaker_stats(transcripts.join_speakers(turns))
+        readability_scores = readlvl.readability_from_stats(stats)
+    result.scores = {metric: dict(scores) for metric, scores in readability_scores.items()}
+    result.counts = {speaker: asdict(speaker_stats) for speaker, speaker_stats in stats.items()}
+
+    with tracing.span('bootstrap'):
+        boots = bootstrap.bootstrap_debate(turns)
+        result.intervals = bootstrap.score_intervals(result.scores, boots)
+        by_color = color_candidates(result.colors, result.candidates)
+        if 'red' in by_color and 'blue' in by_color:
+            result.delta_intervals = bootstrap.delta_intervals(result.scores, boots, by_color['red'], by_color['blue'])
+    return result
+
+
+def score_debate(debate):
+    """
+    Load, parse and score one debate in the current process. Errors are captured on
+    the result so one bad transcript does not stop the run.
+    """
+    year = debate['year']
+    suffix = debate.get('suffix') or ''
+    candidates = [name.strip() for name in debate['candidates']]
+    colors = [color.strip() for color in debate['colors']]
+    result = DebateResult(year, suffix.lower(), candidates, colors, output_file=debate_chart_path(debate))
+
+    with tracing.span('debate', category='debate', debate=result.debate_id):
         try:
-            scores_dict = json.loads(scores_json)
-        except json.JSONDecodeError as e:
-            print(f"Error parsing scores for debate {debate['year']}{debate.get('suffix', '')}: {e}")
-            continue
-
-        year = debate['year']
-        suffix = debate.get('suffix', '')
-        debate_id = f"{year}{suffix}"
-        debate_ids.append(debate_id)
-        debates_by_year[year].append(debate_id)
-
-        candidates = debate['candidates']
-        colors = debate['colors']
-
-        # Create a mapping from color to candidate
-        color_candidate_map = dict(zip(colors, candidates))
-        color_candidate_map = {color: candidate.upper() for color, candidate in color_candidate_map.items()}
-
-        # Get the candidate names for 'blue' and 'red'
-        blue_candidate = color_candidate_map.get('blue')
-        red_candidate = color_candidate_map.get('red')
-
-        if not blue_candidate or not red_candidate:
-            print(f"Missing blue or red candidate in debate {debate_id}")
-            continue
-
-        # Store the scores for each metric
-        for metric in metrics:
-            metric_scores = scores_dict.get(metric, {})
-            blue_score = metric_scores.get(blue_candidate)
-            red_score = metric_scores.get(red_candidate)
-
-            if blue_score is not None:
-                scores_over_time[metric]['blue'][debate_id] = blue_score
-            else:
-                print(f"Missing blue score in debate {debate_id}, metric {metric}")
-            if red_score is not None:
-                scores_over_time[metric]['red'][debate_id] = red_score
-            else:
-                print(f"Missing red score in debate {debate_id}, metric {metric}")
-
-    # Save the collected scores to a file
-    with open(results_filename, 'w') as f:
-        json.dump(scores_over_time, f)
-    print(f"Results saved to {results_filename}")
-
-# Generate x-values for each debate, adding gaps within the same year
-debate_x_values = {}
-debate_ids = []
-debates_by_year = defaultdict(list)
-
-# Reconstruct debates_by_year and debate_ids from the collected data
-for metric in metrics:
-    for candidate_color in ['blue', 'red']:
-        for debate_id in scores_over_time[metric][candidate_color].keys():
-            if debate_id not in debate_ids:
-                debate_ids.append(debate_id)
-                match = re.match(r'(\d{4})([a-zA-Z]?)', debate_id)
-                if match:
-                    year = int(match.group(1))
-                    debates_by_year[year].append(debate_id)
-
-# Generate x-values
-for year in sorted(debates_by_year.keys()):
-    debate_ids_in_year = sorted(debates_by_year[year])
-    num_debates = len(debate_ids_in_year)
-    if num_debates == 1:
-        x_positions = [year]
-    else:
-        # Spread debates within the same year between -0.2 and +0.2
-        offsets = np.linspace(-0.7, 0.7, num_debates)
-        x_positions = [year + offset for offset in offsets]
-    for debate_id, x in zip(debate_ids_in_year, x_positions):
-        debate_x_values[debate_id] = x
-
-# Now, get a sorted list of debate_ids based on x_values
-debate_ids_sorted = sorted(debate_ids, key=lambda d_id: debate_x_values[d_id])
-
-# Plot the scores over time for each metric
-for metric in metrics:
-    # Dictionaries to hold x and y values for each candidate
-    candidate_data = {
-        'blue': {'x': [], 'y': []},
-        'red': {'x': [], 'y': []}
-    }
-
-    for debate_id in debate_ids_sorted:
-        x_value = debate_x_values[debate_id]
-        blue_score = scores_over_time[metric]['blue'].get(debate_id)
-        red_score = scores_over_time[metric]['red'].get(debate_id)
-
-        if blue_score is not None:
-            candidate_data['blue']['x'].append(x_value)
-            candidate_data['blue']['y'].append(blue_score)
-
-        if red_score is not None:
-            candidate_data['red']['x'].append(x_value)
-            candidate_data['red']['y'].append(red_score)
-
-    # Plotting
-    plt.figure(figsize=(12, 6))
-
-    # Plot blue candidate
-    plt.plot(candidate_data['blue']['x'], candidate_data['blue']['y'], color='blue', marker='o', markersize=4, linestyle='-', linewidth=3, label='Democratic Candidate')
-
-    # Plot red candidate
-    plt.plot(candidate_data['red']['x'], candidate_data['red']['y'], color='red', marker='o', markersize=4, linestyle='-', linewidth=3, label='Republican Candidate')
-
-    plt.title(f'{metric.replace("\\n", " ")}', fontsize=20, fontweight='bold')
-    plt.xlabel('Year', fontsize=18, fontweight='bold')
-    plt.ylabel('Score', fontsize=18, fontweight='bold')
-    plt.legend()
-
-    # Create x-ticks at integer years
-    all_years = sorted(debates_by_year.keys())
-    plt.xticks(ticks=all_years, labels=all_years, rotation=45, fontsize=16)
-
-    score_levels = range(3, 13 ,1)
-    plt.yticks(ticks=score_levels, labels=score_levels, fontsize=16)
-    
-    plt.grid(axis='y', which='major', linestyle='--', alpha=0.7)
-    plt.grid(axis='x', which='major', linestyle='--', alpha=0.7)
-
-    plt.text(
-        -0.05, -0.175, 
-        'Source: Transcripts used with permission from the American Presidency Project https://presidency.ucsb.edu',
-        ha='left', va='top', fontsize=6, color='gray', transform=plt.gca().transAxes
-    )
-    plt.text(
-        1, -0.175, 
-        'https://github.com/faradayberry/debatecloud',
-        ha='right', va='top', fontsize=6, color='gray', transform=plt.gca().transAxes
-    )
-
-    plt.tight_layout()
-    # Save the plot
-    metric_name = metric.replace('\n', '_').replace(' ', '_')
-    plt.savefig(f'{metric_name}_over_time.png')
-    plt.close()
-    print(f"Plot saved for metric {metric.replace('\\n', ' ')}")
-
-# Generate x-values for each debate, adding gaps within the same year
-debate_x_values = {}
-debate_ids = []
-debates_by_year = defaultdict(list)
-
-# Reconstruct debates_by_year and debate_ids from the collected data
-for metric in metrics:
-    for candidate_color in ['blue', 'red']:
-        for debate_id in scores_over_time[metric][candidate_color].keys():
-            if debate_id not in debate_ids:
-                debate_ids.append(debate_id)
-                match = re.match(r'(\d{4})([a-zA-Z]?)', debate_id)
-                if match:
-                    year = int(match.group(1))
-                    debates_by_year[year].append(debate_id)
-
-# Generate y-values (years with small offsets)
-for year in sorted(debates_by_year.keys()):
-    debate_ids_in_year = sorted(debates_by_year[year])
-    num_debates = len(debate_ids_in_year)
-    if num_debates == 1:
-        y_positions = [year]
-    elif num_debates == 2:
-        offsets = np.linspace(-0.5, 0.5, num_debates)
-        y_positions = [year + offset for offset in offsets] 
-    else:
-        offsets = np.linspace(-1.1, 1.1, num_debates)
-        y_positions = [year + offset for offset in offsets]
-    for debate_id, y in zip(debate_ids_in_year, y_positions):
-        debate_x_values[debate_id] = y
-
-# Now, get a sorted list of debate_ids based on y_values (years)
-debate_ids_sorted = sorted(debate_ids, key=lambda d_id: debate_x_values[d_id])
-
-# Plot the delta scores over time for each metric
-for metric in metrics:
-    deltas = []
-    y_values = []
-    colors = []
-    
-    for debate_id in debate_ids_sorted:
-        y_value = debate_x_values[debate_id]
-        blue_score = scores_over_time[metric]['blue'].get(debate_id)
-        red_score = scores_over_time[metric]['red'].get(debate_id)
-
-        if blue_score is not None and red_score is not None:
-            delta = red_score - blue_score  # Red minus Blue
-            deltas.append(delta)
-            y_values.append(y_value)
-            # Set the color: blue for negative delta, red for positive delta
-            colors.append('red' if delta > 0 else 'blue')
+            with tracing.span('parse'):
+                turns = list(transcripts.read_turns(transcript_path(debate), candidates, moderator_tags(debate)))
+            score_turns(result, turns)
+        except Exception:
+            result.scores = None
+            result.error = traceback.format_exc()
+    return result
+
+
+def collect_scores(debates, max_workers=None):
+    """
+    Score every debate across a process pool and yield a DebateResult per debate in
+    the order given. Each worker imports the scoring libraries once and is reused for
+    many debates; `max_workers` defaults to the number of CPUs.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=tracing.attach, initargs=tracing.context()) as executor:
+        yield from executor.map(score_debate, debates)
+
+
+def add_debate_intervals(intervals_over_time, result):
+    """Store the blue, red and delta intervals from `result` into `intervals_over_time`."""
+    by_color = color_candidates(result.colors, result.candidates)
+    for metric in metrics:
+        for color in ['blue', 'red']:
+            interval = (result.intervals or {}).get(metric, {}).get(by_color.get(color))
+            if interval:
+                intervals_over_time[metric][color][result.debate_id] = interval
+        delta = (result.delta_intervals or {}).get(metric)
+        if delta:
+            intervals_over_time[metric]['delta'][result.debate_id] = delta
+
+
+def build_intervals_over_time(results):
+    """metric -> 'blue' / 'red' / 'delta' -> debate_id -> [low, high]."""
+    intervals_over_time = {metric: {'blue': {}, 'red': {}, 'delta': {}} for metric in metrics}
+    for result in results:
+        add_debate_intervals(intervals_over_time, result)
+    return intervals_over_time
+
+
+def run_analysis(debates, max_workers=None, cache=None):
+    """
+    Score every debate, re-scoring only those whose transcript, candidate list or
+    scorer version changed since the cached run. Returns the results_store table
+    and the DebateResults in manifest order.
+    """
+    if cache is None:
+        cache = ScoreCache()
+
+    # Look every debate up in the cache by content hash
+    results = {}
+    cache_keys = {}
+    pending = []
+    with tracing.span('cache lookup'):
+        for index, debate in enumerate(debates):
+            try:
+                key = debate_cache_key(transcript_path(debate), debate['candidates'], moderator_tags(debate))
+            except OSError:
+                # Let the worker report the missing transcript
+                key = None
+            cache_keys[index] = key
+            entry = cache.get(key) if key else None
+            if entry is None or 'counts' not in entry:
+                # Entries written by serve.py have no counts for the results table
+                pending.append(index)
+                continue
+            result = DebateResult(debate['year'], (debate.get('suffix') or '').lower(),
+                                  [name.strip() for name in debate['candidates']],
+                                  [color.strip() for color in debate['colors']],
+                                  scores=entry['scores'], intervals=entry.get('intervals'),
+                                  delta_intervals=entry.get('delta_intervals'), counts=entry['counts'],
+                                  output_file=debate_chart_path(debate), cached=True)
+            results[index] = result
+
+    print(f"{len(results)} debates cached, {len(pending)} to score")
+
+    # Score the changed and new debates
+    if pending:
+        # Workers look syllables up in the shared lexicon instead of each counting them
+        with tracing.span('lexicon'):
+            import lexicon
+            lexicon.update_lexicon([transcript_path(debate) for debate in debates])
+        with tracing.span('score debates', debates=len(pending)):
+            scored = collect_scores([debates[index] for index in pending], max_workers)
+            for index, result in zip(pending, scored):
+                if result.error:
+                    print(f"Error scoring debate {result.debate_id}:")
+                    print(result.error)
+                    continue
+
+                if cache_keys[index]:
+                    cache.put(cache_keys[index], result.debate_id, result.scores,
+                              intervals=result.intervals, delta_intervals=result.delta_intervals, counts=result.counts)
+                results[index] = result
+
+    removed = cache.evict(key for key in cache_keys.values() if key)
+    if removed:
+        print(f"Evicted {removed} stale cache entries")
+
+    results = [results[index] for index in sorted(results)]
+    return results_store.results_table(results, metrics), results
+
+
+def save_results(table, intervals_over_time, **run):
+    """Write the results table, its JSON export and the intervals."""
+    with tracing.span('write results', rows=len(table['debate'])):
+        results_store.merge_results(table, metrics, 'readability', **run)
+        write_json_atomic(results_filename, results_store.export_json(table, metrics))
+        write_json_atomic(intervals_filename, intervals_over_time)
+
+
+def collect_and_save_scores(debates, max_workers=None):
+    """Score and save every debate. Returns the results table, the intervals and the DebateResults."""
+    table, results = run_analysis(debates, max_workers)
+    intervals_over_time = build_intervals_over_time(results)
+    save_results(table, intervals_over_time, debates=len(debates), scored=len(results),
+                 errors=sorted({debate_id(debate) for debate in debates} - {result.debate_id for result in results}))
+    print(f"Results saved to {results_store.RESULTS_DIR}/, {results_filename} and {intervals_filename}")
+    return table, intervals_over_time, results
+
+
+def debate_positions(table, spread):
+    """
+    Place every debate in the results table on the year axis, spreading debates
+    within the same year around it. `spread(num_debates)` gives the offset range
+    for a year with that many debates. Returns debate_id -> position and the
+    sorted years.
+    """
+    import numpy as np
+
+    debate_ids, first_rows = np.unique(table['debate'], return_index=True)
+    debate_years = table['year'][first_rows]
+
+    positions = {}
+    years = np.unique(debate_years).tolist()
+    for year in years:
+        debate_ids_in_year = sorted(debate_ids[debate_years == year].tolist())
+        num_debates = len(debate_ids_in_year)
+        if num_debates == 1:
+            year_positions = [year]
         else:
-            print(f"Missing score(s) for debate {debate_id}, metric {metric}")
-
-    # Plotting the bar chart
-    plt.figure(figsize=(10, 8))
-    plt.axvline(x=0, color='black', linewidth=0.5)  # Line at delta = 0
-
-    # Bar chart with colors based on delta sign
-    plt.barh(y=y_values, width=deltas, color=colors, edgecolor='black', height=1.1)
-
-    delta_levels = range(-4, 5 ,1)
-    plt.xticks(ticks=delta_levels, labels=delta_levels, fontsize=16)
-
-    # Add labels for the years on the y-axis
-    years = range(1960, 2025, 4)
-    plt.yticks(ticks=years, labels=years, fontsize=16)
-    
-    # Add grid for the y-axis
-    plt.grid(axis='y', which='major', linestyle='--', alpha=0.7)
-    
-    # Title and labels
-    plt.title(f'{metric.replace("\\n", " ")}', fontsize=20, fontweight='bold')
-    plt.xlabel('Delta', fontsize=18, fontweight='bold')
-    plt.ylabel('Year', fontsize=18, fontweight='bold')
-    
-    # Invert the y-axis so earlier years appear at the top
-    plt.gca().invert_yaxis()
-    
-    plt.text(
-        -0.1, -0.1, 
-        'Source: Transcripts used with permission from the American Presidency Project https://presidency.ucsb.edu',
-        ha='left', va='top', fontsize=7, color='gray', transform=plt.gca().transAxes
-    )
-    plt.text(
-        1, -0.1, 
-        'https://github.com/faradayberry/debatecloud',
-        ha='right', va='top', fontsize=7, color='gray', transform=plt.gca().transAxes
-    )
-
-    # Adjust layout to make it tight
-    plt.tight_layout()
-
-    # Save the plot
-    metric_name = metric.replace('\n', '_').replace(' ', '_')
-    plt.savefig(f'delta_{metric_name}_over_time.png')
-    plt.close()
-    
-    print(f"Delta plot saved for metric {metric.replace('\\n', ' ')}")
\ No newline at end of file
+            offsets = np.linspace(-spread(num_debates), spread(num_debates), num_debates)
+            year_positions = [year + offset for offset in offsets]
+        for debate_id, position in zip(debate_ids_in_year, year_positions):
+            positions[debate_id] = float(position)
+
+    return positions, years
+
+
+def color_scores(table, metric, color, chart_metrics=metrics):
+    """debate_id -> score of the `color` candidate for `metric`, one of the table's `chart_metrics`."""
+    rows = (table['metric'] == chart_metrics.index(metric)) & (table['color'] == color)
+    return dict(zip(table['debate'][rows].tolist(), table['score'][rows].tolist()))
+
+
+def over_time_chart_jobs(table, intervals_over_time=None, chart_metrics=metrics, score_levels=None, prefix=''):
+    """
+    One line chart per metric of the blue and red scores in the results table,
+    with error bars where `intervals_over_time` has them. Tables of other
+    metrics pass them as `chart_metrics`, with metric -> y ticks as
+    `score_levels` and a `prefix` for the output files.
+    """
+    # Spread debates within the same year between -0.7 and +0.7
+    x_values, years = debate_positions(table, lambda num_debates: 0.7)
+    debate_ids_sorted = sorted(x_values, key=x_values.get)
+
+    jobs = []
+    for metric in chart_metrics:
+        series = {}
+        intervals = {}
+        for color in ['blue', 'red']:
+            scores = color_scores(table, metric, color, chart_metrics)
+            scored = [debate_id for debate_id in debate_ids_sorted if debate_id in scores]
+            series[color] = ([x_values[debate_id] for debate_id in scored], [scores[debate_id] for debate_id in scored])
+            color_intervals = (intervals_over_time or {}).get(metric, {}).get(color, {})
+            intervals[color] = [color_intervals.get(debate_id) for debate_id in scored]
+
+        metric_name = metric.replace('\n', '_').replace(' ', '_')
+        jobs.append(charts.ChartJob(
+            kind='over_time',
+            layout=(tuple(years),) + ((tuple(score_levels[metric]),) if score_levels else ()),
+            data={'series': series, 'intervals': intervals, 'title': metric.replace('\\n', ' ')},
+            output_file=f'{prefix}{metric_name}_over_time.png',
+        ))
+    return jobs
+
+
+def delta_chart_jobs(table, intervals_over_time=None, chart_metrics=metrics, delta_levels=None, prefix=''):
+    """
+    One horizontal bar chart per metric of the red minus blue score for each debate
+    in the results table, with error bars where `intervals_over_time` has them.
+    `chart_metrics`, `delta_levels` (metric -> x ticks) and `prefix` are as in
+    over_time_chart_jobs.
+    """
+    y_values, _ = debate_positions(table, lambda num_debates: 0.5 if num_debates == 2 else 1.1)
+    debate_ids_sorted = sorted(y_values, key=y_values.get)
+
+    jobs = []
+    for metric in chart_metrics:
+        deltas = []
+        delta_intervals = (intervals_over_time or {}).get(metric, {}).get('delta', {})
+        blue_scores = color_scores(table, metric, 'blue', chart_metrics)
+        red_scores = color_scores(table, metric, 'red', chart_metrics)
+        for debate_id in debate_ids_sorted:
+            blue_score = blue_scores.get(debate_id)
+            red_score = red_scores.get(debate_id)
+
+            if blue_score is not None and red_score is not None:
+                deltas.append(red_score - blue_score)  # Red minus Blue
+            else:
+                deltas.append(None)
+                print(f"Missing score(s) for debate {debate_id}, metric {metric}")
+
+        metric_name = metric.replace('\n', '_').replace(' ', '_')
+        jobs.append(charts.ChartJob(
+            kind='delta',
+            layout=(tuple(y_values[debate_id] for debate_id in debate_ids_sorted),) + ((tuple(delta_levels[metric]),) if delta_levels else ()),
+            data={
+                'deltas': deltas,
+                'intervals': [delta_intervals.get(debate_id) if delta is not None else None for debate_id, delta in zip(debate_ids_sorted, deltas)],
+                'title': metric.replace('\\n', ' '),
+            },
+            output_file=f'delta_{prefix}{metric_name}_over_time.png',
+        ))
+    return jobs
+
+
+def plot_scores_over_time(table, intervals_over_time=None, max_workers=None):
+    for output_file in charts.render_charts(over_time_chart_jobs(table, intervals_over_time), max_workers):
+        print(f"Plot saved as {output_file}")
+
+
+def plot_delta_scores(table, intervals_over_time=None, max_workers=None):
+    for output_file in charts.render_charts(delta_chart_jobs(table, intervals_over_time), max_workers):
+        print(f"Delta plot saved as {output_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect readability scores for every debate and plot them over time.")
+    parser.add_argument('--workers', type=int, help='Number of worker processes used to score debates and draw charts (default: number of CPUs)')
+    parser.add_argument('--replot', action='store_true', help='Redraw every per-debate chart, not only those of re-scored debates')
+    parser.add_argument('--trace', metavar='FILE', help='Record timing and memory spans of every stage, across all workers, and save them as a Chrome trace JSON file')
+    args = parser.parse_args()
+    report_startup('collect_and_plot_readability')
+    if args.trace:
+        tracing.enable()
+
+    # Debates to analyze, from the manifest
+    debates = load_debates()
+    table, intervals_over_time, results = collect_and_save_scores(debates, args.workers)
+
+    # Per-debate charts of re-scored (or missing) debates and all summary charts,
+    # rendered together across one pool
+    chart_jobs = [
+        result.chart_job() for result in results
+        if args.replot or not result.cached or not os.path.exists(result.output_file)
+    ]
+    chart_jobs += over_time_chart_jobs(table, intervals_over_time)
+    chart_jobs += delta_chart_jobs(table, intervals_over_time)
+    with tracing.span('render charts', charts=len(chart_jobs)):
+        for output_file in charts.render_charts(chart_jobs, args.workers):
+            print(f"Plot saved as {output_file}")
+
+    if args.trace:
+        tracing.finish(args.trace)
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import readstats
+import transcripts
+from manifest import load_debates, moderator_tags, transcript_path as manifest_transcript_path
+from score_cache import debate_cache_key, write_json_atomic
+
+# Directory holding the tokenized corpus
+INDEX_DIR = '.corpus_index'
+
+# Bump whenever the on-disk layout or the tokenization changes
+INDEX_VERSION = 1
+
+# One record per token, in transcript order
+TOKEN_DTYPE = np.dtype([
+    ('token', '<i4'),      # id into the vocabulary
+    ('speaker', 'u1'),     # index into the debate's speaker list
+    ('turn', '<i4'),       # candidate turn number within the debate
+    ('sentence', '<i4'),   # sentence number within the debate
+    ('syllables', 'u1'),
+])
+
+# One record per vocabulary entry, indexed by token id
+VOCAB_DTYPE = np.dtype([
+    ('letters', 'u1'),
+    ('syllables', 'u1'),
+    ('complex', '?'),
+])
+
+
+def tokenize_turns(turns, speakers, vocab_ids, vocab):
+    """
+    Tokenize a debate's turns into a TOKEN_DTYPE array, adding unseen words to
+    `vocab`/`vocab_ids`. Words are lowercased and punctuation-free, split sentence by
+    sentence with readstats' sentence rule.
+    """
+    speaker_ids = {speaker: i for i, speaker in enumerate(speakers)}
+    records = []
+    sentence = 0
+    for turn_id, turn in enumerate(turns):
+        speaker_id = speaker_ids[turn.speaker]
+        for sentence_text in readstats.SENTENCE_RE.findall(turn.text):
+            for word in readstats.PUNCTUATION_RE.sub('', sentence_text).lower().split():
+                token = vocab_ids.get(word)
+                if token is None:
+                    token = vocab_ids[word] = len(vocab)
+                    vocab.append(word)
+                records.append((token, speaker_id, turn_id, sentence, min(readstats.count_syllables(word), 255)))
+            sentence += 1
+    return np.array(records, dtype=TOKEN_DTYPE)
+
+
+def _save_array_atomic(path, array):
+    tmp_path = f'{path}.tmp.npy'
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class CorpusIndex:
+    """Read side of the corpus index; token arrays are memory-mapped on first use."""
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, 'manifest.json'), 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != INDEX_VERSION:
+            raise ValueError(f"Corpus index in {index_dir} has version {manifest.get('version')}, expected {INDEX_VERSION}; rebuild it")
+        self.debates = manifest['debates']
+        with open(os.path.join(index_dir, 'vocab.json'), 'r') as f:
+            self.vocab = json.load(f)
+        self.vocab_info = np.load(os.path.join(index_dir, 'vocab.npy'), mmap_mode='r')
+        self._tokens = {}
+        self._vocab_ids = None
+
+    @property
+    def debate_ids(self):
+        return list(self.debates)
+
+    @property
+    def vocab_ids(self):
+        if self._vocab_ids is None:
+            self._vocab_ids = {word: i for i, word in enumerate(self.vocab)}
+        return self._vocab_ids
+
+    def speakers(self, debate_id):
+        return self.debates[debate_id]['speakers']
+
+    def tokens(self, debate_id):
+        """The debate's TOKEN_DTYPE array, memory-mapped read-only."""
+        if debate_id not in self._tokens:
+            path = os.path.join(self.index_dir, f'{debate_id}.npy')
+            self._tokens[debate_id] = np.load(path, mmap_mode='r')
+        return self._tokens[debate_id]
+
+    def speaker_tokens(self, debate_id, speaker):
+        tokens = self.tokens(debate_id)
+        return tokens[tokens['speaker'] == self.speakers(debate_id).index(speaker)]
+
+    def word_frequencies(self, debate_id, speaker):
+        """word -> count for one speaker, counted with a single bincount."""
+        counts = np.bincount(self.speaker_tokens(debate_id, speaker)['token'])
+        nonzero = np.flatnonzero(counts)
+        return {self.vocab[i]: int(counts[i]) for i in nonzero}
+
+
+def build_index(debates, index_dir=INDEX_DIR, transcript_path=manifest_transcript_path):
+    """
+    Build or incrementally update the index for `debates` (entries of the debates
+    manifest). Only debates whose transcript, candidates or scorer version
+    changed are re-tokenized; the vocabulary is append-only so existing token ids
+    stay valid. Returns (CorpusIndex, list of rebuilt debate ids).
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    manifest_path = os.path.join(index_dir, 'manifest.json')
+    vocab_path = os.path.join(index_dir, 'vocab.json')
+
+    manifest = {'version': INDEX_VERSION, 'debates': {}}
+    vocab = []
+    if os.path.exists(manifest_path) and os.path.exists(vocab_path):
+        with open(manifest_path, 'r') as f:
+            previous = json.load(f)
+        if previous.get('version') == INDEX_VERSION:
+            manifest = previous
+            with open(vocab_path, 'r') as f:
+                vocab = json.load(f)
+    vocab_ids = {word: i for i, word in enumerate(vocab)}
+
+    entries = {}
+    rebuilt = []
+    for debate in debates:
+        debate_id = f"{debate['year']}{(debate.get('suffix') or '').lower()}"
+        path = transcript_path(debate)
+        key = debate_cache_key(path, debate['candidates'], moderator_tags(debate))
+        entry = manifest['debates'].get(debate_id)
+        if entry and entry['key'] == key and os.path.exists(os.path.join(index_dir, f'{debate_id}.npy')):
+            entries[debate_id] = entry
+            continue
+
+        speakers = [name.strip().upper() for name in debate['candidates']]
+        tokens = tokenize_turns(transcripts.read_turns(path, debate['candidates'], moderator_tags(debate)), speakers, vocab_ids, vocab)
+        _save_array_atomic(os.path.join(index_dir, f'{debate_id}.npy'), tokens)
+        entries[debate_id] = {'key': key, 'file': path, 'speakers': speakers}
+        rebuilt.append(debate_id)
+
+    # Drop debates that left the manifest
+    for debate_id in set(manifest['debates']) - set(entries):
+        try:
+            os.unlink(os.path.join(index_dir, f'{debate_id}.npy'))
+        except FileNotFoundError:
+            pass
+
+    if rebuilt or not os.path.exists(os.path.join(index_dir, 'vocab.npy')):
+        vocab_info = np.zeros(len(vocab), dtype=VOCAB_DTYPE)
+        vocab_info['letters'] = np.minimum([len(word) for word in vocab], 255)
+        vocab_info['syllables'] = np.minimum(readstats.syllable_counts(vocab), 255)
+        vocab_info['complex'] = readstats.complex_flags(vocab)
+        _save_array_atomic(os.path.join(index_dir, 'vocab.npy'), vocab_info)
+        write_json_atomic(vocab_path, vocab)
+
+    write_json_atomic(manifest_path, {'version': INDEX_VERSION, 'debates': entries})
+    return CorpusIndex(index_dir), rebuilt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the tokenized corpus index.")
+    parser.add_argument('--index-dir', default=INDEX_DIR, help=f'Directory for the index (default: {INDEX_DIR})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index, rebuilt = build_index(load_debates(), args.index_dir)
+    print(f"Indexed {len(rebuilt)} of {len(index.debates)} debates in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    index = CorpusIndex(args.index_dir)
+    total = sum(len(index.tokens(debate_id)) for debate_id in index.debate_ids)
+    print(f"Loaded {total} tokens, {len(index.vocab)} distinct words in {(time.perf_counter() - start) * 1000:.1f}ms")
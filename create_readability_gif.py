@@ -1,7 +1,18 @@
-import imageio
+from startup import report_startup
+import argparse
 import glob
 import re
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# The shared palette holds 255 colors; this index marks pixels unchanged since the
+# previous frame, which GIF then leaves untouched
+TRANSPARENT_INDEX = 255
+
+# Frames sampled, and the width they are shrunk to, when building the shared palette
+PALETTE_SAMPLE_FRAMES = 8
+PALETTE_SAMPLE_WIDTH = 600
 
 def get_debate_order(filename):
     """
@@ -21,9 +32,165 @@ def get_debate_order(filename):
         # If filename doesn't match the expected format, place it at the end
         return (float('inf'), float('inf'))
 
-def create_gif():
-    # Get all PNG files starting with 'readability_scores_'
-    image_files = glob.glob('readability_scores_*.png')
+def load_frame(filename, width=None):
+    """Decode one frame as RGB, optionally downscaled to `width` pixels."""
+    from PIL import Image
+
+    with Image.open(filename) as image:
+        image = image.convert('RGB')
+    if width and image.width != width:
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.LANCZOS)
+    return image
+
+def build_palette(filenames, width=None):
+    """
+    Compute one palette for the whole animation from a small sample of frames, so
+    every frame is mapped to the same colors instead of being quantized on its own.
+    """
+    from PIL import Image
+
+    step = max(1, len(filenames) // PALETTE_SAMPLE_FRAMES)
+    samples = [load_frame(filename, min(width or PALETTE_SAMPLE_WIDTH, PALETTE_SAMPLE_WIDTH)) for filename in filenames[::step][:PALETTE_SAMPLE_FRAMES]]
+
+    montage = Image.new('RGB', (max(s.width for s in samples), sum(s.height for s in samples)))
+    y = 0
+    for sample in samples:
+        montage.paste(sample, (0, y))
+        y += sample.height
+
+    colors = montage.quantize(colors=TRANSPARENT_INDEX, method=Image.Quantize.MEDIANCUT).getpalette()[:TRANSPARENT_INDEX * 3]
+    colors += [0] * (TRANSPARENT_INDEX * 3 - len(colors))
+    palette = Image.new('P', (1, 1))
+    # Repeat the first color in the transparent slot so no pixel prefers it
+    palette.putpalette(colors + colors[:3])
+    return palette
+
+def quantize_image(image, palette):
+    """Map an RGB image onto the shared palette, returning palette indices."""
+    import numpy as np
+    from PIL import Image
+
+    indices = np.asarray(image.quantize(palette=palette, dither=Image.Dither.NONE)).copy()
+    indices[indices == TRANSPARENT_INDEX] = 0
+    return indices
+
+def quantize_frame(filename, palette, width=None):
+    """Decode a frame and map it onto the shared palette, returning palette indices."""
+    return quantize_image(load_frame(filename, width), palette)
+
+def iter_frames(filenames, palette, width=None, workers=None):
+    """
+    Yield (filename, indices) in order, decoding frames on a thread pool. At most
+    twice the number of workers are in flight, so memory stays constant however many
+    frames there are. Frames that cannot be read yield None.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    def decode(filename):
+        try:
+            return quantize_frame(filename, palette, width)
+        except Exception as e:
+            print(f"Could not read {filename}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for filename in filenames:
+            pending.append((filename, executor.submit(decode, filename)))
+            if len(pending) >= 2 * workers:
+                filename, future = pending.popleft()
+                yield filename, future.result()
+        while pending:
+            filename, future = pending.popleft()
+            yield filename, future.result()
+
+def frame_chunks(image, offset, **params):
+    """
+    The encoded blocks of one GIF frame: its extensions, image descriptor and
+    image data. Uses Pillow's legacy GifImagePlugin.getdata where it exists, and
+    otherwise saves the frame as a one-frame GIF and strips the file header,
+    color table and trailer.
+    """
+    try:
+        from PIL.GifImagePlugin import getdata
+    except ImportError:
+        getdata = None
+    if getdata is not None:
+        return getdata(image, offset, **params)
+
+    import io
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='GIF', optimize=False, **params)
+    data = buffer.getvalue()
+    # Header and logical screen descriptor, then the global color table if flagged
+    start = 13 + (3 << ((data[10] & 0x07) + 1) if data[10] & 0x80 else 0)
+    # The offset lives in the image descriptor, after any extension blocks
+    position = start
+    while data[position] == 0x21:
+        position += 2
+        while data[position]:
+            position += data[position] + 1
+        position += 1
+    descriptor = bytearray(data[position:position + 10])
+    descriptor[1:5] = offset[0].to_bytes(2, 'little') + offset[1].to_bytes(2, 'little')
+    return [data[start:position], bytes(descriptor), data[position + 10:-1]]
+
+
+class GifStreamWriter:
+    """
+    Minimal animated GIF writer that appends frames as they arrive. All frames share
+    one global color table, and each frame after the first only stores the bounding
+    box of the pixels that changed, with unchanged pixels inside it transparent.
+    """
+
+    def __init__(self, file, size, palette, duration_ms, loop=0):
+        self.file = file
+        self.size = size
+        self.duration_ms = duration_ms
+        self.previous = None
+        self.frames = 0
+
+        width, height = size
+        # Logical screen: global color table of 256 entries, 8 bits per channel
+        file.write(b'GIF89a' + width.to_bytes(2, 'little') + height.to_bytes(2, 'little') + bytes([0xF7, 0, 0]))
+        file.write(bytes(palette.getpalette()[:768]).ljust(768, b'\0'))
+        # Netscape looping extension
+        file.write(b'!\xff\x0bNETSCAPE2.0\x03\x01' + loop.to_bytes(2, 'little') + b'\0')
+
+    def add_frame(self, indices):
+        import numpy as np
+        from PIL import Image
+
+        if self.previous is None:
+            frame, offset, params = indices, (0, 0), {}
+        else:
+            changed = indices != self.previous
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            if len(rows):
+                top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+            else:
+                # Nothing changed: a single transparent pixel keeps the frame's timing
+                top, bottom, left, right = 0, 1, 0, 1
+            frame = indices[top:bottom, left:right].copy()
+            frame[~changed[top:bottom, left:right]] = TRANSPARENT_INDEX
+            offset, params = (int(left), int(top)), {'transparency': TRANSPARENT_INDEX}
+
+        # Disposal 1 leaves each frame in place for the next one to draw over
+        for chunk in frame_chunks(Image.fromarray(frame, 'L'), offset, duration=self.duration_ms, disposal=1, **params):
+            self.file.write(chunk)
+        self.previous = indices
+        self.frames += 1
+
+    def close(self):
+        self.file.write(b';')
+
+def create_gif(output_filename='readability_scores_animation.gif', fps=0.9, width=None, workers=None, image_files=None):
+    # Get all PNG files starting with 'readability_scores_', unless given the frames
+    if image_files is None:
+        image_files = glob.glob('readability_scores_*.png')
     if not image_files:
         print("No images found with prefix 'readability_scores_'.")
         return
@@ -31,23 +198,38 @@ def create_gif():
     # Sort the image files based on year and suffix
     image_files_sorted = sorted(image_files, key=get_debate_order)
 
-    # Read images
-    images = []
-    for filename in image_files_sorted:
-        try:
-            image = imageio.imread(filename)
-            images.append(image)
-            print(f"Added {filename} to GIF.")
-        except Exception as e:
-            print(f"Could not read {filename}: {e}")
+    palette = build_palette(image_files_sorted, width)
+    # fps sets the speed of the GIF; GIF stores frame delays in milliseconds
+    duration_ms = round(1000 / fps)
 
-    # Set the frames per second (fps)
-    fps = 0.9  # Adjust this value to control the speed of the GIF
+    writer = None
+    with open(output_filename, 'wb') as file:
+        for filename, indices in iter_frames(image_files_sorted, palette, width, workers):
+            if indices is None:
+                continue
+            if writer is None:
+                size = (indices.shape[1], indices.shape[0])
+                writer = GifStreamWriter(file, size, palette, duration_ms)
+            elif (indices.shape[1], indices.shape[0]) != writer.size:
+                print(f"Skipping {filename}: size {indices.shape[1]}x{indices.shape[0]} does not match {writer.size[0]}x{writer.size[1]}")
+                continue
+            writer.add_frame(indices)
+            print(f"Added {filename} to GIF.")
+        if writer is not None:
+            writer.close()
 
-    # Save the images as an animated GIF
-    output_filename = 'readability_scores_animation.gif'
-    imageio.mimsave(output_filename, images, fps=fps, loop=0)
+    if writer is None:
+        os.unlink(output_filename)
+        print("No frames could be read.")
+        return
     print(f"Animated GIF saved as {output_filename}")
 
 if __name__ == "__main__":
-    create_gif()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Assemble the per-debate readability charts into an animated GIF.")
+    parser.add_argument('--output', default='readability_scores_animation.gif', help='Output GIF file')
+    parser.add_argument('--fps', type=float, default=0.9, help='Frames per second (default: 0.9)')
+    parser.add_argument('--width', type=int, help='Downscale frames to this width in pixels')
+    parser.add_argument('--workers', type=int, help='Threads used to decode frames (default: number of CPUs)')
+    args = parser.parse_args()
+    report_startup('create_readability_gif')
+    create_gif(args.output, args.fps, args.width, args.workers)
@@ -1,98 +1,183 @@
-import nltk
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import numpy as np
-from PIL import Image
-from collections import defaultdict
-nltk.download('stopwords')
-from nltk.corpus import stopwords
-
-def load_transcript(file_path):
-    with open(file_path, 'r') as file:
-        transcript = file.read()
-    return transcript
-
-def parse_transcript(transcript):
-    speakers = defaultdict(str)
-    lines = transcript.splitlines()
-    current_speaker = None
-    
-    for line in lines:
-        if line.startswith("TRUMP:"):
-            current_speaker = "TRUMP"
-            line = line.replace("TRUMP:", "").strip()
-        elif line.startswith("HARRIS:"):
-            current_speaker = "HARRIS"
-            line = line.replace("HARRIS:", "").strip()
-        elif line.startswith("MUIR:") or line.startswith("DAVIS:"):
-            current_speaker = None
-            
-        if current_speaker:
-            speakers[current_speaker] += " " + line
-    
-    return speakers
-
-def generate_wordcloud(text, filename, max_words=130, background_color='white', colormap='viridis', mask=None, min_font_size=24, random_state=None, font_path=None):
-    stop_words = set(stopwords.words('english'))
-    custom_stopwords = {'a', 'vice', 'donald', 'trump', 'is', 'the', 'former', 'president', 'and', 'would', 'you', 'let', 'people', 'something', 'said', 'kamala','harris'}
-    stop_words.update(custom_stopwords)
-    text = text.lower()
-
-    wordcloud = WordCloud(
+from startup import report_startup
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from debate_stopwords import STOPWORDS
+from transcripts import read_speakers
+
+# Output tiers as a target image width in pixels; None keeps the layout's own
+# resolution (the mask size, up to 4000 px)
+EXPORT_TIERS = {
+    'thumbnail': 640,
+    'web': 2000,
+    'print': None,
+}
+
+def word_frequencies(text, stop_words=STOPWORDS):
+    """Tokenize and count `text` once, exactly as WordCloud.generate would."""
+    from wordcloud import WordCloud
+
+    return WordCloud(stopwords=stop_words).process_text(text.lower())
+
+def export_wordcloud(wordcloud, filename, tier='print', compress_level=6):
+    """
+    Draw a generated cloud straight at the tier's resolution and save it as PNG or
+    WebP (by extension). Words are drawn at the scaled font size rather than
+    resampled from a larger canvas. `compress_level` is the zlib level (0-9) for PNG
+    and the lossless encoder effort (0-6) for WebP.
+    """
+    layout_width = wordcloud.mask.shape[1] if wordcloud.mask is not None else wordcloud.width
+    target_width = EXPORT_TIERS[tier]
+    wordcloud.scale = target_width / layout_width if target_width else 1
+    image = wordcloud.to_image()
+
+    if filename.lower().endswith('.webp'):
+        image.save(filename, format='WEBP', lossless=True, method=min(compress_level, 6))
+    else:
+        image.save(filename, format='PNG', compress_level=compress_level)
+
+def render_wordcloud(frequencies, filename, max_words=130, background_color='white', colormap='viridis', mask=None, min_font_size=24, random_state=None, font_path=None, tier='print', compress_level=6):
+    # The mask's occupancy and the font's glyph sizes come from the cloud cache,
+    # shared by every seed, speaker and run
+    import cloud_cache
+
+    wordcloud = cloud_cache.wordcloud(
         max_words=max_words,
         background_color=background_color,
         colormap=colormap,
-        stopwords=stop_words,
         min_font_size=min_font_size,
         mask=mask,
         random_state=random_state,
         font_path=font_path
-    ).generate(text)
-    
-    plt.figure(figsize=(8, 4), dpi=100, facecolor=background_color)
-    plt.imshow(wordcloud, interpolation="bilinear")
-    plt.axis('off')
-    
-    # Save png with high resolution
-    plt.savefig(filename, format='png', dpi=1000, facecolor=background_color,bbox_inches='tight')
-    plt.close()
-
-file_path = 'transcript.txt'
-transcript = load_transcript(file_path)
-speakers_text = parse_transcript(transcript)
-wordcloud_settings = {
-    "trump": {
-        "max_words": 100,
-        "background_color": "#949494",
-        "colormap": "Reds",
-        "mask": np.array(Image.open('elephant.png').convert('L')),
-        "font_path": "Roboto/Roboto-Black.ttf"
-    },
-    "harris": {
-        "max_words": 100,
-        "background_color": "#949494",
-        "colormap": "Blues",
-        "mask": np.array(Image.open('donkey.png').convert('L')),
-        "font_path": "Roboto/Roboto-Black.ttf"
+    ).generate_from_frequencies(frequencies)
+
+    export_wordcloud(wordcloud, filename, tier, compress_level)
+
+def generate_wordcloud(text, filename, max_words=130, background_color='white', colormap='viridis', mask=None, min_font_size=24, random_state=None, font_path=None, tier='print', compress_level=6):
+    render_wordcloud(
+        word_frequencies(text),
+        filename,
+        max_words=max_words,
+        background_color=background_color,
+        colormap=colormap,
+        mask=mask,
+        min_font_size=min_font_size,
+        random_state=random_state,
+        font_path=font_path,
+        tier=tier,
+        compress_level=compress_level
+    )
+
+def load_wordcloud_settings():
+    import numpy as np
+    from PIL import Image
+
+    return {
+        "trump": {
+            "max_words": 100,
+            "background_color": "#949494",
+            "colormap": "Reds",
+            "mask": np.array(Image.open('elephant.png').convert('L')),
+            "font_path": "Roboto/Roboto-Black.ttf"
+        },
+        "harris": {
+            "max_words": 100,
+            "background_color": "#949494",
+            "colormap": "Blues",
+            "mask": np.array(Image.open('donkey.png').convert('L')),
+            "font_path": "Roboto/Roboto-Black.ttf"
+        }
     }
-}
 
-num_clouds = 100
-for speaker, text in speakers_text.items():
+# Per-worker copy of the frequency tables and settings, sent once when the worker starts
+_batch = {}
+
+def _init_batch_worker(speaker_frequencies, wordcloud_settings, export_options):
+    _batch['frequencies'] = speaker_frequencies
+    _batch['settings'] = wordcloud_settings
+    _batch['export'] = export_options
+
+def render_speaker_cloud(frequencies, filename, speaker, wordcloud_settings, random_state, tier='print', compress_level=6):
+    """Render one seed of a speaker's cloud with that speaker's entry in `wordcloud_settings`."""
     settings = wordcloud_settings.get(speaker.lower(), {})
-    
-    for random_state in range(num_clouds):
-        filename = f"{speaker.lower()}_wordcloud_{random_state}.png"
-        
-        generate_wordcloud(
-            text, 
-            filename, 
-            max_words=settings.get('max_words', 100),
-            background_color=settings.get('background_color', 'white'),
-            colormap=settings.get('colormap', 'copper'),
-            mask=settings.get('mask', None),
-            min_font_size=24,
-            random_state=random_state,
-            font_path=settings.get('font_path', None)
-        )
-        print(f"Word cloud saved for {speaker} with random_state={random_state} as {filename}")
\ No newline at end of file
+    render_wordcloud(
+        frequencies,
+        filename,
+        max_words=settings.get('max_words', 100),
+        background_color=settings.get('background_color', 'white'),
+        colormap=settings.get('colormap', 'copper'),
+        mask=settings.get('mask', None),
+        min_font_size=24,
+        random_state=random_state,
+        font_path=settings.get('font_path', None),
+        tier=tier,
+        compress_level=compress_level
+    )
+
+def _render_seed(task):
+    speaker, random_state = task
+    export = _batch['export']
+    filename = f"{speaker.lower()}_wordcloud_{random_state}.{export['format']}"
+    render_speaker_cloud(_batch['frequencies'][speaker], filename, speaker, _batch['settings'], random_state, export['tier'], export['compress_level'])
+    return speaker, random_state, filename
+
+def corpus_weighted_frequencies(transcript, candidates, weighting, max_words=200):
+    """
+    speaker -> word -> weight for the transcript's candidates, weighted against the
+    whole debates manifest by term_weights instead of counted within the transcript.
+    """
+    import os
+
+    import manifest
+    import term_weights
+
+    debates = manifest.load_debates()
+    debate = next((debate for debate in debates if manifest.transcript_path(debate) == os.path.basename(transcript)), None)
+    if debate is None:
+        raise ValueError(f"{transcript} is not in the debates manifest; corpus weighting needs an indexed debate")
+    matrix = term_weights.load_term_matrix(debates)
+    return {
+        candidate.strip().upper(): term_weights.distinctive_words(matrix, candidate, manifest.debate_id(debate), weighting=weighting, max_words=max_words)
+        for candidate in candidates
+    }
+
+def render_wordclouds(speakers_text, wordcloud_settings, num_clouds, max_workers=None, tier='print', image_format='png', compress_level=6):
+    """
+    Render `num_clouds` seeds per speaker. Each speaker's text is tokenized and
+    counted once; the frequency tables and masks are shipped to each worker once
+    and every seed only runs the layout and export.
+    """
+    speaker_frequencies = {speaker: word_frequencies(text) for speaker, text in speakers_text.items()}
+    yield from render_frequency_clouds(speaker_frequencies, wordcloud_settings, num_clouds, max_workers, tier, image_format, compress_level)
+
+def render_frequency_clouds(speaker_frequencies, wordcloud_settings, num_clouds, max_workers=None, tier='print', image_format='png', compress_level=6):
+    """render_wordclouds for precomputed speaker -> word -> weight tables."""
+    export_options = {'tier': tier, 'format': image_format, 'compress_level': compress_level}
+    tasks = [(speaker, random_state) for speaker in speaker_frequencies for random_state in range(num_clouds)]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_batch_worker, initargs=(speaker_frequencies, wordcloud_settings, export_options)) as executor:
+        yield from executor.map(_render_seed, tasks)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate word clouds for each candidate in a debate transcript.")
+    parser.add_argument('--transcript', default='transcript.txt', help='Transcript to read (default: transcript.txt)')
+    parser.add_argument('--candidates', nargs='+', default=['Trump', 'Harris'], help='The names of the candidates (e.g., Trump Harris)')
+    parser.add_argument('--moderators', nargs='+', default=['MUIR', 'DAVIS', 'MODERATOR'], help='Speaker tags that end a candidate turn')
+    parser.add_argument('--num-clouds', type=int, default=100, help='Number of clouds (random states) per candidate')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--tier', choices=list(EXPORT_TIERS), default='print', help='Output resolution tier (default: print, the full mask resolution)')
+    parser.add_argument('--format', choices=['png', 'webp'], default='png', help='Output image format (default: png)')
+    parser.add_argument('--compress-level', type=int, default=6, help='PNG zlib level 0-9, or WebP lossless effort 0-6 (default: 6)')
+    parser.add_argument('--weighting', choices=['frequency', 'tfidf', 'log-odds'], default='frequency', help='Size words by raw frequency in the transcript, or by how distinctive they are against every debate in the manifest (default: frequency)')
+    args = parser.parse_args()
+    report_startup('debatecloud')
+
+    wordcloud_settings = load_wordcloud_settings()
+    if args.weighting == 'frequency':
+        speakers_text = read_speakers(args.transcript, args.candidates, args.moderators)
+        clouds = render_wordclouds(speakers_text, wordcloud_settings, args.num_clouds, args.workers, args.tier, args.format, args.compress_level)
+    else:
+        speaker_frequencies = corpus_weighted_frequencies(args.transcript, args.candidates, args.weighting)
+        clouds = render_frequency_clouds(speaker_frequencies, wordcloud_settings, args.num_clouds, args.workers, args.tier, args.format, args.compress_level)
+
+    for speaker, random_state, filename in clouds:
+        print(f"Word cloud saved for {speaker} with random_state={random_state} as {filename}")
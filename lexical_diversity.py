@@ -0,0 +1,169 @@
+import argparse
+import time
+
+import numpy as np
+
+import charts
+import collect_and_plot_readability as collect
+import corpus_index
+import results_store
+import tracing
+from manifest import debate_id, load_debates
+
+# Words per window of the moving-average type-token ratio
+MATTR_WINDOW = 500
+
+# Lexical diversity metrics, all in percent
+LEXICAL_METRICS = [
+    'Type-Token Ratio',
+    'Moving-Average Type-Token Ratio',
+    'Hapax Rate',
+    'Opponent Vocabulary Overlap',
+    'Vocabulary Carried Over',
+]
+
+# Source name of these metrics' rows in the results store
+RESULTS_SOURCE = 'lexical'
+
+# Prefix of the over-time and delta chart files
+CHART_PREFIX = 'lexical_'
+
+# metric -> y ticks of its over-time chart and x ticks of its delta chart
+SCORE_LEVELS = {
+    'Type-Token Ratio': range(10, 31, 5),
+    'Moving-Average Type-Token Ratio': range(40, 53, 2),
+    'Hapax Rate': range(4, 17, 2),
+    'Opponent Vocabulary Overlap': range(35, 66, 5),
+    'Vocabulary Carried Over': range(40, 71, 5),
+}
+DELTA_LEVELS = {
+    'Type-Token Ratio': range(-6, 7, 2),
+    'Moving-Average Type-Token Ratio': range(-4, 5, 1),
+    'Hapax Rate': range(-6, 7, 2),
+    'Opponent Vocabulary Overlap': range(-12, 13, 4),
+    'Vocabulary Carried Over': range(-8, 9, 2),
+}
+
+
+def moving_average_ttr(ids, window=MATTR_WINDOW):
+    """
+    Mean type-token ratio of every `window`-word window of `ids`, in one pass.
+    A word adds a type to every window that contains it but not its previous
+    occurrence, so the sum over all windows is a sum of range lengths, one per
+    word. Texts shorter than the window fall back to the plain ratio.
+    """
+    n = len(ids)
+    if n == 0:
+        return 0.0
+    if n <= window:
+        return len(np.unique(ids)) / n
+    # Position of each word's previous occurrence, -1 for first occurrences
+    order = np.argsort(ids, kind='stable')
+    same = ids[order[1:]] == ids[order[:-1]]
+    previous = np.full(n, -1, dtype=np.int64)
+    previous[order[1:][same]] = order[:-1][same]
+
+    positions = np.arange(n)
+    windows = n - window + 1
+    first = np.maximum(previous + 1, positions - window + 1)
+    last = np.minimum(positions, windows - 1)
+    return np.clip(last - first + 1, 0, None).sum() / (windows * window)
+
+
+def overlap(types, other_types):
+    """Share of the sorted unique `types` that also occur in `other_types`."""
+    if not len(types):
+        return 0.0
+    return len(np.intersect1d(types, other_types, assume_unique=True)) / len(types)
+
+
+def debate_counts(tokens, num_speakers, vocab_size):
+    """speaker x token id word counts of a debate, from one bincount."""
+    keys = tokens['speaker'].astype(np.int64) * vocab_size + tokens['token']
+    return np.bincount(keys, minlength=num_speakers * vocab_size).reshape(num_speakers, vocab_size)
+
+
+def lexical_results(debates, index):
+    """
+    One collect.DebateResult per debate with every LEXICAL_METRICS score of its
+    candidates and their word counts. Vocabulary is carried over from the pooled
+    vocabulary of the same party's candidates in the previous election year of
+    the manifest, so the first year has no such score.
+    """
+    vocab_size = len(index.vocab)
+    results = []
+    # debate_id -> sorted token ids used by each candidate
+    debate_types = {}
+    # year -> color -> sorted token ids used by that color's candidates
+    year_types = {}
+    for debate in debates:
+        tokens = index.tokens(debate_id(debate))
+        speakers = index.speakers(debate_id(debate))
+        counts = debate_counts(tokens, len(speakers), vocab_size)
+        types = debate_types[debate_id(debate)] = [np.flatnonzero(row) for row in counts]
+        words = counts.sum(axis=1)
+
+        scores = {metric: {} for metric in LEXICAL_METRICS}
+        for i, speaker in enumerate(speakers):
+            if not words[i]:
+                continue
+            opponents = np.unique(np.concatenate([types[j] for j in range(len(speakers)) if j != i] or [np.empty(0, dtype=np.int64)]))
+            scores['Type-Token Ratio'][speaker] = 100 * len(types[i]) / words[i]
+            scores['Moving-Average Type-Token Ratio'][speaker] = 100 * moving_average_ttr(tokens['token'][tokens['speaker'] == i])
+            scores['Hapax Rate'][speaker] = 100 * np.count_nonzero(counts[i] == 1) / words[i]
+            scores['Opponent Vocabulary Overlap'][speaker] = 100 * overlap(types[i], opponents)
+
+        colors = [color.strip() for color in debate['colors']]
+        for color, speaker_types in zip(colors, types):
+            pooled = year_types.setdefault(debate['year'], {})
+            pooled[color] = np.union1d(pooled.get(color, np.empty(0, dtype=np.int64)), speaker_types)
+
+        results.append(collect.DebateResult(
+            debate['year'], (debate.get('suffix') or '').lower(), debate['candidates'], debate['colors'],
+            scores={metric: {speaker: float(score) for speaker, score in by_speaker.items()} for metric, by_speaker in scores.items()},
+            counts={speaker: {'words': int(count)} for speaker, count in zip(speakers, words)},
+        ))
+
+    years = sorted(year_types)
+    for result in results:
+        earlier = [year for year in years if year < result.year]
+        if not earlier:
+            continue
+        previous = year_types[earlier[-1]]
+        for speaker, color, types in zip(index.speakers(result.debate_id), result.colors, debate_types[result.debate_id]):
+            if color.strip() in previous and len(types):
+                result.scores['Vocabulary Carried Over'][speaker] = float(100 * overlap(types, previous[color.strip()]))
+    return results
+
+
+def chart_jobs(table):
+    """Over-time and delta charts of every lexical metric, in the readability charts' styles."""
+    jobs = collect.over_time_chart_jobs(table, chart_metrics=LEXICAL_METRICS, score_levels=SCORE_LEVELS, prefix=CHART_PREFIX)
+    jobs += collect.delta_chart_jobs(table, chart_metrics=LEXICAL_METRICS, delta_levels=DELTA_LEVELS, prefix=CHART_PREFIX)
+    return jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score every candidate's lexical diversity in every debate and plot it over time.")
+    parser.add_argument('--manifest', default='debates.json', help='Debates manifest (default: debates.json)')
+    parser.add_argument('--no-plot', action='store_true', help='Only save the scores to the results store')
+    parser.add_argument('--workers', type=int, help='Number of worker processes used to draw charts (default: number of CPUs)')
+    args = parser.parse_args()
+
+    debates = load_debates(args.manifest)
+    start = time.perf_counter()
+    index, rebuilt = corpus_index.build_index(debates)
+    print(f"Corpus index ready in {time.perf_counter() - start:.2f}s ({len(rebuilt)} debates re-indexed)")
+
+    start = time.perf_counter()
+    results = lexical_results(debates, index)
+    table = results_store.results_table(results, LEXICAL_METRICS)
+    print(f"Scored {len(results)} debates in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    results_store.merge_results(table, LEXICAL_METRICS, RESULTS_SOURCE, debates=len(debates), window=MATTR_WINDOW)
+    print(f"Results saved to {results_store.RESULTS_DIR}/")
+
+    if not args.no_plot:
+        with tracing.span('render charts'):
+            for output_file in charts.render_charts(chart_jobs(table), args.workers):
+                print(f"Plot saved as {output_file}")
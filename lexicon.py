@@ -0,0 +1,207 @@
+import argparse
+import hashlib
+import importlib.metadata
+import json
+import os
+import time
+
+import readstats
+from score_cache import write_json_atomic
+
+# Shared word table: sorted words with their syllable counts and complex-word
+# flags, one .npy file per column, memory-mapped read-only by every process
+LEXICON_DIR = '.lexicon'
+
+# Bump whenever the layout or the meaning of a column changes
+LEXICON_VERSION = 1
+
+# Words are stored as fixed-width UTF-8; longer ones are left to the fallback
+MAX_WORD_BYTES = 32
+
+
+def dictionary_version():
+    """The syllable dictionary and easy word list every entry was derived from."""
+    easy_words = hashlib.sha256('\n'.join(sorted(readstats.easy_words())).encode('utf-8')).hexdigest()
+    return {'pyphen': importlib.metadata.version('pyphen'), 'textstat': importlib.metadata.version('textstat'), 'easy_words': easy_words}
+
+
+class Lexicon:
+    """
+    Read side of the lexicon. The columns are memory-mapped, so worker processes
+    share one copy of the table through the page cache. Words missing from the
+    table (or too long for it) fall back to readstats' per-word functions, so
+    lookups always agree with them.
+    """
+
+    def __init__(self, lexicon_dir, meta):
+        import numpy as np
+
+        self.key = meta.get('key')
+        prefix = os.path.join(lexicon_dir, meta['generation'])
+        self.words = np.load(f'{prefix}.words.npy', mmap_mode='r')
+        self.syllables = np.load(f'{prefix}.syllables.npy', mmap_mode='r')
+        self.complex = np.load(f'{prefix}.complex.npy', mmap_mode='r')
+
+    def __len__(self):
+        return len(self.words)
+
+    def find(self, words):
+        """Row of each lowercased word in the table and whether it was found, by one vectorized binary search."""
+        import numpy as np
+
+        keys = [word.encode('utf-8') for word in words]
+        fits = np.fromiter((len(key) <= MAX_WORD_BYTES for key in keys), dtype=bool, count=len(keys))
+        keys = np.array(keys, dtype=self.words.dtype)
+        rows = np.minimum(np.searchsorted(self.words, keys), len(self.words) - 1)
+        return rows, fits & (self.words[rows] == keys)
+
+    def syllable_counts(self, words):
+        """readstats.count_syllables of each word in `words`."""
+        import numpy as np
+
+        if not words or not len(self.words):
+            return [readstats.count_syllables(word) for word in words]
+        rows, found = self.find([word.lower() for word in words])
+        counts = self.syllables[rows].tolist()
+        for i in np.flatnonzero(~found).tolist():
+            counts[i] = readstats.count_syllables(words[i])
+        return counts
+
+    def complex_flags(self, words):
+        """readstats.is_complex_word of each lowercased word in `words`."""
+        import numpy as np
+
+        if not words or not len(self.words):
+            return [readstats.is_complex_word(word) for word in words]
+        rows, found = self.find(words)
+        flags = self.complex[rows].tolist()
+        for i in np.flatnonzero(~found).tolist():
+            flags[i] = readstats.is_complex_word(words[i])
+        return flags
+
+
+def load_lexicon(lexicon_dir=LEXICON_DIR):
+    """
+    The Lexicon in `lexicon_dir`, or None if there is none or it was built by
+    another layout version or from other dictionaries.
+    """
+    meta_path = os.path.join(lexicon_dir, 'meta.json')
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != LEXICON_VERSION or meta.get('dictionaries') != dictionary_version():
+            return None
+        return Lexicon(lexicon_dir, meta)
+    except (OSError, ValueError):
+        # Missing, or replaced by a newer generation between reading meta.json and the columns
+        return None
+
+
+def corpus_vocabulary(paths):
+    """Lowercased, punctuation-free words of the given transcripts, as readstats tokenizes them."""
+    vocabulary = set()
+    for path in paths:
+        with open(path, 'r') as file:
+            for line in file:
+                vocabulary.update(readstats.PUNCTUATION_RE.sub('', line).lower().split())
+    return vocabulary
+
+
+def sources_key(paths):
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        with open(path, 'rb') as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def build_lexicon(words, lexicon_dir=LEXICON_DIR, key=None, previous=None):
+    """
+    Write a lexicon of `words` plus the Dale-Chall easy words, reusing the entries
+    of the `previous` Lexicon so only new words are counted. Each build is a new
+    generation of column files, and meta.json is switched to it last, so readers
+    never see columns of different builds. Returns the number of entries.
+    """
+    import numpy as np
+
+    os.makedirs(lexicon_dir, exist_ok=True)
+    entries = sorted({word.lower() for word in words} | readstats.easy_words(), key=lambda word: word.encode('utf-8'))
+    entries = [word for word in entries if word and len(word.encode('utf-8')) <= MAX_WORD_BYTES]
+
+    generation = hashlib.sha256('\n'.join(entries).encode('utf-8')).hexdigest()[:16]
+    prefix = os.path.join(lexicon_dir, generation)
+    if previous is None:
+        syllables = [readstats.count_syllables(word) for word in entries]
+        complex_flags = [readstats.is_complex_word(word) for word in entries]
+    else:
+        syllables = previous.syllable_counts(entries)
+        complex_flags = previous.complex_flags(entries)
+    columns = {
+        'words': np.array([word.encode('utf-8') for word in entries], dtype=f'S{MAX_WORD_BYTES}'),
+        'syllables': np.minimum(syllables, 255).astype('u1'),
+        'complex': np.array(complex_flags, dtype=bool),
+    }
+    for name, column in columns.items():
+        tmp_path = f'{prefix}.{name}.tmp.npy'
+        np.save(tmp_path, column)
+        os.replace(tmp_path, f'{prefix}.{name}.npy')
+
+    meta_path = os.path.join(lexicon_dir, 'meta.json')
+    previous_generation = None
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r') as f:
+                previous_generation = json.load(f).get('generation')
+        except ValueError:
+            pass
+    if previous_generation == generation:
+        previous_generation = None
+
+    write_json_atomic(meta_path, {
+        'version': LEXICON_VERSION,
+        'dictionaries': dictionary_version(),
+        'generation': generation,
+        'previous': previous_generation,
+        'key': key,
+        'entries': len(entries),
+    })
+
+    # The previous generation is kept for readers that read meta.json before the
+    # switch but have not mapped its columns yet; processes that mapped an older
+    # one keep it until they exit
+    keep = {generation, previous_generation}
+    for name in os.listdir(lexicon_dir):
+        if name.endswith('.npy') and name.split('.', 1)[0] not in keep:
+            os.unlink(os.path.join(lexicon_dir, name))
+    return len(entries)
+
+
+def update_lexicon(paths, lexicon_dir=LEXICON_DIR):
+    """
+    Rebuild the lexicon from the vocabulary of the transcripts at `paths` unless it
+    was already built from the same transcripts and dictionaries; only words new
+    to it are counted. Returns the number of entries written, or 0 if it was up to
+    date.
+    """
+    paths = [path for path in paths if os.path.exists(path)]
+    key = sources_key(paths)
+    previous = load_lexicon(lexicon_dir)
+    if previous is not None and previous.key == key:
+        return 0
+    return build_lexicon(corpus_vocabulary(paths), lexicon_dir, key, previous)
+
+
+if __name__ == "__main__":
+    import manifest
+
+    parser = argparse.ArgumentParser(description="Build the shared syllable and complex-word lexicon from the debate transcripts.")
+    parser.add_argument('--lexicon-dir', default=LEXICON_DIR, help=f'Directory for the lexicon (default: {LEXICON_DIR})')
+    parser.add_argument('--manifest', default=manifest.MANIFEST_FILE, help=f'Debates manifest (default: {manifest.MANIFEST_FILE})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    entries = update_lexicon([manifest.transcript_path(debate) for debate in manifest.load_debates(args.manifest)], args.lexicon_dir)
+    if entries:
+        print(f"Built a lexicon of {entries} words in {time.perf_counter() - start:.2f}s")
+    else:
+        print("Lexicon is up to date")
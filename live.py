@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+
+import charts
+import readlvl
+import readstats
+import transcripts
+from score_cache import write_json_atomic
+
+
+class LiveTranscript:
+    """
+    Parse and scoring state of a transcript that is still being appended to. Only
+    new bytes are fed in; each complete line updates the running statistics of the
+    speaker it belongs to, so an update costs the same however long the debate is.
+    """
+
+    def __init__(self, candidate_names, moderator_tags=transcripts.MODERATOR_TAGS):
+        self.candidate_names = candidate_names
+        self.moderator_tags = moderator_tags
+        self.reset()
+
+    def reset(self):
+        self.tracker = transcripts.SpeakerTracker(self.candidate_names, self.moderator_tags)
+        self.speakers = {}
+        self.offset = 0    # bytes consumed from the file, including a partial last line
+        self.partial = b''
+        self.lines = 0
+
+    def feed(self, data):
+        """Consume newly appended bytes; returns True if any speaker's text grew."""
+        self.offset += len(data)
+        lines = (self.partial + data).split(b'\n')
+        # The last piece has no newline yet and may still be mid-line
+        self.partial = lines.pop()
+
+        changed = False
+        # Split complete lines at every break read_turns splits at, such as a lone '\r'
+        for line in (piece for line in lines for piece in line.decode('utf-8').splitlines() or ['']):
+            self.lines += 1
+            attributed = self.tracker.feed(line)
+            if attributed:
+                speaker, text = attributed
+                self.speakers.setdefault(speaker, readstats.RunningStats()).add(text)
+                changed = True
+        return changed
+
+    def scores(self):
+        """metric -> speaker -> score for every candidate who has spoken so far."""
+        scores = {metric: {} for metric in readstats.METRICS}
+        for speaker, running in self.speakers.items():
+            for metric, score in readstats.scores_from_stats(running.stats()).items():
+                scores[metric][speaker] = score
+        return scores
+
+
+def publish(scores, candidate_names, candidate_colors, json_file, chart_file, year, suffix=None):
+    """Write the scores JSON and redraw the bar chart for the candidates who have spoken."""
+    write_json_atomic(json_file, scores)
+    spoken = [(name, color) for name, color in zip(candidate_names, candidate_colors) if name.upper() in scores[readstats.METRICS[0]]]
+    if spoken:
+        names, colors = zip(*spoken)
+        charts.render_chart(readlvl.readability_chart_job(scores, names, colors, chart_file, year, suffix))
+
+
+async def watch(file_path, candidate_names, candidate_colors, year, suffix=None, refresh_interval=2.0, moderator_tags=transcripts.MODERATOR_TAGS, poll_interval=0.25):
+    """
+    Tail `file_path` and keep readability_scores_{year}{suffix}.json and .png up to
+    date until cancelled. The file is polled every `poll_interval` seconds and the
+    outputs are refreshed at most once per `refresh_interval`, on a worker thread so
+    tailing never waits for a chart. A file that shrinks is re-read from the start.
+    `moderator_tags` end a candidate's turn, as in transcripts.read_turns.
+    """
+    live = LiveTranscript(candidate_names, moderator_tags)
+    changed = asyncio.Event()
+    name = f"readability_scores_{year}{(suffix or '').lower()}"
+
+    async def tail():
+        while True:
+            try:
+                size = os.path.getsize(file_path)
+            except FileNotFoundError:
+                size = 0
+            if size < live.offset:
+                print(f"{file_path} was truncated or replaced; starting over")
+                live.reset()
+            if size > live.offset:
+                with open(file_path, 'rb') as file:
+                    file.seek(live.offset)
+                    data = file.read(size - live.offset)
+                if live.feed(data):
+                    changed.set()
+            await asyncio.sleep(poll_interval)
+
+    async def refresh():
+        loop = asyncio.get_running_loop()
+        while True:
+            await changed.wait()
+            changed.clear()
+            started = time.perf_counter()
+            scores = live.scores()
+            await loop.run_in_executor(None, publish, scores, candidate_names, candidate_colors, f'{name}.json', f'{name}.png', year, suffix)
+            elapsed = time.perf_counter() - started
+            summary = ', '.join(f"{speaker} {score}" for speaker, score in scores[readstats.METRICS[0]].items())
+            print(f"{live.lines} lines: {readstats.METRICS[0]} {summary} (refreshed in {elapsed:.2f}s)")
+            await asyncio.sleep(max(0.0, refresh_interval - elapsed))
+
+    await asyncio.gather(tail(), refresh())
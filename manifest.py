@@ -0,0 +1,57 @@
+import json
+import os
+
+from transcripts import MODERATOR_TAGS
+
+# Declarative list of debates: year, suffix, candidates, chart colors and the speaker
+# tags that end a candidate's turn, plus optional word cloud counts
+MANIFEST_FILE = 'debates.json'
+
+# Parties by chart color
+PARTY_COLORS = {'blue': 'Democratic', 'red': 'Republican', 'green': 'Independent'}
+
+
+def load_debates(path=MANIFEST_FILE):
+    """
+    The manifest's debates, each with its suffix lower-cased and its `moderators`
+    filled in from the manifest-wide default where it has none of its own.
+    """
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+    default_moderators = manifest.get('moderators', list(MODERATOR_TAGS))
+
+    debates = []
+    for debate in manifest['debates']:
+        if len(debate['candidates']) != len(debate['colors']):
+            raise ValueError(f"Debate {debate_id(debate)} in {path} has {len(debate['candidates'])} candidates but {len(debate['colors'])} colors")
+        debates.append(dict(debate, suffix=(debate.get('suffix') or '').lower(), moderators=debate.get('moderators', default_moderators)))
+    return debates
+
+
+def find_debate(year, suffix=None, path=MANIFEST_FILE):
+    """The manifest's entry for a debate, or None if it is not listed or there is no manifest."""
+    if not os.path.exists(path):
+        return None
+    wanted = f"{year}{(suffix or '').lower()}"
+    return next((debate for debate in load_debates(path) if debate_id(debate) == wanted), None)
+
+
+def debate_id(debate):
+    return f"{debate['year']}{(debate.get('suffix') or '').lower()}"
+
+
+def transcript_path(debate):
+    return f"transcript{debate_id(debate)}.txt"
+
+
+def debate_chart_path(debate):
+    return f"readability_scores_{debate_id(debate)}.png"
+
+
+def moderator_tags(debate):
+    return debate.get('moderators') or MODERATOR_TAGS
+
+
+def candidate_parties(debate):
+    """Upper-cased candidate -> party ('' for a color with no party)."""
+    return {name.strip().upper(): PARTY_COLORS.get(color.strip(), '') for name, color in zip(debate['candidates'], debate['colors'])}
@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+import corpus_index
+import readstats
+from manifest import load_debates
+from score_cache import write_json_atomic
+
+# Postings live next to the token arrays they are built from
+POSTINGS_DIR = os.path.join(corpus_index.INDEX_DIR, 'postings')
+
+# Bump whenever the postings layout changes
+POSTINGS_VERSION = 1
+
+
+def query_terms(text):
+    """Lowercased, punctuation-free words of a query, tokenized like the corpus index."""
+    return readstats.PUNCTUATION_RE.sub('', text).lower().split()
+
+
+def build_postings(tokens, vocab_size):
+    """
+    A debate's positional postings from its TOKEN_DTYPE array, in CSR form:
+    `offsets[t]:offsets[t + 1]` slices term t's positions out of `deltas`. Positions
+    are gap-encoded within each term (the first gap is the position itself), so
+    they compress well.
+    """
+    order = np.argsort(tokens['token'], kind='stable').astype(np.uint32)
+    counts = np.bincount(tokens['token'], minlength=vocab_size)
+    offsets = np.zeros(vocab_size + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    deltas = np.diff(order, prepend=np.uint32(0))
+    starts = offsets[:-1][counts > 0]
+    deltas[starts] = order[starts]
+    return offsets, deltas
+
+
+@dataclass
+class Hit:
+    debate_id: str
+    speaker: str
+    turn: int
+    position: int  # token position within the debate
+
+
+class PhraseIndex:
+    """
+    Read side of the positional index. Postings are term -> (debate, position)
+    lists, and the speaker and turn of a position come from the corpus index's
+    token arrays, so filtering by speaker costs one array lookup per match.
+    """
+
+    def __init__(self, index_dir=corpus_index.INDEX_DIR, postings_dir=POSTINGS_DIR):
+        self.corpus = corpus_index.CorpusIndex(index_dir)
+        self.postings_dir = postings_dir
+        with open(os.path.join(postings_dir, 'manifest.json'), 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != POSTINGS_VERSION:
+            raise ValueError(f"Postings in {postings_dir} have version {manifest.get('version')}, expected {POSTINGS_VERSION}; rebuild them")
+        self._postings = {}
+
+    def postings(self, debate_id):
+        if debate_id not in self._postings:
+            with np.load(os.path.join(self.postings_dir, f'{debate_id}.npz')) as data:
+                self._postings[debate_id] = (data['offsets'], data['deltas'])
+        return self._postings[debate_id]
+
+    def positions(self, debate_id, term_id):
+        """Sorted positions of a term in a debate."""
+        offsets, deltas = self.postings(debate_id)
+        if term_id is None or term_id + 1 >= len(offsets):
+            return np.empty(0, dtype=np.int64)
+        return np.cumsum(deltas[offsets[term_id]:offsets[term_id + 1]], dtype=np.int64)
+
+    def term_ids(self, words):
+        return [self.corpus.vocab_ids.get(word) for word in words]
+
+    def _matches(self, debate_id, term_ids, near):
+        """
+        Positions of the first word of every match, with the first and last
+        position each match spans: an exact phrase, or with `near` the first word
+        with every other word within `near` positions of it.
+        """
+        first = self.positions(debate_id, term_ids[0])
+        if near is None:
+            # Each later word must sit exactly i positions after the first
+            for i, term_id in enumerate(term_ids[1:], start=1):
+                first = np.intersect1d(first, self.positions(debate_id, term_id) - i, assume_unique=True)
+                if not len(first):
+                    break
+            return first, first, first + len(term_ids) - 1
+        low = high = first
+        for term_id in term_ids[1:]:
+            other = self.positions(debate_id, term_id)
+            # Nearest occurrence on either side of every candidate position
+            after = np.searchsorted(other, first)
+            right = other[np.minimum(after, len(other) - 1)] if len(other) else first + near + 1
+            left = other[np.maximum(after - 1, 0)] if len(other) else first - near - 1
+            use_right = np.abs(right - first) <= np.abs(first - left)
+            nearest = np.where(use_right, right, left)
+            keep = np.abs(nearest - first) <= near
+            first, low, high, nearest = first[keep], low[keep], high[keep], nearest[keep]
+            low, high = np.minimum(low, nearest), np.maximum(high, nearest)
+        return first, low, high
+
+    def search(self, query, near=None, speakers=None, debate_ids=None):
+        """
+        Hits of `query` as an exact phrase or, with `near`, of its words all within
+        `near` words of the first one. Matches never span two turns. `speakers`
+        and `debate_ids` restrict the search.
+        """
+        term_ids = self.term_ids(query_terms(query))
+        if not term_ids or None in term_ids:
+            return []
+        wanted = {speaker.upper() for speaker in speakers} if speakers else None
+
+        hits = []
+        for debate_id in debate_ids or self.corpus.debate_ids:
+            first, low, high = self._matches(debate_id, term_ids, near)
+            if not len(first):
+                continue
+            tokens = self.corpus.tokens(debate_id)
+            same_turn = tokens['turn'][low] == tokens['turn'][high]
+            names = self.corpus.speakers(debate_id)
+            for position, token in zip(first[same_turn].tolist(), tokens[first[same_turn]].tolist()):
+                speaker = names[token[1]]
+                if wanted is None or speaker in wanted:
+                    hits.append(Hit(debate_id, speaker, token[2], position))
+        return hits
+
+    def context(self, hit, width=8):
+        """The words around a hit, as lowercased index tokens."""
+        tokens = self.corpus.tokens(hit.debate_id)
+        window = tokens[max(0, hit.position - width):hit.position + width + 1]
+        return ' '.join(self.corpus.vocab[token] for token in window['token'])
+
+
+def count_hits(hits):
+    """debate_id -> speaker -> number of hits."""
+    counts = {}
+    for hit in hits:
+        by_speaker = counts.setdefault(hit.debate_id, {})
+        by_speaker[hit.speaker] = by_speaker.get(hit.speaker, 0) + 1
+    return counts
+
+
+def build_phrase_index(debates, index_dir=corpus_index.INDEX_DIR, postings_dir=POSTINGS_DIR):
+    """
+    Update the corpus index, then rebuild the postings of every debate whose
+    tokens changed. Returns (PhraseIndex, list of rebuilt debate ids).
+    """
+    index, _ = corpus_index.build_index(debates, index_dir)
+    os.makedirs(postings_dir, exist_ok=True)
+    manifest_path = os.path.join(postings_dir, 'manifest.json')
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == POSTINGS_VERSION:
+            previous = manifest['debates']
+
+    entries = {}
+    rebuilt = []
+    for debate_id, entry in index.debates.items():
+        path = os.path.join(postings_dir, f'{debate_id}.npz')
+        if previous.get(debate_id) == entry['key'] and os.path.exists(path):
+            entries[debate_id] = entry['key']
+            continue
+        offsets, deltas = build_postings(index.tokens(debate_id), len(index.vocab))
+        tmp_path = os.path.join(postings_dir, f'{debate_id}.tmp.npz')
+        np.savez_compressed(tmp_path, offsets=offsets, deltas=deltas)
+        os.replace(tmp_path, path)
+        entries[debate_id] = entry['key']
+        rebuilt.append(debate_id)
+
+    # Drop debates that left the manifest
+    for debate_id in set(previous) - set(entries):
+        try:
+            os.unlink(os.path.join(postings_dir, f'{debate_id}.npz'))
+        except FileNotFoundError:
+            pass
+
+    write_json_atomic(manifest_path, {'version': POSTINGS_VERSION, 'debates': entries})
+    return PhraseIndex(index_dir, postings_dir), rebuilt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the debates for phrases, by speaker and debate.")
+    parser.add_argument('queries', nargs='+', help='Phrases to search for, e.g. "middle class"')
+    parser.add_argument('--near', type=int, help='Match the words in any order within this many words of each other instead of as a phrase')
+    parser.add_argument('--speaker', nargs='+', help='Only count these speakers (e.g. OBAMA ROMNEY)')
+    parser.add_argument('--debate', nargs='+', help='Only search these debates (e.g. 2012a 2012b)')
+    parser.add_argument('--show', type=int, default=0, help='Print the context of up to this many hits per query')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index, rebuilt = build_phrase_index(load_debates())
+    print(f"Index ready in {(time.perf_counter() - start) * 1000:.1f}ms ({len(rebuilt)} debates re-indexed)")
+
+    for query in args.queries:
+        start = time.perf_counter()
+        hits = index.search(query, args.near, args.speaker, [debate_id.lower() for debate_id in args.debate] if args.debate else None)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n\"{query}\": {len(hits)} hits in {elapsed:.1f}ms")
+        for debate_id, by_speaker in count_hits(hits).items():
+            print(f"  {debate_id:8} " + ', '.join(f"{speaker} {count}" for speaker, count in sorted(by_speaker.items())))
+        for hit in hits[:args.show]:
+            print(f"  [{hit.debate_id} {hit.speaker} turn {hit.turn}] ... {index.context(hit)} ...")
@@ -1,157 +1,96 @@
+from startup import report_startup
 import argparse
-import matplotlib.pyplot as plt
-import textstat
 from collections import defaultdict
-import numpy as np
 import json
 
+import charts
+import readstats
+import tracing
+import transcripts
+
+# Bump whenever a change to parsing or scoring can change the numbers, so cached
+# scores from an older scorer are not reused
+SCORER_VERSION = '4'
+
 def load_transcript(file_path):
     with open(file_path, 'r') as file:
         transcript = file.read()
     return transcript
 
 def parse_transcript(transcript, candidate_names):
-    speakers = defaultdict(str)
-    lines = transcript.splitlines()
-    current_speaker = None
-
-    for line in lines:
-        # Strip whitespace from the line
-        line = line.strip()
-        # Skip empty lines
-        if not line:
-            continue
-
-        # Check if the line starts with "MODERATOR:"
-        if line.startswith("MODERATOR:"):
-            current_speaker = None  # Reset current speaker
-            continue  # Ignore this line and subsequent lines until a candidate speaks
-
-        # Check if the line starts with any candidate's name
-        speaker_found = False
-        for candidate in candidate_names:
-            candidate_tag = f"{candidate.upper()}:"
-            if line.startswith(candidate_tag):
-                current_speaker = candidate.upper()
-                # Remove the candidate's name from the line
-                line = line.replace(candidate_tag, "").strip()
-                speaker_found = True
-                break
-
-        if not speaker_found:
-            if current_speaker:
-                # Line is a continuation of the current speaker's speech
-                pass
-            else:
-                # No current speaker, ignore the line
-                continue
-
-        # Append the line to the current speaker's text
-        if current_speaker:
-            speakers[current_speaker] += " " + line
+    return transcripts.parse_transcript(transcript, candidate_names)
 
-    return speakers
+def speaker_stats(speakers_text):
+    """speaker -> readstats.ReadabilityStats, from one tokenization pass per speaker."""
+    stats = {}
+    for speaker, text in speakers_text.items():
+        with tracing.span('text_stats', speaker=speaker, chars=len(text)):
+            stats[speaker] = readstats.text_stats(text)
+    return stats
 
-def calculate_readability(speakers_text):
+def readability_from_stats(stats_by_speaker):
     readability_scores = defaultdict(dict)
 
-    for speaker, text in speakers_text.items():
-        fk_grade = textstat.flesch_kincaid_grade(text)
-        fog_index = textstat.gunning_fog(text)
-        smog_index = textstat.smog_index(text)
-        coleman_liau_index = textstat.coleman_liau_index(text)
-        
-        readability_scores['Flesch-Kincaid Grade Level'][speaker] = fk_grade
-        readability_scores['Gunning Fog Index'][speaker] = fog_index
-        readability_scores['Simple Measure of Gobbledygook'][speaker] = smog_index
-        readability_scores['Coleman-Liau Index'][speaker] = coleman_liau_index
+    for speaker, stats in stats_by_speaker.items():
+        for metric in readstats.METRICS:
+            with tracing.span(metric, category='metric', speaker=speaker):
+                readability_scores[metric][speaker] = readstats.METRIC_FUNCTIONS[metric](stats)
 
     return readability_scores
 
-def plot_readability(readability_scores, candidate_names, candidate_colors, output_file):
-    # Metric names without newlines
-    metrics = list(readability_scores.keys())
-
-    # Metric labels with newlines for plotting
-    metric_labels = {
-        'Flesch-Kincaid Grade Level': 'Flesch-Kincaid\nGrade Level',
-        'Gunning Fog Index': 'Gunning Fog\nIndex',
-        'Simple Measure of Gobbledygook': 'Simple Measure\nof Gobbledygook',
-        'Coleman-Liau Index': 'Coleman-Liau\nIndex'
-    }
-
-    # Use labels with newlines for x-tick labels
-    metric_labels_list = [metric_labels[metric] for metric in metrics]
+def calculate_readability(speakers_text):
+    # Every metric is derived from the same counts
+    return readability_from_stats(speaker_stats(speakers_text))
 
+def readability_chart_job(readability_scores, candidate_names, candidate_colors, output_file, year, suffix=None):
+    """Describe the debate's grouped bar chart as a charts.ChartJob."""
     # Force the speakers to follow the order of `candidate_names`
     speakers = [candidate.upper() for candidate in candidate_names]
-    num_candidates = len(speakers)
-
-    bar_width = 0.9 / num_candidates
-    total_group_width = bar_width * num_candidates
-    index = np.arange(len(metrics))
-        
-    plt.figure(figsize=(10, 6))
-    
-    speaker_colors = {candidate.upper(): color for candidate, color in zip(candidate_names, candidate_colors)}
-    
-    for i, speaker in enumerate(speakers):
-        scores = [readability_scores[metric][speaker] for metric in metrics]
-        
-        # Calculate positions for each bar
-        positions = index - (total_group_width / 2) + (i * bar_width) + bar_width
-        
-        bars = plt.bar(
-            positions, 
-            scores, 
-            bar_width, 
-            label=speaker, 
-            color=speaker_colors[speaker]
-        )
-        
-        for bar in bars:
-            height = bar.get_height()
-            # Set the y-coordinate for the text
-            y_position = height - 0.5  # Default position
-
-            # If the height is greater than the y-axis limit, adjust the y_position
-            y_max = 12  # y-axis upper limit set by plt.ylim(0, 12)
-            if height > y_max:
-                y_position = y_max - 0.5  # Slightly below the y-axis limit
-
-            plt.text(
-                bar.get_x() + bar.get_width() / 2, 
-                y_position, 
-                f'{height:.2f}', 
-                ha='center', 
-                va='bottom', 
-                fontsize=11, 
-                fontweight='bold', 
-                color='white'
-            )
-    
-    plt.ylabel('Reading Level', fontweight='bold', fontsize=14)
-    suffix_title = args.suffix.upper() if args.suffix else ""
-    plt.title(f'US Presidential Debate {args.year}{suffix_title} Reading Levels', fontweight='bold', fontsize=16)
-    plt.ylim(0, 12)
-    plt.xticks([x + (bar_width / 2) for x in index], metric_labels_list, fontweight='bold', fontsize=12)
-    plt.legend(loc='upper left')
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-
-    plt.text(
-        -0.05, -0.1, 
-        'Source: Transcripts used with permission from the American Presidency Project https://presidency.ucsb.edu',
-        ha='left', va='top', fontsize=6, color='gray', transform=plt.gca().transAxes
+    scores = {metric: dict(speaker_scores) for metric, speaker_scores in readability_scores.items()}
+    suffix_title = suffix.upper() if suffix else ""
+
+    return charts.ChartJob(
+        kind='debate',
+        layout=(len(speakers), tuple(scores)),
+        data={
+            'scores': scores,
+            'speakers': speakers,
+            'colors': list(candidate_colors),
+            'title': f'US Presidential Debate {year}{suffix_title} Reading Levels',
+        },
+        output_file=output_file,
     )
-    plt.text(
-        1, -0.1, 
-        'https://github.com/faradayberry/debatecloud',
-        ha='right', va='top', fontsize=6, color='gray', transform=plt.gca().transAxes
+
+def plot_readability(readability_scores, candidate_names, candidate_colors, output_file, year, suffix=None):
+    charts.render_chart(readability_chart_job(readability_scores, candidate_names, candidate_colors, output_file, year, suffix))
+
+def timeline_chart_job(timelines, candidate_names, candidate_colors, output_file, year, suffix=None, description='per turn'):
+    """Describe the line chart of timeline.speaker_timelines output as a charts.ChartJob."""
+    speakers = [candidate.upper() for candidate in candidate_names]
+    series = {
+        speaker: ((timelines[speaker]['position'] * 100).tolist(), {metric: timelines[speaker][metric].tolist() for metric in readstats.METRICS})
+        for speaker in speakers if speaker in timelines
+    }
+    suffix_title = suffix.upper() if suffix else ""
+
+    return charts.ChartJob(
+        kind='timeline',
+        layout=(len(speakers), tuple(readstats.METRICS)),
+        data={
+            'series': series,
+            'speakers': speakers,
+            'colors': list(candidate_colors),
+            'title': f'US Presidential Debate {year}{suffix_title} Reading Levels, {description}',
+        },
+        output_file=output_file,
     )
 
-    plt.tight_layout()
-    plt.savefig(output_file, format='png', dpi=300)
-    plt.close()
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Analyze readability scores for debate candidates.")
@@ -159,8 +98,17 @@ if __name__ == "__main__":
     parser.add_argument('--suffix', type=str, help='The optional suffix for the debate (e.g., a, b, c)')
     parser.add_argument('--candidates', nargs='+', required=True, help='The names of the candidates (e.g., Trump Harris)')
     parser.add_argument('--colors', nargs='+', required=True, help='The colors for the candidates (e.g., red blue)')
+    parser.add_argument('--moderators', nargs='+', help="Speaker tags that end a candidate's turn (default: the debate's entry in debates.json, else MODERATOR)")
+    parser.add_argument('--per-turn', action='store_true', help='Also score every speaker turn and plot the scores over the debate')
+    parser.add_argument('--window', type=positive_int, help='Also score sliding windows of this many sentences (or words) and plot them over the debate')
+    parser.add_argument('--stride', type=positive_int, default=1, help='Step between sliding windows, in the same unit (default: 1)')
+    parser.add_argument('--window-unit', choices=['sentences', 'words'], default='sentences', help='Unit of --window and --stride (default: sentences)')
+    parser.add_argument('--watch', action='store_true', help='Keep tailing the transcript and refresh the scores JSON and chart as it grows')
+    parser.add_argument('--refresh-interval', type=float, default=2.0, help='Minimum seconds between refreshes in --watch mode (default: 2)')
+    parser.add_argument('--trace', metavar='FILE', help='Record timing and memory spans and save them as a Chrome trace JSON file')
     
     args = parser.parse_args()
+    report_startup('readlvl')
     
     if len(args.candidates) != len(args.colors):
         raise ValueError("The number of candidates must match the number of colors provided.")
@@ -169,18 +117,40 @@ if __name__ == "__main__":
     suffix = args.suffix.lower() if args.suffix else ""
     file_path = f'transcript{args.year}{suffix}.txt'
     
-    transcript = load_transcript(file_path)
-    
     candidates = [name.strip() for name in args.candidates]
     colors = [color.strip() for color in args.colors]
+
+    moderators = args.moderators
+    if moderators is None:
+        from manifest import find_debate, moderator_tags
+
+        debate = find_debate(args.year, args.suffix)
+        moderators = moderator_tags(debate) if debate else transcripts.MODERATOR_TAGS
     
-    speakers_text = parse_transcript(transcript, candidates)
-    readability_scores = calculate_readability(speakers_text)
+    if args.watch:
+        import asyncio
+        import live
+
+        print(f"Watching {file_path}; press Ctrl-C to stop")
+        try:
+            asyncio.run(live.watch(file_path, candidates, colors, args.year, args.suffix, args.refresh_interval, moderators))
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit(0)
+
+    if args.trace:
+        tracing.enable()
+
+    with tracing.span('parse'):
+        turns = list(transcripts.read_turns(file_path, candidates, moderators))
+        speakers_text = transcripts.join_speakers(turns)
+    with tracing.span('score'):
+        readability_scores = calculate_readability(speakers_text)
     
     # Construct the output file name using the year and optional suffix
     output_file = f'readability_scores_{args.year}{suffix}.png'
     
-    plot_readability(readability_scores, candidates, colors, output_file)
+    plot_readability(readability_scores, candidates, colors, output_file, args.year, args.suffix)
     print(f"Plot saved as {output_file}")
 
     # Convert the readability_scores defaultdict to a regular dict
@@ -194,4 +164,29 @@ if __name__ == "__main__":
 
     # Print the scores
     print(f"Scores for {args.year}{suffix_display}:")
-    print(readability_scores_json)
\ No newline at end of file
+    print(readability_scores_json)
+
+    if args.per_turn or args.window:
+        import timeline
+
+        with tracing.span('timeline', window=args.window):
+            if args.window:
+                timelines = timeline.speaker_timelines(turns, args.window, args.stride, args.window_unit)
+                description = f'{args.window}-{args.window_unit[:-1]} windows'
+            else:
+                timelines = timeline.speaker_timelines(turns)
+                description = 'per turn'
+
+        timeline_file = f'readability_timeline_{args.year}{suffix}'
+        with open(f'{timeline_file}.json', 'w') as f:
+            json.dump({
+                'window': args.window,
+                'stride': args.stride if args.window else None,
+                'unit': args.window_unit if args.window else 'turns',
+                'speakers': timeline.timelines_to_json(timelines),
+            }, f)
+        charts.render_chart(timeline_chart_job(timelines, candidates, colors, f'{timeline_file}.png', args.year, args.suffix, description))
+        print(f"Timeline saved as {timeline_file}.json and {timeline_file}.png")
+
+    if args.trace:
+        tracing.finish(args.trace)
@@ -0,0 +1,307 @@
+import importlib.util
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Single-pass readability scoring. Each speaker's text is tokenized once into the
+# sufficient statistics below and all four metrics are derived from those counts.
+#
+# Tokenization, syllable counting (pyphen, en_US) and the intermediate rounding
+# follow textstat 0.7.x, so scores match textstat's exactly on the debate corpus;
+# the stated tolerance is one unit in the last reported digit (0.1 for FK and
+# SMOG, 0.01 for Fog and Coleman-Liau), to allow for pyphen dictionary updates.
+
+METRICS = [
+    'Flesch-Kincaid Grade Level',
+    'Gunning Fog Index',
+    'Simple Measure of Gobbledygook',
+    'Coleman-Liau Index'
+]
+
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+SENTENCE_RE = re.compile(r'\b[^.!?]+[.!?]*', re.UNICODE)
+DIFFICULT_WORD_RE = re.compile(r"[\w\='‘’]+")
+WORD_CHAR_RE = re.compile(r'\w')
+
+# Words with at least this many syllables are polysyllabic (SMOG) and, unless they
+# are on the Dale-Chall easy word list, complex (Gunning Fog)
+POLYSYLLABLE_THRESHOLD = 3
+
+
+@dataclass
+class ReadabilityStats:
+    """Sufficient statistics for the readability metrics of one body of text."""
+    sentences: int = 0
+    words: int = 0
+    letters: int = 0
+    syllables: int = 0
+    polysyllables: int = 0
+    complex_words: int = 0  # distinct complex words, as counted by textstat
+
+
+@dataclass
+class PartialStats:
+    """
+    ReadabilityStats that merge. Counts add and the sets of distinct complex words
+    are unioned, so merge() is associative and commutative with PartialStats() as
+    its identity, and partial results can be combined in any grouping or order.
+    The one-sentence minimum is only applied by stats().
+    """
+    sentences: int = 0
+    words: int = 0
+    letters: int = 0
+    syllables: int = 0
+    polysyllables: int = 0
+    complex_words: frozenset = frozenset()
+
+    def merge(self, other):
+        return PartialStats(
+            sentences=self.sentences + other.sentences,
+            words=self.words + other.words,
+            letters=self.letters + other.letters,
+            syllables=self.syllables + other.syllables,
+            polysyllables=self.polysyllables + other.polysyllables,
+            complex_words=self.complex_words | other.complex_words,
+        )
+
+    def stats(self):
+        return ReadabilityStats(
+            sentences=max(1, self.sentences),
+            words=self.words,
+            letters=self.letters,
+            syllables=self.syllables,
+            polysyllables=self.polysyllables,
+            complex_words=len(self.complex_words),
+        )
+
+
+_pyphen = None
+
+
+def _get_pyphen():
+    global _pyphen
+    if _pyphen is None:
+        from pyphen import Pyphen
+        _pyphen = Pyphen(lang='en_US')
+    return _pyphen
+
+
+@lru_cache(maxsize=None)
+def count_syllables(word):
+    """Syllables in a single (punctuation-free) word, memoized per word."""
+    word = word.lower()
+    if not word:
+        return 0
+    return len(_get_pyphen().positions(word)) + 1
+
+
+@lru_cache(maxsize=None)
+def easy_words():
+    """The Dale-Chall easy word list shipped with textstat."""
+    spec = importlib.util.find_spec('textstat')
+    path = os.path.join(spec.submodule_search_locations[0], 'resources', 'en', 'easy_words.txt')
+    with open(path, 'r', encoding='utf-8') as file:
+        return frozenset(line.strip() for line in file)
+
+
+@lru_cache(maxsize=None)
+def is_complex_word(word):
+    """True for a lowercased word that is not an easy word and has 3+ syllables."""
+    if word in easy_words():
+        return False
+    return count_syllables(PUNCTUATION_RE.sub('', word)) >= POLYSYLLABLE_THRESHOLD
+
+
+# The shared lexicon, loaded on first use; False when there is none
+_lexicon = None
+
+
+def get_lexicon():
+    """The lexicon.Lexicon in the working directory, or None if none has been built."""
+    global _lexicon
+    if _lexicon is None:
+        import lexicon
+        _lexicon = os.path.exists(os.path.join(lexicon.LEXICON_DIR, 'meta.json')) and lexicon.load_lexicon() or False
+    return _lexicon or None
+
+
+def syllable_counts(words):
+    """count_syllables of each word, looked up in bulk in the shared lexicon if there is one."""
+    lexicon = get_lexicon()
+    if lexicon is None:
+        return [count_syllables(word) for word in words]
+    return lexicon.syllable_counts(words)
+
+
+def complex_flags(words):
+    """is_complex_word of each lowercased word, looked up in bulk in the shared lexicon if there is one."""
+    lexicon = get_lexicon()
+    if lexicon is None:
+        return [is_complex_word(word) for word in words]
+    return lexicon.complex_flags(words)
+
+
+def is_counted_sentence(sentence):
+    """False for a sentence of two words or fewer, which textstat ignores."""
+    # Fast path: three leading chunks that each contain a word character are three
+    # words, so only short or punctuation-heavy sentences are tokenized
+    chunks = sentence.split(None, 3)
+    if len(chunks) == 4 and all(map(WORD_CHAR_RE.search, chunks[:3])):
+        return True
+    return len(PUNCTUATION_RE.sub('', sentence).split()) > 2
+
+
+def count_sentences(text):
+    """Sentences in `text`, ignoring fragments of two words or fewer (at least 1)."""
+    return max(1, sum(1 for sentence in SENTENCE_RE.findall(text) if is_counted_sentence(sentence)))
+
+
+def text_stats(text):
+    """Collect the ReadabilityStats of `text` in a single tokenization pass."""
+    stats = ReadabilityStats(sentences=count_sentences(text))
+
+    # Count each distinct word once and weight its syllables by its frequency
+    word_counts = Counter(PUNCTUATION_RE.sub('', text).split())
+    for (word, count), syllables in zip(word_counts.items(), syllable_counts(list(word_counts))):
+        stats.words += count
+        stats.letters += len(word) * count
+        stats.syllables += syllables * count
+        if syllables >= POLYSYLLABLE_THRESHOLD:
+            stats.polysyllables += count
+
+    difficult_words = list(set(DIFFICULT_WORD_RE.findall(text.lower())))
+    stats.complex_words = sum(complex_flags(difficult_words))
+    return stats
+
+
+class RunningStats:
+    """
+    ReadabilityStats of a text that arrives in pieces, such as a transcript that is
+    still being written. Each add() costs time proportional to the new piece (plus
+    the unfinished sentence it continues), and stats() always equals text_stats of
+    all pieces joined with spaces, as transcripts.join_speakers joins them.
+    """
+
+    def __init__(self):
+        self.counts = ReadabilityStats()
+        self.complex_words = set()
+        self.sentences = 0      # counted sentences that can no longer change
+        self.pending = ''       # the last, possibly unfinished, sentence
+
+    def add(self, text):
+        word_counts = Counter(PUNCTUATION_RE.sub('', text).split())
+        for (word, count), syllables in zip(word_counts.items(), syllable_counts(list(word_counts))):
+            self.counts.words += count
+            self.counts.letters += len(word) * count
+            self.counts.syllables += syllables * count
+            if syllables >= POLYSYLLABLE_THRESHOLD:
+                self.counts.polysyllables += count
+
+        new_words = list(set(DIFFICULT_WORD_RE.findall(text.lower())) - self.complex_words)
+        self.complex_words.update(word for word, is_complex in zip(new_words, complex_flags(new_words)) if is_complex)
+
+        # Only the last sentence can still grow, so every earlier one is final
+        buffer = f'{self.pending} {text}' if self.pending else text
+        matches = list(SENTENCE_RE.finditer(buffer))
+        self.sentences += sum(1 for match in matches[:-1] if is_counted_sentence(match.group()))
+        self.pending = buffer[matches[-1].start():] if matches else ''
+
+    def partial(self):
+        """The PartialStats of everything added so far."""
+        pending = 1 if self.pending and is_counted_sentence(self.pending) else 0
+        return PartialStats(
+            sentences=self.sentences + pending,
+            words=self.counts.words,
+            letters=self.counts.letters,
+            syllables=self.counts.syllables,
+            polysyllables=self.counts.polysyllables,
+            complex_words=frozenset(self.complex_words),
+        )
+
+    def stats(self):
+        return self.partial().stats()
+
+
+def legacy_round(number, points=0):
+    """Round half away from zero, as textstat does between and after each step."""
+    p = 10 ** points
+    return float(math.floor((number * p) + math.copysign(0.5, number))) / p
+
+
+def _ratio(numerator, denominator, points):
+    if not denominator:
+        return 0.0
+    return legacy_round(numerator / denominator, points)
+
+
+def flesch_kincaid_grade(stats):
+    sentence_length = _ratio(stats.words, stats.sentences, 1)
+    syllables_per_word = _ratio(stats.syllables, stats.words, 1)
+    return legacy_round(0.39 * sentence_length + 11.8 * syllables_per_word - 15.59, 1)
+
+
+def gunning_fog(stats):
+    if not stats.words:
+        return 0.0
+    complex_percent = stats.complex_words / stats.words * 100
+    return legacy_round(0.4 * (_ratio(stats.words, stats.sentences, 1) + complex_percent), 2)
+
+
+def smog_index(stats):
+    if stats.sentences < 3:
+        return 0.0
+    return legacy_round(1.043 * (30 * (stats.polysyllables / stats.sentences)) ** .5 + 3.1291, 1)
+
+
+def coleman_liau_index(stats):
+    letters = legacy_round(_ratio(stats.letters, stats.words, 2) * 100, 2)
+    sentences = legacy_round(_ratio(stats.sentences, stats.words, 2) * 100, 2)
+    return legacy_round(0.058 * letters - 0.296 * sentences - 15.8, 2)
+
+
+METRIC_FUNCTIONS = {
+    'Flesch-Kincaid Grade Level': flesch_kincaid_grade,
+    'Gunning Fog Index': gunning_fog,
+    'Simple Measure of Gobbledygook': smog_index,
+    'Coleman-Liau Index': coleman_liau_index,
+}
+
+
+def scores_from_stats(stats):
+    """Derive every metric in METRICS from one ReadabilityStats."""
+    return {metric: METRIC_FUNCTIONS[metric](stats) for metric in METRICS}
+
+
+def _legacy_round_array(numbers, points=0):
+    import numpy as np
+
+    p = 10 ** points
+    return np.floor(numbers * p + np.copysign(0.5, numbers)) / p
+
+
+def scores_from_arrays(sentences, words, letters, syllables, polysyllables, complex_words, rounded=True):
+    """
+    Vectorized scores_from_stats: each argument is a NumPy array of counts with one
+    element per span of text, and every metric comes back as an array of the same
+    shape. The formulas and intermediate rounding are the same as the scalar
+    functions; `rounded=False` skips all rounding, for smooth resampling
+    distributions. Spans a metric is undefined for (no words, or fewer than three
+    sentences for SMOG) are NaN rather than 0.
+    """
+    import numpy as np
+
+    r = _legacy_round_array if rounded else (lambda numbers, points=0: numbers)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sentence_length = r(words / sentences, 1)
+        scores = {
+            'Flesch-Kincaid Grade Level': r(0.39 * sentence_length + 11.8 * r(syllables / words, 1) - 15.59, 1),
+            'Gunning Fog Index': r(0.4 * (sentence_length + complex_words / words * 100), 2),
+            'Simple Measure of Gobbledygook': np.where(sentences >= 3, r(1.043 * np.sqrt(30 * (polysyllables / sentences)) + 3.1291, 1), np.nan),
+            'Coleman-Liau Index': r(0.058 * r(r(letters / words, 2) * 100, 2) - 0.296 * r(r(sentences / words, 2) * 100, 2) - 15.8, 2),
+        }
+    for metric in METRICS:
+        scores[metric] = np.where(words > 0, scores[metric], np.nan)
+    return scores
@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from dataclasses import fields
+
+import readlvl
+import readstats
+from manifest import PARTY_COLORS
+from score_cache import write_json_atomic
+
+# One table of debate x speaker x metric rows, one .npy file per column, written
+# by collect_and_plot_readability.py and build.py
+RESULTS_DIR = 'readability_results'
+
+# Bump whenever the layout or the meaning of a column changes
+RESULTS_VERSION = 1
+
+# Raw counts behind every score, as readstats.ReadabilityStats fields
+COUNT_COLUMNS = [field.name for field in fields(readstats.ReadabilityStats)]
+
+# Column -> dtype. String columns are fixed-width so every column can be
+# memory-mapped; `metric` is an index into the store's metric list
+COLUMNS = {
+    'debate': 'U',
+    'year': 'i2',
+    'suffix': 'U',
+    'speaker': 'U',
+    'party': 'U',
+    'color': 'U',
+    'metric': 'i1',
+    'score': 'f8',
+    **{name: 'i4' for name in COUNT_COLUMNS},
+}
+
+
+def results_table(results, metrics=readstats.METRICS):
+    """
+    Column name -> NumPy array with one row per metric per candidate of every
+    scored DebateResult, third-party candidates included, sorted by year and
+    suffix. Counts are -1 where the result has none.
+    """
+    import numpy as np
+
+    rows = {name: [] for name in COLUMNS}
+    for result in sorted(results, key=lambda result: (result.year, result.suffix)):
+        for candidate, color in zip(result.candidates, result.colors):
+            speaker = candidate.strip().upper()
+            counts = (result.counts or {}).get(speaker, {})
+            for code, metric in enumerate(metrics):
+                score = result.scores.get(metric, {}).get(speaker)
+                if score is None:
+                    continue
+                rows['debate'].append(result.debate_id)
+                rows['year'].append(result.year)
+                rows['suffix'].append(result.suffix)
+                rows['speaker'].append(speaker)
+                rows['party'].append(PARTY_COLORS.get(color.strip(), ''))
+                rows['color'].append(color.strip())
+                rows['metric'].append(code)
+                rows['score'].append(score)
+                for name in COUNT_COLUMNS:
+                    rows[name].append(counts.get(name, -1))
+
+    # np.array picks the narrowest fixed width that fits each string column
+    return {name: np.array(values, dtype=COLUMNS[name] if COLUMNS[name] != 'U' else str) for name, values in rows.items()}
+
+
+def _generation(table):
+    digest = hashlib.sha256()
+    for name in COLUMNS:
+        digest.update(name.encode('utf-8') + table[name].dtype.str.encode('utf-8') + table[name].tobytes())
+    return digest.hexdigest()[:16]
+
+
+def write_results(table, results_dir=RESULTS_DIR, metrics=readstats.METRICS, runs=None):
+    """
+    Save `table` as a new generation of column files and switch meta.json to it
+    last, so readers never mix columns of two runs. `runs` is recorded in
+    meta.json as source -> metadata of the run that produced its rows. The
+    previous generation is kept for readers that mapped it before the switch.
+    """
+    import numpy as np
+
+    os.makedirs(results_dir, exist_ok=True)
+    generation = _generation(table)
+    prefix = os.path.join(results_dir, generation)
+    for name in COLUMNS:
+        if not os.path.exists(f'{prefix}.{name}.npy'):
+            tmp_path = f'{prefix}.{name}.tmp.npy'
+            np.save(tmp_path, table[name])
+            os.replace(tmp_path, f'{prefix}.{name}.npy')
+
+    meta_path = os.path.join(results_dir, 'meta.json')
+    previous = None
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            previous = json.load(f).get('generation')
+    if previous == generation:
+        previous = None
+
+    write_json_atomic(meta_path, {
+        'version': RESULTS_VERSION,
+        'generation': generation,
+        'previous': previous,
+        'metrics': list(metrics),
+        'rows': len(table['debate']),
+        'columns': {name: table[name].dtype.str for name in COLUMNS},
+        'runs': runs or {},
+    })
+
+    keep = {generation, previous}
+    for name in os.listdir(results_dir):
+        if name.endswith('.npy') and name.split('.', 1)[0] not in keep:
+            os.unlink(os.path.join(results_dir, name))
+    return meta_path
+
+
+class ResultsStore:
+    """
+    Read side of the results table. Columns are memory-mapped and only loaded
+    when asked for, and since rows are sorted by year a year range is a
+    contiguous slice found by binary search.
+    """
+
+    def __init__(self, results_dir=RESULTS_DIR):
+        with open(os.path.join(results_dir, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != RESULTS_VERSION:
+            raise ValueError(f"Results in {results_dir} have version {self.meta.get('version')}, expected {RESULTS_VERSION}; rerun collect_and_plot_readability.py")
+        self.results_dir = results_dir
+        self.metrics = self.meta['metrics']
+        self._columns = {}
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def column(self, name):
+        import numpy as np
+
+        if name not in COLUMNS:
+            raise KeyError(f"Unknown column {name!r}; expected one of {', '.join(COLUMNS)}")
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.results_dir, f"{self.meta['generation']}.{name}.npy"), mmap_mode='r')
+        return self._columns[name]
+
+    def year_slice(self, first_year=None, last_year=None):
+        """The rows of debates from `first_year` to `last_year`, inclusive."""
+        import numpy as np
+
+        years = self.column('year')
+        start = 0 if first_year is None else int(np.searchsorted(years, first_year, side='left'))
+        stop = len(years) if last_year is None else int(np.searchsorted(years, last_year, side='right'))
+        return slice(start, stop)
+
+    def load(self, columns=None, first_year=None, last_year=None, metrics=None):
+        """
+        Column name -> array of the rows in the year range, for `columns` (every
+        column by default) and, if given, only the rows of `metrics`, with the
+        metric column recoded to index into `metrics` rather than the store's
+        metric list.
+        """
+        import numpy as np
+
+        rows = self.year_slice(first_year, last_year)
+        table = {name: self.column(name)[rows] for name in columns or COLUMNS}
+        if metrics is not None:
+            present = [metric for metric in metrics if metric in self.metrics]
+            recode = np.full(len(self.metrics), -1, dtype=COLUMNS['metric'])
+            recode[[self.metrics.index(metric) for metric in present]] = [metrics.index(metric) for metric in present]
+            keep = recode[self.column('metric')[rows]] >= 0
+            table = {name: values[keep] for name, values in table.items()}
+            if 'metric' in table:
+                table['metric'] = recode[table['metric']]
+        return table
+
+
+def combine_tables(tables):
+    """
+    Concatenate (table, metrics) pairs into one table over the union of their
+    metrics, sorted by year and suffix. Returns the table and its metric list.
+    """
+    import numpy as np
+
+    metrics = []
+    for _, table_metrics in tables:
+        metrics += [metric for metric in table_metrics if metric not in metrics]
+    columns = {name: [] for name in COLUMNS}
+    for table, table_metrics in tables:
+        codes = np.array([metrics.index(metric) for metric in table_metrics], dtype=COLUMNS['metric'])
+        for name in COLUMNS:
+            columns[name].append(codes[table[name]] if name == 'metric' else np.asarray(table[name]))
+    combined = {name: np.concatenate(arrays) if arrays else np.array([], dtype=COLUMNS[name]) for name, arrays in columns.items()}
+    order = np.lexsort((combined['suffix'], combined['year']))
+    return {name: values[order] for name, values in combined.items()}, metrics
+
+
+def merge_results(table, metrics, source, results_dir=RESULTS_DIR, **run):
+    """
+    Write `table`'s rows of `metrics` into the store, replacing that source's
+    earlier rows and keeping the other sources' rows for the debates in `table`.
+    `run` is recorded in meta.json under `source`.
+    """
+    import numpy as np
+
+    tables = []
+    runs = {}
+    try:
+        store = ResultsStore(results_dir)
+    except (OSError, ValueError):
+        store = None
+    if store is not None:
+        previous = store.load()
+        keep = np.isin(previous['metric'], [code for code, metric in enumerate(store.metrics) if metric not in metrics])
+        keep &= np.isin(previous['debate'], np.unique(table['debate']))
+        tables.append(({name: np.array(values[keep]) for name, values in previous.items()}, store.metrics))
+        runs = {name: entry for name, entry in store.meta.get('runs', {}).items() if name != source}
+    tables.append((table, metrics))
+
+    combined, combined_metrics = combine_tables(tables)
+    runs[source] = {'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'scorer_version': readlvl.SCORER_VERSION, **run}
+    return write_results(combined, results_dir, combined_metrics, runs)
+
+
+def export_json(table, metrics=readstats.METRICS):
+    """
+    The metric -> 'blue' / 'red' -> debate_id -> score dict of
+    readability_scores_over_time.json, from a table with the debate, color,
+    metric and score columns.
+    """
+    scores_over_time = {metric: {'blue': {}, 'red': {}} for metric in metrics}
+    for debate_id, color, code, score in zip(table['debate'].tolist(), table['color'].tolist(), table['metric'].tolist(), table['score'].tolist()):
+        if color in ('blue', 'red'):
+            scores_over_time[metrics[code]][color][debate_id] = score
+    return scores_over_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the columnar readability results, or export them as JSON.")
+    parser.add_argument('--results-dir', default=RESULTS_DIR, help=f'Results directory (default: {RESULTS_DIR})')
+    parser.add_argument('--years', nargs=2, type=int, metavar=('FIRST', 'LAST'), help='Only debates from FIRST to LAST, inclusive')
+    parser.add_argument('--metric', nargs='+', help='Only these metrics (default: all in the store)')
+    parser.add_argument('--speaker', nargs='+', help='Only these speakers (e.g. PEROT)')
+    parser.add_argument('--export', metavar='FILE', help='Write the blue and red scores as nested JSON, like readability_scores_over_time.json')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = ResultsStore(args.results_dir)
+    first_year, last_year = args.years or (None, None)
+    metrics = args.metric or store.metrics
+    table = store.load(first_year=first_year, last_year=last_year, metrics=metrics)
+    if args.speaker:
+        import numpy as np
+
+        keep = np.isin(table['speaker'], [speaker.upper() for speaker in args.speaker])
+        table = {name: values[keep] for name, values in table.items()}
+    print(f"{len(table['debate'])} of {len(store)} rows loaded in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    if args.export:
+        write_json_atomic(args.export, export_json(table, metrics))
+        print(f"Scores exported to {args.export}")
+    else:
+        print(f"{'debate':8} {'speaker':12} {'party':12} {'metric':30} {'score':>7} {'sentences':>9} {'words':>7}")
+        for row in zip(*(table[name].tolist() for name in ('debate', 'speaker', 'party', 'metric', 'score', 'sentences', 'words'))):
+            debate_id, speaker, party, code, score, sentences, words = row
+            print(f"{debate_id:8} {speaker:12} {party:12} {metrics[code]:30} {score:>7} {sentences:>9} {words:>7}")
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import readlvl
+from transcripts import MODERATOR_TAGS
+
+# Directory holding one cache entry per scored debate
+CACHE_DIR = '.readability_cache'
+
+# Temp files older than this are assumed to belong to a crashed writer
+STALE_TMP_SECONDS = 3600
+
+
+def debate_cache_key(transcript_path, candidate_names, moderator_tags=MODERATOR_TAGS):
+    """
+    Content-addressed key for a debate's scores: a hash of the transcript bytes, the
+    candidate and moderator tags and the scorer version. Any change to one of them
+    yields a new key.
+    """
+    digest = hashlib.sha256()
+    with open(transcript_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    digest.update(b'\0' + '\0'.join(name.strip().upper() for name in candidate_names).encode('utf-8'))
+    digest.update(b'\0' + '\0'.join(tag.upper() for tag in moderator_tags).encode('utf-8'))
+    digest.update(b'\0' + readlvl.SCORER_VERSION.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    """
+    Write `data` as JSON to a temporary file next to `path` and rename it into place,
+    so concurrent readers and writers only ever see complete files.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ScoreCache:
+    """Per-debate score cache stored as one JSON file per cache key."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, key):
+        """
+        Return the cached entry for `key` (a dict with the metric -> speaker -> score
+        'scores' table and any interval tables stored with it), or None on a miss.
+        """
+        try:
+            with open(self._entry_path(key), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if 'scores' in entry else None
+
+    def put(self, key, debate_id, scores, **tables):
+        write_json_atomic(self._entry_path(key), {'debate_id': debate_id, 'scores': scores, **tables})
+
+    def evict(self, keep_keys):
+        """Remove every entry whose key is not in `keep_keys`, plus abandoned temp files."""
+        keep_files = {f'{key}.json' for key in keep_keys}
+        now = time.time()
+        removed = 0
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                if filename.endswith('.json'):
+                    if filename in keep_files:
+                        continue
+                elif not filename.endswith('.tmp') or now - os.path.getmtime(path) < STALE_TMP_SECONDS:
+                    continue
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                # Another process renamed or evicted it first
+                pass
+        return removed
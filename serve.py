@@ -0,0 +1,414 @@
+from startup import report_startup
+import argparse
+import asyncio
+import bisect
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+import time
+
+import manifest
+import readlvl
+import transcripts
+from score_cache import CACHE_DIR, ScoreCache, debate_cache_key
+
+# Upper bounds of the latency histogram buckets in milliseconds, doubling from
+# 0.1 ms; slower requests land in a final overflow bucket
+LATENCY_BUCKETS_MS = [round(0.1 * 2 ** i, 1) for i in range(18)]
+
+# Largest request body accepted, so a stray client cannot exhaust memory
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+# Parsed transcripts kept per worker process
+WORKER_CACHE_SIZE = 32
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """Mapping that keeps the `maxsize` most recently used entries."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class LatencyHistogram:
+    """Request latencies counted into LATENCY_BUCKETS_MS, with percentiles read off the buckets."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.total += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the `fraction` quantile (at most the maximum), in ms."""
+        rank = fraction * self.total
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, round(self.max_ms, 3))
+        return self.max_ms
+
+    def to_json(self):
+        return {
+            'count': self.total,
+            'mean_ms': round(self.total_ms / self.total, 3) if self.total else None,
+            'p50_ms': self.percentile(0.5) if self.total else None,
+            'p90_ms': self.percentile(0.9) if self.total else None,
+            'p99_ms': self.percentile(0.99) if self.total else None,
+            'max_ms': round(self.max_ms, 3),
+            'buckets': {f'{bound:g}': count for bound, count in zip(LATENCY_BUCKETS_MS + [float('inf')], self.counts) if count},
+        }
+
+
+# Worker side: parsed transcripts stay warm in each worker process between batches
+_parsed = LRUCache(WORKER_CACHE_SIZE)
+
+
+def _speakers_text(source_key, source):
+    speakers_text = _parsed.get(source_key)
+    if speakers_text is None:
+        kind, value, candidates, moderators = source
+        if kind == 'file':
+            speakers_text = transcripts.read_speakers(value, candidates, moderators)
+        else:
+            speakers_text = transcripts.parse_transcript(value, candidates, moderators)
+        _parsed.put(source_key, speakers_text)
+    return speakers_text
+
+
+def _top_frequencies(text, max_words):
+    import debatecloud
+
+    frequencies = debatecloud.word_frequencies(text)
+    return dict(sorted(frequencies.items(), key=lambda item: (-item[1], item[0]))[:max_words])
+
+
+def run_job(endpoint, source_key, source, options):
+    """Answer one request from the worker's parsed transcript of `source`."""
+    speakers_text = _speakers_text(source_key, source)
+    if endpoint == 'parse':
+        return {'speakers': speakers_text}
+    if endpoint == 'score':
+        return {'scores': {metric: dict(scores) for metric, scores in readlvl.calculate_readability(speakers_text).items()}}
+    if endpoint == 'frequencies':
+        return {'frequencies': {speaker: _top_frequencies(text, options['max_words']) for speaker, text in speakers_text.items()}}
+    raise ValueError(f'Unknown endpoint {endpoint}')
+
+
+def run_batch(jobs):
+    """
+    Run a batch of (endpoint, source_key, source, options) jobs in one worker call.
+    Jobs on the same transcript share one parse. Each result is (ok, payload).
+    """
+    results = []
+    for job in sorted(range(len(jobs)), key=lambda i: jobs[i][1]):
+        try:
+            results.append((job, True, run_job(*jobs[job])))
+        except OSError as error:
+            results.append((job, False, (404, str(error))))
+        except Exception as error:
+            results.append((job, False, (500, f'{type(error).__name__}: {error}')))
+    return [(ok, payload) for _, ok, payload in sorted(results, key=lambda result: result[0])]
+
+
+def _retrieve_exception(future):
+    # Mark a failed answer as seen even when every client waiting on it has gone
+    if not future.cancelled():
+        future.exception()
+
+
+def _string_list(request, field, default=None):
+    value = request.get(field, default)
+    if not isinstance(value, list) or not value or not all(isinstance(item, str) for item in value):
+        raise RequestError(400, f'"{field}" must be a non-empty list of strings')
+    return value
+
+
+class ScoringService:
+    """
+    Request handling for the HTTP server. Answers are cached by the content of
+    the transcript they were computed from, in memory and, for scores, in the
+    persistent score cache shared with collect_and_plot_readability; misses are
+    queued, deduplicated against requests already in flight and sent to the
+    worker pool in batches.
+    """
+
+    def __init__(self, debates, max_workers=None, cache_size=256, batch_window=0.005, max_batch=16, root='.', cache_dir=CACHE_DIR):
+        self.debates = {manifest.debate_id(debate): debate for debate in debates}
+        self.root = os.path.realpath(root)
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.score_cache = ScoreCache(cache_dir)
+        self.results = LRUCache(cache_size)
+        self.inflight = {}
+        self.queue = []
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.batch_ready = None
+        self.batches = 0
+        self.batched_jobs = 0
+        self.latency = {}
+        self.started = time.time()
+        # (path, size, mtime) -> content key, so cached files are not re-hashed per request
+        self.file_keys = LRUCache(1024)
+
+    def source(self, request):
+        """(source_key, source) for a request naming a debate, a transcript file or inline text."""
+        if 'text' in request:
+            if not isinstance(request['text'], str):
+                raise RequestError(400, '"text" must be a string')
+            candidates, moderators = self.speaker_tags(request)
+            digest = hashlib.sha256(request['text'].encode('utf-8'))
+            digest.update(json.dumps([candidates, moderators, readlvl.SCORER_VERSION]).encode('utf-8'))
+            return digest.hexdigest(), ('text', request['text'], candidates, moderators)
+
+        if 'debate' in request:
+            debate = self.debates.get(str(request['debate']).lower())
+            if debate is None:
+                raise RequestError(404, f"Debate {request['debate']} is not in the manifest")
+            path = os.path.join(self.root, manifest.transcript_path(debate))
+            candidates, moderators = debate['candidates'], list(manifest.moderator_tags(debate))
+        elif 'transcript' in request:
+            path = request['transcript']
+            if not isinstance(path, str):
+                raise RequestError(400, '"transcript" must be a path')
+            # Only transcripts under the service's root, after resolving symlinks
+            path = os.path.realpath(os.path.join(self.root, path))
+            if os.path.commonpath([self.root, path]) != self.root:
+                raise RequestError(400, '"transcript" must be inside the service directory')
+            candidates, moderators = self.speaker_tags(request)
+        else:
+            raise RequestError(400, 'Request needs one of "debate", "transcript" or "text"')
+
+        try:
+            stat = os.stat(path)
+            stat_key = (path, stat.st_size, stat.st_mtime_ns, tuple(candidates), tuple(moderators))
+            key = self.file_keys.get(stat_key)
+            if key is None:
+                key = debate_cache_key(path, candidates, moderators)
+                self.file_keys.put(stat_key, key)
+        except OSError as error:
+            raise RequestError(404, str(error))
+        return key, ('file', path, candidates, moderators)
+
+    @staticmethod
+    def speaker_tags(request):
+        candidates = _string_list(request, 'candidates')
+        moderators = _string_list(request, 'moderators', list(transcripts.MODERATOR_TAGS))
+        return [name.strip() for name in candidates], list(moderators)
+
+    async def handle(self, endpoint, request):
+        """The JSON answer to a request for `endpoint`, and whether it came from the cache."""
+        source_key, source = self.source(request)
+        options = {}
+        if endpoint == 'frequencies':
+            if not isinstance(request.get('max_words', 100), int):
+                raise RequestError(400, '"max_words" must be an integer')
+            options['max_words'] = request.get('max_words', 100)
+        key = (endpoint, source_key, tuple(sorted(options.items())))
+
+        cached = self.results.get(key)
+        if cached is None and endpoint == 'score':
+            entry = self.score_cache.get(source_key)
+            if entry is not None:
+                cached = {'scores': entry['scores']}
+                self.results.put(key, cached)
+        if cached is not None:
+            return cached, True
+
+        # Identical requests already queued or running share one answer
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            future.add_done_callback(_retrieve_exception)
+            self.inflight[key] = future
+            self.queue.append((key, (endpoint, source_key, source, options), future))
+            if len(self.queue) >= self.max_batch:
+                self.batch_ready.set()
+            elif len(self.queue) == 1:
+                asyncio.get_running_loop().call_later(self.batch_window, self.batch_ready.set)
+        return await asyncio.shield(future), False
+
+    async def dispatch(self):
+        """Send queued requests to the pool in batches of up to `max_batch`."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.batch_ready.wait()
+            self.batch_ready.clear()
+            while self.queue:
+                batch, self.queue = self.queue[:self.max_batch], self.queue[self.max_batch:]
+                self.batches += 1
+                self.batched_jobs += len(batch)
+                loop.create_task(self.run(batch))
+
+    async def run(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, run_batch, [job for _, job, _ in batch])
+        except Exception as error:
+            results = [(False, (500, f'{type(error).__name__}: {error}'))] * len(batch)
+        for (key, (endpoint, source_key, source, _), future), (ok, payload) in zip(batch, results):
+            del self.inflight[key]
+            if ok:
+                self.results.put(key, payload)
+                if endpoint == 'score':
+                    kind, value = source[:2]
+                    self.score_cache.put(source_key, os.path.basename(value) if kind == 'file' else 'text', payload['scores'])
+                future.set_result(payload)
+            else:
+                future.set_exception(RequestError(*payload))
+
+    def record(self, endpoint, elapsed_ms):
+        self.latency.setdefault(endpoint, LatencyHistogram()).add(elapsed_ms)
+
+    def stats(self):
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'cache': {'entries': len(self.results), 'hits': self.results.hits, 'misses': self.results.misses},
+            'batches': self.batches,
+            'mean_batch_size': round(self.batched_jobs / self.batches, 2) if self.batches else None,
+            'latency': {endpoint: histogram.to_json() for endpoint, histogram in sorted(self.latency.items())},
+        }
+
+    async def respond(self, method, path, body):
+        """(status, JSON payload) for one HTTP request."""
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            return 200, self.stats()
+
+        endpoint = path.strip('/')
+        if endpoint not in ('parse', 'score', 'frequencies'):
+            raise RequestError(404, f'Unknown endpoint {path}')
+        if method != 'POST':
+            raise RequestError(405, f'{path} expects a POST with a JSON body')
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError as error:
+            raise RequestError(400, f'Invalid JSON: {error}')
+        if not isinstance(request, dict):
+            raise RequestError(400, 'Request body must be a JSON object')
+
+        payload, cached = await self.handle(endpoint, request)
+        return 200, dict(payload, cached=cached)
+
+    async def serve_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive: one request at a time per connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                started = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                path = target.split('?', 1)[0]
+                try:
+                    length = int(headers.get('content-length', 0))
+                    if length > MAX_BODY_BYTES:
+                        raise RequestError(413, f'Request body over {MAX_BODY_BYTES} bytes')
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.respond(method, path, body)
+                except RequestError as error:
+                    status, payload = error.status, {'error': str(error)}
+                except Exception as error:
+                    status, payload = 500, {'error': f'{type(error).__name__}: {error}'}
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1' and status != 413
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if path in ('/parse', '/score', '/frequencies'):
+                    self.record(path, (time.perf_counter() - started) * 1000)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        # Start the workers before any connection is open: forked workers would
+        # otherwise inherit client sockets and keep them open after a response
+        await asyncio.get_running_loop().run_in_executor(self.executor, int)
+        self.batch_ready = asyncio.Event()
+        dispatcher = asyncio.create_task(self.dispatch())
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        print(f"Serving on http://{host}:{port} (POST /score, /parse, /frequencies; GET /stats, /health)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            dispatcher.cancel()
+            self.executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve transcript parsing, readability scores and word frequencies over local HTTP/JSON.")
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--cache-size', type=int, default=256, help='Answers kept in the LRU cache (default: 256)')
+    parser.add_argument('--batch-window', type=float, default=5.0, help='Milliseconds to collect concurrent requests into one batch (default: 5)')
+    parser.add_argument('--max-batch', type=int, default=16, help='Most requests sent to a worker in one batch (default: 16)')
+    parser.add_argument('--manifest', default=manifest.MANIFEST_FILE, help=f'Debates manifest (default: {manifest.MANIFEST_FILE})')
+    args = parser.parse_args()
+    report_startup('serve')
+
+    service = ScoringService(manifest.load_debates(args.manifest), args.workers, args.cache_size, args.batch_window / 1000, args.max_batch)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,218 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import manifest
+import readstats
+import tracing
+import transcripts
+from score_cache import debate_cache_key, write_json_atomic
+
+# Directory of shard files: one JSON line per speaker per debate, after a header
+SHARD_DIR = '.shards'
+
+# Debates per shard; a worker holds one transcript's speakers at a time
+SHARD_SIZE = 8
+
+GROUPINGS = ('candidate', 'party', 'era', 'debate')
+
+
+def make_shards(debates, shard_size=SHARD_SIZE):
+    return [debates[i:i + shard_size] for i in range(0, len(debates), shard_size)]
+
+
+def shard_path(shard_dir, index):
+    return os.path.join(shard_dir, f'shard_{index:05d}.jsonl')
+
+
+def shard_key(debates):
+    """Hash of the shard's transcripts, speaker tags, parties and scorer version."""
+    digest = hashlib.sha256()
+    for debate in debates:
+        digest.update(debate_cache_key(manifest.transcript_path(debate), debate['candidates'], manifest.moderator_tags(debate)).encode('utf-8'))
+        digest.update(json.dumps([debate['year'], manifest.candidate_parties(debate)], sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def partial_to_json(partial):
+    return {
+        'sentences': partial.sentences,
+        'words': partial.words,
+        'letters': partial.letters,
+        'syllables': partial.syllables,
+        'polysyllables': partial.polysyllables,
+        'complex_words': sorted(partial.complex_words),
+    }
+
+
+def partial_from_json(data):
+    return readstats.PartialStats(**dict(data, complex_words=frozenset(data['complex_words'])))
+
+
+def document_records(debate):
+    """
+    One record per candidate who speaks in `debate`, with the PartialStats of
+    everything they said. The transcript is streamed turn by turn, so only the
+    running statistics of its speakers are held in memory.
+    """
+    running = {}
+    for turn in transcripts.read_turns(manifest.transcript_path(debate), debate['candidates'], manifest.moderator_tags(debate)):
+        running.setdefault(turn.speaker, readstats.RunningStats()).add(turn.text)
+
+    parties = manifest.candidate_parties(debate)
+    for speaker, stats in running.items():
+        yield {
+            'debate': manifest.debate_id(debate),
+            'year': debate['year'],
+            'speaker': speaker,
+            'party': parties.get(speaker, ''),
+            'stats': partial_to_json(stats.partial()),
+        }
+
+
+def process_shard(index, debates, shard_dir=SHARD_DIR):
+    """
+    Write the document records of a shard's debates to its shard file, unless the
+    file was already written from the same inputs. Returns (path, rewritten).
+    Debates whose transcript cannot be read are recorded as errors.
+    """
+    path = shard_path(shard_dir, index)
+    key = shard_key(debates)
+    if os.path.exists(path):
+        with open(path, 'r') as file:
+            if json.loads(file.readline() or '{}').get('key') == key:
+                return path, False
+
+    with tracing.span('shard', category='shards', shard=index, debates=len(debates)):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as file:
+            file.write(json.dumps({'key': key, 'debates': [manifest.debate_id(debate) for debate in debates]}) + '\n')
+            for debate in debates:
+                try:
+                    for record in document_records(debate):
+                        file.write(json.dumps(record) + '\n')
+                except OSError as error:
+                    file.write(json.dumps({'debate': manifest.debate_id(debate), 'error': str(error)}) + '\n')
+        os.replace(tmp_path, path)
+    return path, True
+
+
+def process_shards(debates, shard_dir=SHARD_DIR, shard_size=SHARD_SIZE, max_workers=None):
+    """
+    Split `debates` into shards and process them independently across a process
+    pool, skipping shards whose inputs are unchanged. Returns the shard file paths
+    and the number of shards rewritten.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    shards = make_shards(debates, shard_size)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=tracing.attach, initargs=tracing.context()) as executor:
+        results = list(executor.map(process_shard, range(len(shards)), shards, repeat(shard_dir)))
+
+    # Shards past the end are left over from a longer manifest or smaller shards
+    paths = [path for path, _ in results]
+    for name in os.listdir(shard_dir):
+        if name.startswith('shard_') and os.path.join(shard_dir, name) not in paths:
+            os.unlink(os.path.join(shard_dir, name))
+    return paths, sum(1 for _, rewritten in results if rewritten)
+
+
+def iter_documents(paths):
+    """Stream the document records of every shard file, one line at a time."""
+    for path in paths:
+        with open(path, 'r') as file:
+            file.readline()  # header
+            for line in file:
+                yield json.loads(line)
+
+
+def group_key(record, grouping, era_years=10):
+    if grouping == 'candidate':
+        return record['speaker']
+    if grouping == 'party':
+        return record['party'] or 'Unaffiliated'
+    if grouping == 'era':
+        return f"{record['year'] // era_years * era_years}s"
+    if grouping == 'debate':
+        return record['debate']
+    raise ValueError(f"Unknown grouping {grouping!r}; expected one of {', '.join(GROUPINGS)}")
+
+
+def aggregate(records, groupings=('candidate', 'party', 'era'), era_years=10):
+    """
+    Merge document records into grouping -> group -> PartialStats in one pass.
+    Memory grows with the number of groups and their distinct complex words, not
+    with the number of documents. Returns the totals and any per-debate errors.
+    """
+    totals = {grouping: {} for grouping in groupings}
+    documents = {grouping: {} for grouping in groupings}
+    errors = []
+    for record in records:
+        if 'error' in record:
+            errors.append(record)
+            continue
+        partial = partial_from_json(record['stats'])
+        for grouping in groupings:
+            key = group_key(record, grouping, era_years)
+            totals[grouping][key] = totals[grouping].get(key, readstats.PartialStats()).merge(partial)
+            documents[grouping][key] = documents[grouping].get(key, 0) + 1
+    return totals, documents, errors
+
+
+def group_scores(totals, documents):
+    """grouping -> group -> {'documents', 'words', 'scores': metric -> score}."""
+    return {
+        grouping: {
+            key: {
+                'documents': documents[grouping][key],
+                'words': partial.words,
+                'scores': readstats.scores_from_stats(partial.stats()),
+            }
+            for key, partial in sorted(groups.items())
+        }
+        for grouping, groups in totals.items()
+    }
+
+
+def format_groups(groups):
+    lines = [f"{'group':16} {'docs':>5} {'words':>9} " + ' '.join(f'{metric.split()[0]:>14}' for metric in readstats.METRICS)]
+    for key, group in groups.items():
+        lines.append(f"{key:16} {group['documents']:>5} {group['words']:>9} " + ' '.join(f"{group['scores'][metric]:>14}" for metric in readstats.METRICS))
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score the debates shard by shard and aggregate readability by candidate, party or era.")
+    parser.add_argument('--by', nargs='+', choices=GROUPINGS, default=['candidate', 'party', 'era'], help='Groupings to aggregate (default: candidate party era)')
+    parser.add_argument('--era-years', type=int, default=10, help='Length of an era in years (default: 10)')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help=f'Debates per shard (default: {SHARD_SIZE})')
+    parser.add_argument('--shard-dir', default=SHARD_DIR, help=f'Directory for shard files (default: {SHARD_DIR})')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--manifest', default=manifest.MANIFEST_FILE, help=f'Debates manifest (default: {manifest.MANIFEST_FILE})')
+    parser.add_argument('--trace', metavar='FILE', help='Record timing and memory spans of every shard, across all workers, and save them as a Chrome trace JSON file')
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
+
+    start = time.perf_counter()
+    paths, rewritten = process_shards(manifest.load_debates(args.manifest), args.shard_dir, args.shard_size, args.workers)
+    print(f"Processed {rewritten} of {len(paths)} shards in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    totals, documents, errors = aggregate(iter_documents(paths), args.by, args.era_years)
+    for error in errors:
+        print(f"Error reading debate {error['debate']}: {error['error']}")
+    scores = group_scores(totals, documents)
+    print(f"Aggregated in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    for grouping, groups in scores.items():
+        output_file = f'readability_by_{grouping}.json'
+        write_json_atomic(output_file, groups)
+        print(f"\nBy {grouping} (saved to {output_file}):")
+        print(format_groups(groups))
+
+    if args.trace:
+        tracing.finish(args.trace)
@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+# Entry points import this module first, so this marks the start of their imports
+_STARTED_AT = time.perf_counter()
+
+# Cold-start budgets in seconds, from the entry point's first import until it starts
+# real work. Heavy libraries (matplotlib, wordcloud, PIL, NumPy) are
+# imported lazily by the code paths that use them and are not counted here.
+STARTUP_BUDGETS = {
+    'readlvl': 0.1,
+    'collect_and_plot_readability': 0.2,
+    'debatecloud': 0.15,
+    'create_readability_gif': 0.05,
+    'build': 0.2,
+    'serve': 0.2,
+}
+
+# Set to report the startup time of every run, not only the ones over budget
+REPORT_ENV_VAR = 'DEBATECLOUD_STARTUP_REPORT'
+
+
+def report_startup(entry_point):
+    """
+    Measure the cold start of `entry_point` and print it to stderr when it exceeds
+    its budget, or always when DEBATECLOUD_STARTUP_REPORT is set. Returns the
+    elapsed time in seconds.
+    """
+    elapsed = time.perf_counter() - _STARTED_AT
+    budget = STARTUP_BUDGETS.get(entry_point)
+    over_budget = budget is not None and elapsed > budget
+    if over_budget or os.environ.get(REPORT_ENV_VAR):
+        budget_text = f"{budget * 1000:.0f} ms" if budget is not None else "none"
+        status = "OVER BUDGET" if over_budget else "ok"
+        print(f"Startup {entry_point}: {elapsed * 1000:.1f} ms (budget {budget_text}) {status}", file=sys.stderr)
+    return elapsed
@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import corpus_index
+import manifest
+import readstats
+from debate_stopwords import NLTK_ENGLISH_STOPWORDS
+
+# Cached term matrix inside the corpus index directory
+MATRIX_FILE = 'term_matrix.npz'
+
+WEIGHTINGS = ('tfidf', 'log-odds')
+
+# Pseudo-counts of the log-odds prior, spread over the vocabulary in proportion to
+# corpus frequency; larger values shrink rare words harder
+PRIOR_SIZE = 10000
+
+# (index directory, debates) -> (transcript stats, TermMatrix) loaded by this process
+_loaded = {}
+
+
+class TermMatrix:
+    """
+    Sparse document x term count matrix in COO form, where a document is one
+    speaker in one debate. Any slice of documents (a speaker, a debate, a party,
+    or a mix) is summed into a dense term vector with one gather and one bincount.
+    Debate x term counts are the same rows grouped by debate.
+    """
+
+    def __init__(self, vocab, rows, cols, counts, doc_debates, doc_speakers, doc_parties):
+        self.vocab = vocab
+        self.rows = rows          # document of each nonzero
+        self.cols = cols          # token id of each nonzero
+        self.counts = counts      # count of each nonzero
+        self.doc_debates = doc_debates    # debate id of each document
+        self.doc_speakers = doc_speakers  # upper-cased speaker of each document
+        self.doc_parties = doc_parties    # party of each document, or ''
+        self._totals = None
+        self._doc_freq = None
+
+    @property
+    def num_terms(self):
+        return len(self.vocab)
+
+    @property
+    def num_docs(self):
+        return len(self.doc_debates)
+
+    def select(self, speaker=None, debate=None, party=None):
+        """Boolean document mask for every document matching all the given filters."""
+        mask = np.ones(self.num_docs, dtype=bool)
+        if speaker:
+            mask &= self.doc_speakers == speaker.strip().upper()
+        if debate:
+            mask &= self.doc_debates == debate
+        if party:
+            mask &= np.char.lower(self.doc_parties) == party.lower()
+        return mask
+
+    def term_counts(self, doc_mask=None):
+        """Dense term count vector summed over the documents in `doc_mask` (default: all)."""
+        if doc_mask is None:
+            if self._totals is None:
+                self._totals = np.bincount(self.cols, weights=self.counts, minlength=self.num_terms)
+            return self._totals
+        nonzeros = doc_mask[self.rows]
+        return np.bincount(self.cols[nonzeros], weights=self.counts[nonzeros], minlength=self.num_terms)
+
+    def document_frequency(self):
+        """Number of documents each term appears in."""
+        if self._doc_freq is None:
+            self._doc_freq = np.bincount(self.cols, minlength=self.num_terms)
+        return self._doc_freq
+
+    def debate_matrix(self):
+        """(debate ids, debate x term COO rows, cols, counts), merging each debate's speakers."""
+        debate_ids, debate_rows = np.unique(self.doc_debates, return_inverse=True)
+        keys = debate_rows[self.rows].astype(np.int64) * self.num_terms + self.cols
+        keys, inverse = np.unique(keys, return_inverse=True)
+        return debate_ids, keys // self.num_terms, keys % self.num_terms, np.bincount(inverse, weights=self.counts).astype(np.int64)
+
+    def save(self, path, signature):
+        tmp_path = f'{path}.tmp.npz'
+        np.savez(tmp_path, rows=self.rows, cols=self.cols, counts=self.counts,
+                 doc_debates=self.doc_debates, doc_speakers=self.doc_speakers, doc_parties=self.doc_parties,
+                 signature=np.array(signature))
+        os.replace(tmp_path, path)
+
+
+def tfidf(matrix, doc_mask):
+    """
+    Term frequency of the slice times smoothed inverse document frequency across all
+    speaker-debate documents. Words every speaker uses score zero.
+    """
+    tf = matrix.term_counts(doc_mask)
+    idf = np.log((1 + matrix.num_docs) / (1 + matrix.document_frequency()))
+    return tf * idf
+
+
+def log_odds(matrix, doc_mask, prior_size=PRIOR_SIZE):
+    """
+    z-scores of the log-odds ratio of each term in the slice against the rest of the
+    corpus, with an informative Dirichlet prior from corpus frequencies (Monroe,
+    Colaresi & Quinn, "Fightin' Words", 2008). Positive scores are the slice's
+    distinctive words; frequent words need a large difference to score high.
+    """
+    totals = matrix.term_counts()
+    inside = matrix.term_counts(doc_mask)
+    outside = totals - inside
+    prior = prior_size * totals / totals.sum()
+    n_inside, n_outside = inside.sum(), outside.sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = (np.log(inside + prior) - np.log(n_inside + prior_size - inside - prior)
+                 - np.log(outside + prior) + np.log(n_outside + prior_size - outside - prior))
+        variance = 1 / (inside + prior) + 1 / (outside + prior)
+        z = delta / np.sqrt(variance)
+    return np.where(totals > 0, z, 0)
+
+
+SCORERS = {'tfidf': tfidf, 'log-odds': log_odds}
+
+
+def stopword_mask(vocab, stop_words=NLTK_ENGLISH_STOPWORDS):
+    """Boolean mask of the vocabulary entries that are stop words, normalized as the index tokenizes."""
+    normalized = {readstats.PUNCTUATION_RE.sub('', word.lower()) for word in stop_words}
+    return np.array([word in normalized for word in vocab], dtype=bool)
+
+
+def top_terms(matrix, weights, doc_mask, max_words=200, min_count=2, exclude=None):
+    """
+    word -> weight for the `max_words` highest positive weights among terms the slice
+    uses at least `min_count` times, ready for WordCloud.generate_from_frequencies.
+    """
+    eligible = (matrix.term_counts(doc_mask) >= min_count) & (weights > 0)
+    if exclude is not None:
+        eligible &= ~exclude
+    candidates = np.flatnonzero(eligible)
+    best = candidates[np.argsort(weights[candidates])[::-1][:max_words]]
+    return {matrix.vocab[i]: float(weights[i]) for i in best}
+
+
+def distinctive_words(matrix, speaker=None, debate=None, party=None, weighting='log-odds', max_words=200, min_count=2, stop_words=NLTK_ENGLISH_STOPWORDS):
+    """Weighted word -> score table for one slice of the corpus."""
+    doc_mask = matrix.select(speaker, debate, party)
+    if not doc_mask.any():
+        raise ValueError(f"No documents match speaker={speaker!r}, debate={debate!r}, party={party!r}")
+    exclude = stopword_mask(matrix.vocab, stop_words) if stop_words else None
+    return top_terms(matrix, SCORERS[weighting](matrix, doc_mask), doc_mask, max_words, min_count, exclude)
+
+
+def _debate_parties(debates):
+    """debate id -> upper-cased candidate -> party."""
+    return {manifest.debate_id(debate): manifest.candidate_parties(debate) for debate in debates}
+
+
+def build_term_matrix(index, debates):
+    """
+    Count every (speaker, term) pair of every debate in `index` straight from the
+    token arrays, with one np.unique per debate; nothing is re-tokenized.
+    """
+    parties = _debate_parties(debates)
+    num_terms = len(index.vocab)
+    rows, cols, counts = [], [], []
+    doc_debates, doc_speakers, doc_parties = [], [], []
+
+    for debate_id in index.debate_ids:
+        tokens = index.tokens(debate_id)
+        speakers = index.speakers(debate_id)
+        keys, key_counts = np.unique(tokens['speaker'].astype(np.int64) * num_terms + tokens['token'], return_counts=True)
+        first_doc = len(doc_debates)
+        rows.append(first_doc + keys // num_terms)
+        cols.append(keys % num_terms)
+        counts.append(key_counts)
+        for speaker in speakers:
+            doc_debates.append(debate_id)
+            doc_speakers.append(speaker)
+            doc_parties.append(parties.get(debate_id, {}).get(speaker, ''))
+
+    return TermMatrix(
+        index.vocab,
+        np.concatenate(rows).astype(np.int32) if rows else np.empty(0, dtype=np.int32),
+        np.concatenate(cols).astype(np.int32) if cols else np.empty(0, dtype=np.int32),
+        np.concatenate(counts).astype(np.int32) if counts else np.empty(0, dtype=np.int32),
+        np.array(doc_debates), np.array(doc_speakers), np.array(doc_parties),
+    )
+
+
+def _signature(index, debates):
+    # Changes whenever a debate is re-tokenized or a party assignment changes
+    return json.dumps([index.debates[debate_id]['key'] for debate_id in index.debate_ids] + [_debate_parties(debates)], sort_keys=True)
+
+
+def _transcript_stats(debates):
+    stats = []
+    for debate in debates:
+        try:
+            stat = os.stat(manifest.transcript_path(debate))
+            stats.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stats.append(None)
+    return stats
+
+
+def load_term_matrix(debates, index_dir=corpus_index.INDEX_DIR):
+    """
+    The TermMatrix for `debates`, updating the corpus index first. The matrix is
+    cached next to the index and rebuilt only when the index or the parties change.
+    Within a process, it is reused without re-hashing the transcripts while none
+    of them has been modified.
+    """
+    key = (os.path.abspath(index_dir), json.dumps(debates, sort_keys=True))
+    stats = _transcript_stats(debates)
+    loaded = _loaded.get(key)
+    if loaded is not None and loaded[0] == stats:
+        return loaded[1]
+    matrix = _load_term_matrix(debates, index_dir)
+    _loaded[key] = (stats, matrix)
+    return matrix
+
+
+def _load_term_matrix(debates, index_dir):
+    index, _ = corpus_index.build_index(debates, index_dir)
+    path = os.path.join(index_dir, MATRIX_FILE)
+    signature = _signature(index, debates)
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            if str(cached['signature']) == signature:
+                return TermMatrix(index.vocab, cached['rows'], cached['cols'], cached['counts'],
+                                  cached['doc_debates'], cached['doc_speakers'], cached['doc_parties'])
+
+    matrix = build_term_matrix(index, debates)
+    matrix.save(path, signature)
+    return matrix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print or draw the most distinctive words of a speaker, debate or party across the whole corpus.")
+    parser.add_argument('--speaker', help='Candidate name (e.g., Trump)')
+    parser.add_argument('--debate', help='Debate id (e.g., 2024b)')
+    parser.add_argument('--party', help='Party (Democratic, Republican or Independent)')
+    parser.add_argument('--weighting', choices=WEIGHTINGS, default='log-odds', help='Term weighting (default: log-odds)')
+    parser.add_argument('--max-words', type=int, default=130, help='Number of words to keep (default: 130)')
+    parser.add_argument('--min-count', type=int, default=2, help='Minimum uses of a word within the slice (default: 2)')
+    parser.add_argument('--output', help='Also draw a word cloud to this file')
+    parser.add_argument('--index-dir', default=corpus_index.INDEX_DIR, help=f'Corpus index directory (default: {corpus_index.INDEX_DIR})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matrix = load_term_matrix(manifest.load_debates(), args.index_dir)
+    print(f"Loaded {matrix.num_docs} speaker documents x {matrix.num_terms} terms ({len(matrix.counts)} nonzeros) in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    frequencies = distinctive_words(matrix, args.speaker, args.debate, args.party, args.weighting, args.max_words, args.min_count)
+    print(f"Weighted the slice in {(time.perf_counter() - start) * 1000:.1f}ms")
+    for word, weight in list(frequencies.items())[:25]:
+        print(f"{word:20} {weight:.2f}")
+
+    if args.output:
+        from debatecloud import render_wordcloud
+
+        render_wordcloud(frequencies, args.output, max_words=args.max_words, random_state=0)
+        print(f"Word cloud saved as {args.output}")
@@ -0,0 +1,130 @@
+import numpy as np
+
+import readstats
+
+# Units a sliding window can be measured in
+WINDOW_UNITS = ('sentences', 'words')
+
+# Per-word counts kept as prefix sums
+COUNT_FIELDS = ('sentences', 'letters', 'syllables', 'polysyllables', 'complex_words')
+
+
+class SpeakerCounts:
+    """
+    Per-word readability counts for one speaker's turns, stored as prefix sums so
+    the statistics of any span of words take O(1) to compute and a whole sweep of
+    spans is a handful of vectorized array operations.
+
+    Each word carries its letters, syllables and polysyllable/complex flags; the last
+    word of every sentence longer than two words carries that sentence. Complex
+    words are counted per occurrence, since distinct counts cannot be prefix-summed,
+    so Gunning Fog over long spans runs higher than readstats' whole-text score.
+    """
+
+    def __init__(self, turns):
+        counts = {field: [] for field in COUNT_FIELDS}
+        offsets = []
+        sentence_starts = []
+        turn_bounds = []
+
+        for turn in turns:
+            turn_start = len(offsets)
+            sentences = [readstats.PUNCTUATION_RE.sub('', sentence).split() for sentence in readstats.SENTENCE_RE.findall(turn.text)]
+            turn_words = sum(len(words) for words in sentences) or 1
+            for words in sentences:
+                if not words:
+                    continue
+                sentence_starts.append(len(offsets))
+                for position, word in enumerate(words):
+                    syllables = readstats.count_syllables(word)
+                    counts['letters'].append(len(word))
+                    counts['syllables'].append(syllables)
+                    counts['polysyllables'].append(syllables >= readstats.POLYSYLLABLE_THRESHOLD)
+                    counts['complex_words'].append(readstats.is_complex_word(word.lower()))
+                    counts['sentences'].append(position == len(words) - 1 and len(words) > 2)
+                    # Spread the turn's words evenly over the bytes it spans
+                    offsets.append(turn.start + (turn.end - turn.start) * (len(offsets) - turn_start) / turn_words)
+            turn_bounds.append((turn_start, len(offsets)))
+
+        self.num_words = len(offsets)
+        self.offsets = np.array(offsets, dtype=float)
+        self.sentence_starts = np.array(sentence_starts + [self.num_words], dtype=np.int64)
+        self.turn_bounds = np.array(turn_bounds, dtype=np.int64).reshape(-1, 2)
+        self.prefix = {
+            field: np.concatenate(([0], np.cumsum(values, dtype=np.int64)))
+            for field, values in counts.items()
+        }
+
+    def span_stats(self, starts, ends):
+        """Counts for the word spans [starts, ends) as arrays, one element per span."""
+        stats = {field: self.prefix[field][ends] - self.prefix[field][starts] for field in COUNT_FIELDS}
+        stats['words'] = ends - starts
+        # As in readstats, a span has at least one sentence
+        stats['sentences'] = np.maximum(stats['sentences'], 1)
+        return stats
+
+    def span_scores(self, starts, ends):
+        return readstats.scores_from_arrays(**self.span_stats(starts, ends))
+
+    def window_spans(self, size, stride=1, unit='sentences'):
+        """
+        Start and end word indexes of windows of `size` sentences or words, advancing
+        by `stride` of the same unit. Text shorter than one window is a single span.
+        """
+        if unit not in WINDOW_UNITS:
+            raise ValueError(f"Unknown window unit {unit!r}, expected one of {WINDOW_UNITS}")
+        if size < 1 or stride < 1:
+            raise ValueError(f"Window size and stride must be at least 1, got {size} and {stride}")
+        total = len(self.sentence_starts) - 1 if unit == 'sentences' else self.num_words
+        first = np.arange(0, max(total - size, 0) + 1, stride)
+        last = np.minimum(first + size, total)
+        if unit == 'sentences':
+            return self.sentence_starts[first], self.sentence_starts[last]
+        return first, last
+
+    def turn_spans(self):
+        """Start and end word indexes of every turn that has words."""
+        bounds = self.turn_bounds[self.turn_bounds[:, 1] > self.turn_bounds[:, 0]]
+        return bounds[:, 0], bounds[:, 1]
+
+
+def speaker_timelines(turns, window=None, stride=1, unit='sentences'):
+    """
+    Readability over the course of a debate for every speaker in `turns`: per turn
+    when `window` is None, otherwise over sliding windows of `window` sentences or
+    words. Returns speaker -> {'position', 'start', 'end', metric...} arrays, where
+    position is the span's midpoint as a fraction of the transcript (0 to 1) and
+    start/end are word indexes into that speaker's text.
+    """
+    turns = list(turns)
+    transcript_end = max((turn.end for turn in turns), default=0) or 1
+
+    by_speaker = {}
+    for turn in turns:
+        by_speaker.setdefault(turn.speaker, []).append(turn)
+
+    timelines = {}
+    for speaker, speaker_turns in by_speaker.items():
+        counts = SpeakerCounts(speaker_turns)
+        if not counts.num_words:
+            continue
+        starts, ends = counts.turn_spans() if window is None else counts.window_spans(window, stride, unit)
+        midpoints = (counts.offsets[starts] + counts.offsets[ends - 1]) / 2
+        timelines[speaker] = {
+            'position': midpoints / transcript_end,
+            'start': starts,
+            'end': ends,
+            **counts.span_scores(starts, ends),
+        }
+    return timelines
+
+
+def timelines_to_json(timelines):
+    """Plain lists for JSON output; undefined scores (NaN) become null."""
+    return {
+        speaker: {
+            key: [None if isinstance(value, float) and np.isnan(value) else value for value in values.tolist()]
+            for key, values in series.items()
+        }
+        for speaker, series in timelines.items()
+    }
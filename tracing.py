@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+
+# Directory the processes of a traced run append their spans to. Set by enable() and
+# inherited by worker processes, which trace themselves whenever it is set.
+TRACE_ENV_VAR = 'DEBATECLOUD_TRACE_DIR'
+
+_trace_dir = os.environ.get(TRACE_ENV_VAR)
+_events = []
+_local = threading.local()
+_next_id = 0
+_parent = None  # (pid, tid, span id) of the span that started this worker's pool
+
+
+class _NullSpan:
+    """Stands in for Span when tracing is off: no clocks are read and nothing is kept."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _rss_bytes():
+    """Current resident set size, or the peak where the current one is unavailable."""
+    try:
+        with open('/proc/self/statm', 'rb') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _now_us():
+    # CLOCK_MONOTONIC on Linux, shared by every process, so spans from workers line up
+    return time.perf_counter_ns() // 1000
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class Span:
+    """
+    A timed region, recorded as a Chrome trace complete event with its CPU time and
+    change in resident memory. Spans opened inside another span nest under it.
+    """
+
+    def __init__(self, name, category, args):
+        global _next_id
+        _next_id += 1
+        self.id = _next_id
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def set(self, **args):
+        """Attach more arguments, e.g. results only known at the end of the span."""
+        self.args.update(args)
+
+    def __enter__(self):
+        self.stack = _stack()
+        self.stack.append(self)
+        self.rss = _rss_bytes()
+        self.cpu = time.process_time()
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = _now_us()
+        cpu = time.process_time() - self.cpu
+        rss = _rss_bytes()
+        self.stack.pop()
+
+        pid, tid = os.getpid(), threading.get_native_id()
+        args = dict(self.args, cpu_ms=round(cpu * 1000, 3), rss_mb=round(rss / 2**20, 1), rss_delta_mb=round((rss - self.rss) / 2**20, 2))
+        _events.append({'name': self.name, 'cat': self.category, 'ph': 'X', 'ts': self.start, 'dur': end - self.start, 'pid': pid, 'tid': tid, 'args': args})
+
+        if not self.stack:
+            if _parent:
+                # Draw an arrow from the span that handed this work to the pool
+                flow = f'{pid}-{self.id}'
+                parent_pid, parent_tid, parent_id = _parent
+                _events.append({'name': 'task', 'cat': 'flow', 'ph': 's', 'id': flow, 'ts': self.start, 'pid': parent_pid, 'tid': parent_tid})
+                _events.append({'name': 'task', 'cat': 'flow', 'ph': 'f', 'bp': 'e', 'id': flow, 'ts': self.start, 'pid': pid, 'tid': tid})
+            flush()
+        return False
+
+
+def span(name, category='stage', **args):
+    """
+    `with tracing.span('parse', debate='1960a'):` times the block when tracing is on.
+    When it is off this returns a shared no-op, so instrumented code pays one call.
+    """
+    if _trace_dir is None:
+        return _NULL_SPAN
+    return Span(name, category, args)
+
+
+def enabled():
+    return _trace_dir is not None
+
+
+def enable(trace_dir=None):
+    """Start tracing this process and every worker started after this call."""
+    global _trace_dir
+    if trace_dir is None:
+        import tempfile
+
+        trace_dir = tempfile.mkdtemp(prefix='debatecloud-trace-')
+    _trace_dir = os.environ[TRACE_ENV_VAR] = trace_dir
+    _events.append({'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'args': {'name': f'main ({os.getpid()})'}})
+
+
+def context():
+    """initargs for a pool initialized with `attach`, linking its work to the current span."""
+    if _trace_dir is None:
+        return (None, None)
+    stack = _stack()
+    parent = (os.getpid(), threading.get_native_id(), stack[-1].id) if stack else None
+    return (_trace_dir, parent)
+
+
+def attach(trace_dir, parent):
+    """
+    Pool initializer: trace this worker into `trace_dir` whatever the start method,
+    with its top-level spans linked to `parent`.
+    """
+    global _trace_dir, _parent
+    if trace_dir is None:
+        return
+    _trace_dir = trace_dir
+    _parent = parent
+    _events.append({'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'args': {'name': f'worker ({os.getpid()})'}})
+
+
+def _reset_after_fork():
+    # A forked worker must not flush a copy of its parent's pending spans
+    global _parent
+    _events.clear()
+    _local.stack = []
+    _parent = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def flush():
+    """Append this process's finished spans to its file in the trace directory."""
+    if _trace_dir is None or not _events:
+        return
+    import json
+
+    with open(os.path.join(_trace_dir, f'{os.getpid()}.jsonl'), 'a') as file:
+        for event in _events:
+            file.write(json.dumps(event) + '\n')
+    _events.clear()
+
+
+def collect_events(trace_dir=None):
+    """Every event written to the trace directory so far, by all processes."""
+    import json
+
+    flush()
+    trace_dir = trace_dir or _trace_dir
+    events = []
+    for name in sorted(os.listdir(trace_dir)):
+        if name.endswith('.jsonl'):
+            with open(os.path.join(trace_dir, name), 'r') as file:
+                events.extend(json.loads(line) for line in file)
+    return events
+
+
+def summarize(events):
+    """Per span name: calls, total and mean wall time, total CPU time and the largest memory growth."""
+    rows = {}
+    for event in events:
+        if event['ph'] != 'X':
+            continue
+        row = rows.setdefault(event['name'], {'calls': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0, 'max_rss_delta_mb': 0.0})
+        row['calls'] += 1
+        row['wall_ms'] += event['dur'] / 1000
+        row['cpu_ms'] += event['args']['cpu_ms']
+        row['max_rss_delta_mb'] = max(row['max_rss_delta_mb'], event['args']['rss_delta_mb'])
+    return dict(sorted(rows.items(), key=lambda item: item[1]['wall_ms'], reverse=True))
+
+
+def format_summary(rows, limit=25):
+    lines = [f"{'span':40} {'calls':>6} {'wall ms':>10} {'mean ms':>9} {'cpu ms':>10} {'max +MB':>8}"]
+    for name, row in list(rows.items())[:limit]:
+        lines.append(f"{name[:40]:40} {row['calls']:>6} {row['wall_ms']:>10.1f} {row['wall_ms'] / row['calls']:>9.2f} {row['cpu_ms']:>10.1f} {row['max_rss_delta_mb']:>8.1f}")
+    return '\n'.join(lines)
+
+
+def finish(output_file):
+    """
+    Write every process's spans to `output_file` as Chrome trace JSON (load it in
+    Perfetto or chrome://tracing), print the summary table and stop tracing.
+    """
+    global _trace_dir
+    import json
+    import shutil
+
+    if _trace_dir is None:
+        return
+    events = collect_events()
+    with open(output_file, 'w') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+    print(format_summary(summarize(events)))
+    print(f"Trace saved to {output_file}")
+
+    shutil.rmtree(_trace_dir, ignore_errors=True)
+    os.environ.pop(TRACE_ENV_VAR, None)
+    _trace_dir = None
@@ -0,0 +1,152 @@
+import re
+from dataclasses import dataclass
+
+# Speaker tags whose lines are never attributed to a candidate
+MODERATOR_TAGS = ('MODERATOR',)
+
+
+@dataclass
+class Turn:
+    """One uninterrupted speaker turn and the byte range it spans in the transcript."""
+    speaker: str
+    text: str
+    start: int  # byte offset of the turn's first line
+    end: int    # byte offset just past the turn's last line
+
+
+def speaker_tag_matcher(candidate_names, moderator_tags=MODERATOR_TAGS):
+    """
+    Precompile a single matcher for every candidate and moderator tag, e.g. `NIXON:`.
+    Matching a line costs one regex call however many candidates there are.
+    """
+    tags = {name.strip().upper() for name in candidate_names} | {tag.upper() for tag in moderator_tags}
+    # Longest first, so a tag is never shadowed by one of its prefixes
+    alternatives = '|'.join(re.escape(tag) for tag in sorted(tags, key=len, reverse=True))
+    return re.compile(f'({alternatives}):')
+
+
+def _split_lines(lines):
+    """
+    (line, start, end) for every line of `lines`, split at the same line breaks as
+    str.splitlines, so a binary file (which only splits at b'\\n') parses like the
+    decoded text. Offsets are in UTF-8 bytes from the start of the transcript.
+    """
+    offset = 0
+    for chunk in lines:
+        size = len(chunk) if isinstance(chunk, bytes) else None
+        if size is not None:
+            chunk = chunk.decode('utf-8')
+        pieces = chunk.splitlines(keepends=True)
+        if len(pieces) == 1 and size is not None:
+            yield chunk, offset, offset + size
+            offset += size
+            continue
+        for line in pieces:
+            start, offset = offset, offset + len(line.encode('utf-8'))
+            yield line, start, offset
+
+
+def iter_turns(lines, candidate_names, moderator_tags=MODERATOR_TAGS):
+    """
+    Lazily yield the candidates' Turns from an iterable of transcript lines, such as
+    an open file (text or binary mode) or `transcript.splitlines(keepends=True)`.
+
+    A line starting with a candidate's tag opens a turn for that candidate and a
+    moderator tag closes it. Any other line continues the current turn, or is
+    ignored when no candidate is speaking.
+    """
+    matcher = speaker_tag_matcher(candidate_names, moderator_tags)
+    moderators = {tag.upper() for tag in moderator_tags}
+
+    speaker = None
+    parts = []
+    start = end = 0
+
+    for line, line_start, offset in _split_lines(lines):
+        # Strip whitespace from the line and skip empty lines
+        line = line.strip()
+        if not line:
+            continue
+
+        match = matcher.match(line)
+        if match:
+            if speaker and parts:
+                yield Turn(speaker, ' '.join(parts), start, end)
+            parts = []
+            tag = match.group(1)
+            if tag in moderators:
+                # Ignore this line and subsequent lines until a candidate speaks
+                speaker = None
+                continue
+            speaker = tag
+            start = line_start
+            # Remove the candidate's tag from the line
+            line = line[match.end():].strip()
+            if not line:
+                end = offset
+                continue
+        elif not speaker:
+            continue
+
+        parts.append(line)
+        end = offset
+
+    if speaker and parts:
+        yield Turn(speaker, ' '.join(parts), start, end)
+
+
+class SpeakerTracker:
+    """
+    iter_turns' attribution rules one line at a time, for transcripts that are still
+    growing. feed() returns (speaker, text) for a line of candidate text, else None.
+    """
+
+    def __init__(self, candidate_names, moderator_tags=MODERATOR_TAGS):
+        self.matcher = speaker_tag_matcher(candidate_names, moderator_tags)
+        self.moderators = {tag.upper() for tag in moderator_tags}
+        self.speaker = None
+
+    def feed(self, line):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            return None
+
+        match = self.matcher.match(line)
+        if match:
+            tag = match.group(1)
+            if tag in self.moderators:
+                self.speaker = None
+                return None
+            self.speaker = tag
+            line = line[match.end():].strip()
+            if not line:
+                return None
+        elif not self.speaker:
+            return None
+        return self.speaker, line
+
+
+def read_turns(file_path, candidate_names, moderator_tags=MODERATOR_TAGS):
+    """Stream the Turns of the transcript at `file_path` without reading it whole."""
+    with open(file_path, 'rb') as file:
+        yield from iter_turns(file, candidate_names, moderator_tags)
+
+
+def join_speakers(turns):
+    """Concatenate each speaker's turns into one text, using list buffers and a single join."""
+    buffers = {}
+    for turn in turns:
+        buffers.setdefault(turn.speaker, []).append(turn.text)
+    return {speaker: ' '.join(parts) for speaker, parts in buffers.items()}
+
+
+def parse_transcript(transcript, candidate_names, moderator_tags=MODERATOR_TAGS):
+    """Split an in-memory transcript into a speaker -> text dict."""
+    return join_speakers(iter_turns(transcript.splitlines(keepends=True), candidate_names, moderator_tags))
+
+
+def read_speakers(file_path, candidate_names, moderator_tags=MODERATOR_TAGS):
+    """Stream the transcript at `file_path` into a speaker -> text dict."""
+    return join_speakers(read_turns(file_path, candidate_names, moderator_tags))